@@ -0,0 +1,65 @@
+"""
+Benchmark: columnar vs row-by-row position expansion
+
+Builds synthetic books by resampling pos_summary.csv at 10k / 100k / 1M rows
+and times expand_position_frame against the iterrows reference.
+
+Usage:
+    python bench_expansion.py                 # 10k, 100k, 1M rows
+    python bench_expansion.py --sizes 10000   # custom sizes
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from position_expander import expand_position_frame, expand_positions_rowwise, create_delta_summary
+
+
+def make_book(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Resample pos_summary.csv to n_rows positions with randomized quantities."""
+    df_pos = pd.read_csv('pos_summary.csv')
+    rng = np.random.default_rng(seed)
+    book = df_pos.iloc[rng.integers(0, len(df_pos), n_rows)].reset_index(drop=True)
+    book['Qty'] = np.round(rng.normal(0.0, 500.0, n_rows), 2)
+    return book
+
+
+def time_call(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--rowwise-max', type=int, default=100_000,
+                        help='Largest book to run through the iterrows reference (default: 100000)')
+    args = parser.parse_args()
+    
+    print("=" * 80)
+    print("POSITION EXPANSION BENCHMARK")
+    print("=" * 80)
+    print(f"{'rows':>10} {'expanded':>10} {'columnar_s':>12} {'rowwise_s':>12} {'speedup':>9} {'summary_s':>11}")
+    
+    for n_rows in args.sizes:
+        book = make_book(n_rows)
+        t_col, expanded = time_call(expand_position_frame, book)
+        t_sum, _ = time_call(create_delta_summary, expanded)
+        
+        if n_rows <= args.rowwise_max:
+            t_row, reference = time_call(expand_positions_rowwise, book)
+            pd.testing.assert_frame_equal(expanded, reference, check_exact=True)
+            rowwise_str = f"{t_row:12.3f}"
+            speedup_str = f"{t_row / t_col:8.1f}x"
+        else:
+            rowwise_str = f"{'-':>12}"
+            speedup_str = f"{'-':>9}"
+        
+        print(f"{n_rows:>10,} {len(expanded):>10,} {t_col:12.3f} {rowwise_str} {speedup_str} {t_sum:11.3f}")
+
+
+if __name__ == '__main__':
+    main()
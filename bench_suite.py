@@ -0,0 +1,391 @@
+"""
+Benchmark suite: every stage of the risk run on synthetic data
+
+Generates a position book (any mix of outrights, quarterlies, halves, cals and
+spreads across N products and strategies) and correlated price histories
+(T days x P products x K nodes), then times each stage of the run:
+
+    expansion           expand_position_frame
+    summary             create_delta_summary (tenor x product pivot)
+    returns             build_product_returns (holiday filter) + build_combined_returns
+    ewma                compute_multi_product_ewma_covariance (bucket lambdas)
+    factor_fit          fit_factor_covariance ('pca', 3 factors per product) on the same returns
+    mc                  build_strategy_matrix + marginal_contributions
+    factor_attribution  compute_factor_attribution over every (product, bucket)
+    hedge               recommend_portfolio_hedge + HedgeOptimizer.solve
+
+Each run is appended to a JSON history (bench_history.json) and compared with
+the previous run of the same configuration, so a change that slows a stage
+shows up as a regression. Everything is generated in memory; no market data
+or network access is needed.
+
+Usage:
+    python bench_suite.py                          # quick mode (seconds)
+    python bench_suite.py --mode large             # 1M rows, 20 products, 10 years
+    python bench_suite.py --rows 200000 --products 8 --mix outright=1,spread=1
+    python bench_suite.py --repeat 3 --label "before ewma change"
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import tenor_calendar
+from position_expander import SUMMARY_PRODUCTS, create_delta_summary, expand_position_frame
+from risk_engine.covariance_model import clear_model_cache
+from risk_engine.ewma import compute_multi_product_ewma_covariance
+from risk_engine.factor_model import fit_factor_covariance
+from risk_engine.factors import attribution_blocks, compute_factor_attribution
+from risk_engine.hedge_engine import build_hedge_universe, recommend_portfolio_hedge
+from risk_engine.hedge_optimizer import HedgeOptimizer
+from risk_engine.mc_engine import build_strategy_matrix, marginal_contributions
+from risk_engine.node_map import NodeMap
+from risk_engine.pipeline import ALL_NODES, BACK, BUCKET_LAMBDAS, FRONT, MID
+from risk_engine.returns_builder import build_combined_returns, build_product_returns, load_holiday_calendars
+
+MODES = {
+    'quick': {'rows': 20_000, 'products': 5, 'strategies': 100, 'days': 750},
+    'large': {'rows': 1_000_000, 'products': 20, 'strategies': 2_000, 'days': 2_500},
+}
+
+# Share of book rows per tenor type
+TENOR_MIX = {'outright': 0.40, 'quarterly': 0.15, 'half': 0.10, 'calendar': 0.10, 'spread': 0.25}
+
+# First month of the synthetic curve (A01) and the last price date
+CURVE_START = tenor_calendar.month_ordinal(2026, 0)
+AS_OF = '2025-12-31'
+
+# Slowdown vs the previous run flagged as a regression (relative, and at least this many seconds)
+REGRESSION_THRESHOLD = 0.25
+REGRESSION_MIN_SECONDS = 0.01
+
+
+# ============================================================================
+# SYNTHETIC DATA
+# ============================================================================
+
+def product_names(n_products: int) -> List[str]:
+    """The summary products first, then P06, P07, ..."""
+    extra = [f"P{k + 1:02d}" for k in range(len(SUMMARY_PRODUCTS), n_products)]
+    return (SUMMARY_PRODUCTS + extra)[:n_products]
+
+
+def tenor_pool(tenor_type: str, start: int = CURVE_START, n_months: int = 36) -> List[str]:
+    """Every tenor of a type whose months fall in [start, start + n_months)."""
+    months = range(start, start + n_months)
+    years = range(start // 12, (start + n_months - 1) // 12 + 1)
+    outrights = [tenor_calendar.ordinal_to_code(m) for m in months]
+    quarters = [f"Q{(m % 12) // 3 + 1}-{m // 12 % 100:02d}" for m in months if m % 3 == 0 and m + 2 in months]
+    halves = [f"H{(m % 12) // 6 + 1}-{m // 12 % 100:02d}" for m in months if m % 6 == 0 and m + 5 in months]
+    cals = [f"Cal{year % 100:02d}" for year in years if year * 12 in months and year * 12 + 11 in months]
+    if tenor_type == 'outright':
+        return outrights
+    if tenor_type == 'quarterly':
+        return quarters
+    if tenor_type == 'half':
+        return halves
+    if tenor_type == 'calendar':
+        return cals
+    if tenor_type == 'spread':
+        return ([f"{a}/{b}" for a, b in zip(outrights, outrights[1:])]
+                + [f"{a}/{b}" for a, b in zip(outrights, outrights[12:])]
+                + [f"{a}/{b}" for a, b in zip(quarters, quarters[1:])]
+                + [f"{a}/{b}" for a, b in zip(cals, cals[1:])])
+    raise ValueError(f"Unknown tenor type: {tenor_type}")
+
+
+def make_position_book(n_rows: int, n_products: int = 5, n_strategies: int = 100,
+                       mix: Optional[Dict[str, float]] = None, seed: int = 0) -> pd.DataFrame:
+    """
+    Synthetic pos_summary-format book.
+
+    Parameters:
+    -----------
+    n_rows : int
+        Number of positions
+    n_products : int
+        Number of products (see product_names)
+    n_strategies : int
+        Number of strategies; each belongs to one product
+    mix : dict, optional
+        Tenor type -> relative weight (default TENOR_MIX)
+    seed : int
+        Random seed
+
+    Returns:
+    --------
+    DataFrame with columns Qty, Tenor, Product, Strategy
+    """
+    rng = np.random.default_rng(seed)
+    mix = {k: v for k, v in (TENOR_MIX if mix is None else mix).items() if v > 0}
+    pools = [np.asarray(tenor_pool(kind), dtype=object) for kind in mix]
+    weights = np.asarray(list(mix.values()), dtype=np.float64)
+
+    kinds = rng.choice(len(pools), size=n_rows, p=weights / weights.sum())
+    tenors = np.empty(n_rows, dtype=object)
+    for k, pool in enumerate(pools):
+        rows = np.flatnonzero(kinds == k)
+        tenors[rows] = pool[rng.integers(0, len(pool), len(rows))]
+
+    products = np.asarray(product_names(n_products), dtype=object)
+    strategy_product = products[np.arange(n_strategies) % n_products]
+    strategy = rng.integers(0, n_strategies, n_rows)
+    strategy_names = np.asarray([f"{p}_S{s:04d}" for s, p in enumerate(strategy_product)], dtype=object)
+    return pd.DataFrame({
+        'Qty': np.round(rng.normal(0.0, 500.0, n_rows), 2),
+        'Tenor': tenors,
+        'Product': strategy_product[strategy],
+        'Strategy': strategy_names[strategy],
+    })
+
+
+def make_price_history(n_days: int, n_products: int = 5, n_nodes: int = 15, seed: int = 0,
+                       end: str = AS_OF) -> pd.DataFrame:
+    """
+    Correlated curve prices: a common factor, plus level and slope moves per
+    product, plus node noise, with front nodes the most volatile.
+
+    Returns:
+    --------
+    DataFrame indexed by business date with '{product}_A{n}' columns (data
+    products are the lower-case product names)
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=end, periods=n_days + 1)
+    tilt = np.linspace(-1.0, 1.0, n_nodes)
+    vol = np.linspace(1.0, 0.5, n_nodes)
+
+    common = rng.normal(0.0, 0.6, (n_days, 1, 1))
+    level = rng.normal(0.0, 0.5, (n_days, n_products, 1))
+    slope = rng.normal(0.0, 0.2, (n_days, n_products, 1)) * tilt
+    noise = rng.normal(0.0, 0.1, (n_days, n_products, n_nodes))
+    moves = (common + level + slope + noise) * vol                 # (T, P, K)
+
+    start = 50.0 + 5.0 * rng.random((1, n_products, 1)) + np.zeros((1, 1, n_nodes))
+    prices = np.concatenate([start, start + np.cumsum(moves, axis=0)], axis=0)
+    columns = [f"{p.lower()}_A{k + 1:02d}" for p in product_names(n_products) for k in range(n_nodes)]
+    return pd.DataFrame(prices.reshape(n_days + 1, -1), index=dates, columns=columns)
+
+
+def parse_mix(text: Optional[str]) -> Optional[Dict[str, float]]:
+    """'outright=2,spread=1' -> {'outright': 2.0, 'spread': 1.0}."""
+    if not text:
+        return None
+    mix = {}
+    for item in text.split(','):
+        kind, _, weight = item.partition('=')
+        if kind.strip() not in TENOR_MIX:
+            raise ValueError(f"Unknown tenor type in mix: {kind}")
+        mix[kind.strip()] = float(weight or 1.0)
+    return mix
+
+
+# ============================================================================
+# STAGES
+# ============================================================================
+
+def run_stages(book: pd.DataFrame, prices: pd.DataFrame, n_products: int) -> Dict[str, dict]:
+    """
+    Run every stage once on a book and price history.
+
+    Returns:
+    --------
+    dict : stage -> {'seconds': wall time, plus the sizes the stage worked on}
+    """
+    products = product_names(n_products)
+    results: Dict[str, dict] = {}
+
+    def timed(name, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        results[name] = {'seconds': time.perf_counter() - start}
+        return result
+
+    clear_model_cache()
+    product_map = {p: p for p in products}
+    expanded = timed('expansion', expand_position_frame, book, product_map)
+    results['expansion'].update(rows_in=len(book), rows_out=len(expanded))
+
+    summary = timed('summary', create_delta_summary, expanded)
+    results['summary'].update(tenors=len(summary), products=summary.shape[1])
+
+    calendars = load_holiday_calendars()
+    data_products = [p.lower() for p in products]
+
+    def returns_stage():
+        product_returns = build_product_returns(prices, calendars, products=data_products)
+        return build_combined_returns(product_returns, data_products)
+    combined, data_indices = timed('returns', returns_stage)
+    results['returns'].update(days=len(combined), columns=combined.shape[1])
+
+    Sigma, lambda_vec = timed('ewma', compute_multi_product_ewma_covariance, combined, n_products, ALL_NODES,
+                     FRONT, MID, BACK, BUCKET_LAMBDAS['Front'], BUCKET_LAMBDAS['Mid'], BUCKET_LAMBDAS['Back'])
+    results['ewma'].update(days=len(combined), variables=len(Sigma))
+
+    product_indices = {p: data_indices[p.lower()] for p in products}
+    factor_cov = timed('factor_fit', fit_factor_covariance, combined, product_indices, lambda_vec, 'pca')
+    results['factor_fit'].update(variables=len(Sigma), factors=factor_cov.n_factors)
+
+    node_map = NodeMap(np.arange(CURVE_START, CURVE_START + len(ALL_NODES)))
+
+    def mc_stage():
+        W, keys = build_strategy_matrix(expanded, node_map, ALL_NODES, sorted(products), product_indices)
+        w_total = W.sum(axis=0)
+        return W, w_total, marginal_contributions(W, Sigma, w_total)
+    W, w_total, _ = timed('mc', mc_stage)
+    results['mc'].update(strategies=len(W), variables=W.shape[1])
+
+    blocks = attribution_blocks(product_indices, {'Front': FRONT, 'Mid': MID, 'Back': BACK}, ALL_NODES)
+    factor_df = timed('factor_attribution', compute_factor_attribution, w_total, Sigma, blocks)
+    results['factor_attribution'].update(blocks=len(blocks), factors=len(factor_df))
+
+    def hedge_stage():
+        instruments = build_hedge_universe(FRONT, MID, BACK, ALL_NODES)
+        hedges = recommend_portfolio_hedge(Sigma, w_total, product_indices, products, ALL_NODES,
+                                           FRONT, MID, BACK, instruments)
+        optimizer = HedgeOptimizer(Sigma, product_indices, ALL_NODES, products, instruments)
+        return hedges, optimizer.solve(w_total)
+    hedges, _ = timed('hedge', hedge_stage)
+    results['hedge'].update(instruments=len(hedges))
+    return results
+
+
+def run_suite(n_rows: int, n_products: int, n_strategies: int, n_days: int,
+              mix: Optional[Dict[str, float]] = None, repeat: int = 1, seed: int = 0) -> Dict[str, dict]:
+    """Generate the data and run the stages `repeat` times; each stage keeps its fastest run."""
+    book = make_position_book(n_rows, n_products, n_strategies, mix, seed)
+    prices = make_price_history(n_days, n_products, len(ALL_NODES), seed)
+    best: Dict[str, dict] = {}
+    for _ in range(max(1, repeat)):
+        for stage, result in run_stages(book, prices, n_products).items():
+            if stage not in best or result['seconds'] < best[stage]['seconds']:
+                best[stage] = result
+    return best
+
+
+# ============================================================================
+# HISTORY
+# ============================================================================
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path: str) -> List[dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def append_history(path: str, record: dict) -> List[dict]:
+    """Append a run record to the JSON history file; returns the updated history."""
+    history = load_history(path) + [record]
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(history, f, indent=1)
+    os.replace(tmp, path)
+    return history
+
+
+def compare_runs(record: dict, history: List[dict], threshold: float = REGRESSION_THRESHOLD) -> pd.DataFrame:
+    """
+    Stage times against the latest run in history with the same config. A
+    stage is a regression when it is more than threshold slower, and by more
+    than REGRESSION_MIN_SECONDS (timer noise on millisecond stages).
+
+    Returns:
+    --------
+    DataFrame : stage, seconds, previous, change (fraction), regression
+    """
+    previous = next((run for run in reversed(history) if run.get('config') == record['config']), None)
+    rows = []
+    for stage, result in record['stages'].items():
+        before = previous['stages'].get(stage, {}).get('seconds') if previous else None
+        change = result['seconds'] / before - 1.0 if before else np.nan
+        rows.append({'stage': stage, 'seconds': result['seconds'], 'previous': before,
+                     'change': change,
+                     'regression': bool(change > threshold and result['seconds'] - before > REGRESSION_MIN_SECONDS)})
+    return pd.DataFrame(rows)
+
+
+def make_record(config: dict, stages: Dict[str, dict], label: Optional[str] = None) -> dict:
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'label': label,
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'config': config,
+        'stages': stages,
+        'total_seconds': sum(result['seconds'] for result in stages.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=sorted(MODES), default='quick')
+    parser.add_argument('--rows', type=int, help='Book rows (overrides the mode)')
+    parser.add_argument('--products', type=int, help='Products (overrides the mode)')
+    parser.add_argument('--strategies', type=int, help='Strategies (overrides the mode)')
+    parser.add_argument('--days', type=int, help='Days of price history (overrides the mode)')
+    parser.add_argument('--mix', help=f"Tenor mix, e.g. outright=2,spread=1 (types: {', '.join(TENOR_MIX)})")
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per stage; the fastest is kept (default: 1)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--history', default='bench_history.json', help='JSON history file (default: %(default)s)')
+    parser.add_argument('--no-history', action='store_true', help='Do not record this run')
+    parser.add_argument('--label', help='Note stored with the run (e.g. the change being measured)')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='Slowdown vs the previous run flagged as a regression (default: %(default)s)')
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit with status 1 on a regression')
+    args = parser.parse_args()
+
+    sizes = dict(MODES[args.mode])
+    for name in sizes:
+        if getattr(args, name) is not None:
+            sizes[name] = getattr(args, name)
+    mix = parse_mix(args.mix)
+    config = {'mode': args.mode, **sizes, 'mix': mix or TENOR_MIX, 'seed': args.seed}
+
+    print("=" * 80)
+    print("RISK ENGINE BENCHMARK SUITE")
+    print("=" * 80)
+    print(f"mode={args.mode}  rows={sizes['rows']:,}  products={sizes['products']}  "
+          f"strategies={sizes['strategies']:,}  days={sizes['days']:,}  repeat={args.repeat}")
+
+    stages = run_suite(sizes['rows'], sizes['products'], sizes['strategies'], sizes['days'],
+                       mix, args.repeat, args.seed)
+    record = make_record(config, stages, args.label)
+    comparison = compare_runs(record, load_history(args.history), args.threshold)
+    history = [] if args.no_history else append_history(args.history, record)
+
+    print(f"\n{'stage':<20} {'seconds':>10} {'previous':>10} {'change':>8}  sizes")
+    for row, (stage, result) in zip(comparison.itertuples(), stages.items()):
+        previous = f"{row.previous:10.3f}" if row.previous is not None and not pd.isna(row.previous) else f"{'-':>10}"
+        change = f"{row.change:+7.0%}" if not pd.isna(row.change) else f"{'-':>8}"
+        flag = '  REGRESSION' if row.regression else ''
+        sizes_str = ' '.join(f"{k}={v:,}" for k, v in result.items() if k != 'seconds')
+        print(f"{stage:<20} {row.seconds:10.3f} {previous} {change}  {sizes_str}{flag}")
+    print(f"{'total':<20} {record['total_seconds']:10.3f}")
+    if not args.no_history:
+        print(f"\nRecorded run {len(history)} in {args.history}")
+    return 1 if args.fail_on_regression and comparison['regression'].any() else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,269 @@
+"""
+Incremental Delta Book
+
+Holds the Tenor x Mapped_Product delta matrix (and a Product/Strategy breakdown)
+in dense NumPy arrays, so intraday fills update only the affected cells instead
+of re-expanding the whole position file.
+"""
+
+import copy
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import tenor_calendar
+from position_expander import (SUMMARY_PRODUCTS, build_expansion_table, build_product_mapping,
+                               expand_position_frame)
+
+
+def _grow(array: np.ndarray, axis: int, min_size: int) -> np.ndarray:
+    """Zero-pad array along axis to at least min_size (doubling capacity)."""
+    new_size = max(min_size, 2 * array.shape[axis])
+    pad_width = [(0, 0)] * array.ndim
+    pad_width[axis] = (0, new_size - array.shape[axis])
+    return np.pad(array, pad_width)
+
+
+class DeltaBook:
+    """
+    Dense delta book updated in O(legs) per trade.
+
+    Arrays:
+    - summary   : (tenors x mapped products) net quantity, the delta_summary matrix
+    - breakdown : ((Product, Strategy) keys x tenors) net quantity per strategy line
+    - legs      : (tenors x mapped products) number of live expanded legs, so
+                  tenors and products whose trades were all removed drop out
+                  of summary_frame like they do from create_delta_summary
+
+    Tenor rows are allocated as new futures tenors appear and are exported in
+    calendar order, so the book has no fixed horizon.
+
+    Parameters:
+    -----------
+    product_map : Dict[str, str], optional
+        Product -> Mapped_Product (defaults to build_product_mapping())
+    initial_tenors, initial_keys : int
+        Initial array capacity (grown by doubling)
+    """
+
+    def __init__(self, product_map: Optional[Dict[str, str]] = None,
+                 initial_tenors: int = 64, initial_keys: int = 16):
+        self.product_map = product_map if product_map is not None else build_product_mapping()
+        self.n_trades = 0
+
+        self._tenors: List[str] = []
+        self._tenor_index: Dict[str, int] = {}
+        self._products: List[str] = []
+        self._product_index: Dict[str, int] = {}
+        self._keys: List[Tuple[str, str]] = []
+        self._key_index: Dict[Tuple[str, str], int] = {}
+
+        # tenor string -> (tenor rows, leg signs, divisors, is_spread)
+        self._legs: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray, bool]] = {}
+
+        self._summary = np.zeros((initial_tenors, len(SUMMARY_PRODUCTS)))
+        self._breakdown = np.zeros((initial_keys, initial_tenors))
+        self._leg_counts = np.zeros((initial_tenors, len(SUMMARY_PRODUCTS)), dtype=np.int64)
+
+    # ------------------------------------------------------------------------
+    # Axis management
+    # ------------------------------------------------------------------------
+
+    def _tenor_row(self, tenor: str) -> int:
+        row = self._tenor_index.get(tenor)
+        if row is None:
+            row = len(self._tenors)
+            if row >= self._summary.shape[0]:
+                self._summary = _grow(self._summary, 0, row + 1)
+                self._breakdown = _grow(self._breakdown, 1, row + 1)
+                self._leg_counts = _grow(self._leg_counts, 0, row + 1)
+            self._tenors.append(tenor)
+            self._tenor_index[tenor] = row
+        return row
+
+    def _product_column(self, mapped_product: str) -> int:
+        col = self._product_index.get(mapped_product)
+        if col is None:
+            col = len(self._products)
+            if col >= self._summary.shape[1]:
+                self._summary = _grow(self._summary, 1, col + 1)
+                self._leg_counts = _grow(self._leg_counts, 1, col + 1)
+            self._products.append(mapped_product)
+            self._product_index[mapped_product] = col
+        return col
+
+    def _key_row(self, product: str, strategy: str) -> int:
+        key = (product, strategy)
+        row = self._key_index.get(key)
+        if row is None:
+            row = len(self._keys)
+            if row >= self._breakdown.shape[0]:
+                self._breakdown = _grow(self._breakdown, 0, row + 1)
+            self._keys.append(key)
+            self._key_index[key] = row
+        return row
+
+    def _legs_for(self, tenor: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, bool]:
+        legs = self._legs.get(tenor)
+        if legs is None:
+            table = build_expansion_table([tenor])
+            rows = np.array([self._tenor_row(t) for t in table['futures_tenor']], dtype=np.intp)
+            legs = (rows, table['leg_sign'], table['divisor'], bool(table['is_spread'][0]))
+            self._legs[tenor] = legs
+        return legs
+
+    def _tenor_order(self) -> np.ndarray:
+        """Row order for export: calendar order, unresolvable tenors last by name."""
+        return np.array(sorted(range(len(self._tenors)),
+                               key=lambda r: (tenor_calendar.tenor_ordinal(self._tenors[r]), self._tenors[r])),
+                        dtype=np.intp)
+
+    # ------------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------------
+
+    def add_trade(self, qty: float, tenor: str, product: str, strategy: str) -> None:
+        """
+        Apply a fill: expand the tenor (cached per tenor string) and add each
+        leg to the summary and strategy breakdown.
+
+        Uses the same quantity rules as expand_spread/expand_tenor.
+        """
+        self._apply(qty, tenor, product, strategy, 1)
+
+    def remove_trade(self, qty: float, tenor: str, product: str, strategy: str) -> None:
+        """
+        Reverse a previously added trade (e.g., a cancelled fill).
+
+        Raises:
+        -------
+        ValueError : if the book holds no such (Product, Strategy) line, or
+        fewer live legs in the trade's tenors than the trade would remove
+        (the book is left unchanged)
+        """
+        self._apply(-float(qty), tenor, product, strategy, -1)
+
+    def _apply(self, qty: float, tenor: str, product: str, strategy: str, legs: int) -> None:
+        rows, leg_sign, divisor, is_spread = self._legs_for(tenor)
+        qty = float(qty)
+        base_qty = (1.0 if qty >= 0 else -1.0) * abs(qty) if is_spread else qty
+        leg_qty = leg_sign * base_qty / divisor
+
+        if legs < 0:
+            col = self._product_index.get(self.product_map.get(product, product))
+            if col is None or (product, strategy) not in self._key_index:
+                raise ValueError(f"Cannot remove {-qty:g} {tenor} {product} {strategy}: no such position line")
+            hit_rows, hits = np.unique(rows, return_counts=True)
+            if (self._leg_counts[hit_rows, col] + legs * hits < 0).any():
+                raise ValueError(f"Cannot remove {-qty:g} {tenor} {product} {strategy}: "
+                                 f"more legs than the book holds in those tenors")
+        col = self._product_column(self.product_map.get(product, product))
+        key = self._key_row(product, strategy)
+
+        # np.add.at: a spread such as J6/Q2-26 can hit the same tenor twice
+        np.add.at(self._summary[:, col], rows, leg_qty)
+        np.add.at(self._breakdown[key], rows, leg_qty)
+        np.add.at(self._leg_counts[:, col], rows, legs)
+        self.n_trades += 1
+
+    def add_positions(self, df_pos: pd.DataFrame) -> None:
+        """
+        Bulk-load pos_summary-format rows (Qty, Tenor, Product, Strategy)
+        with one columnar expansion and one scatter per array.
+        """
+        expanded = expand_position_frame(df_pos, self.product_map)
+        if len(expanded) == 0:
+            return
+
+        tenor_codes, tenor_uniques = pd.factorize(expanded['Tenor'])
+        tenor_rows = np.array([self._tenor_row(t) for t in tenor_uniques], dtype=np.intp)[tenor_codes]
+
+        product_codes, product_uniques = pd.factorize(expanded['Mapped_Product'])
+        cols = np.array([self._product_column(p) for p in product_uniques], dtype=np.intp)[product_codes]
+
+        key_frame = expanded[['Product', 'Strategy']]
+        key_codes, key_uniques = pd.factorize(pd.MultiIndex.from_frame(key_frame))
+        key_rows = np.array([self._key_row(p, s) for p, s in key_uniques], dtype=np.intp)[key_codes]
+
+        qty = expanded['Qty'].to_numpy(dtype=np.float64)
+        np.add.at(self._summary, (tenor_rows, cols), qty)
+        np.add.at(self._breakdown, (key_rows, tenor_rows), qty)
+        np.add.at(self._leg_counts, (tenor_rows, cols), 1)
+        self.n_trades += len(df_pos)
+
+    @classmethod
+    def from_positions(cls, pos_summary_file: str, product_map: Optional[Dict[str, str]] = None) -> 'DeltaBook':
+        """Build a book from a pos_summary.csv file."""
+        book = cls(product_map)
+        book.add_positions(pd.read_csv(pos_summary_file))
+        return book
+
+    def snapshot(self) -> 'DeltaBook':
+        """Independent copy of the book (later fills do not affect it)."""
+        return copy.deepcopy(self)
+
+    # ------------------------------------------------------------------------
+    # Queries & export
+    # ------------------------------------------------------------------------
+
+    def summary_frame(self) -> pd.DataFrame:
+        """
+        Tenor x Mapped_Product table in the create_delta_summary format
+        (delta_summary.csv): calendar-ordered tenors, SUMMARY_PRODUCTS columns.
+
+        Only tenors and products with live legs are included: a tenor whose
+        trades were all removed is dropped, while one whose live trades net
+        to zero keeps its row of zeros (as create_delta_summary does).
+        """
+        live = self._leg_counts[:len(self._tenors), :len(self._products)] > 0
+        order = self._tenor_order()
+        order = order[live[order].any(axis=1)]
+        products = [p for p in SUMMARY_PRODUCTS if p in self._product_index
+                    and live[:, self._product_index[p]].any()]
+        cols = [self._product_index[p] for p in products]
+
+        summary_df = pd.DataFrame(
+            self._summary[np.ix_(order, cols)],
+            index=pd.Index(np.array(self._tenors, dtype=object)[order], name='Tenor'),
+            columns=pd.Index(products, name='Mapped_Product'),
+        )
+        return summary_df
+
+    def positions_frame(self, tol: float = 1e-10) -> pd.DataFrame:
+        """
+        Net strategy breakdown in the delta_positions.csv format
+        (Qty, Tenor, Product, Mapped_Product, Strategy), one row per non-zero
+        (Product, Strategy, Tenor) cell.
+        """
+        order = self._tenor_order()
+        block = self._breakdown[:len(self._keys)][:, order]
+        key_idx, tenor_idx = np.nonzero(np.abs(block) > tol)
+
+        tenors = np.array(self._tenors, dtype=object)[order]
+        products = np.array([k[0] for k in self._keys], dtype=object)
+        strategies = np.array([k[1] for k in self._keys], dtype=object)
+        mapped = np.array([self.product_map.get(p, p) for p in products], dtype=object)
+
+        return pd.DataFrame({
+            'Qty': block[key_idx, tenor_idx],
+            'Tenor': tenors[tenor_idx],
+            'Product': products[key_idx],
+            'Mapped_Product': mapped[key_idx],
+            'Strategy': strategies[key_idx],
+        })
+
+    def strategy_vector(self, strategy: str, mapped_product: str) -> pd.Series:
+        """Net quantity per tenor (calendar order) for one strategy within a mapped product."""
+        order = self._tenor_order()
+        rows = [self._key_index[k] for k in self._keys
+                if k[1] == strategy and self.product_map.get(k[0], k[0]) == mapped_product]
+        values = self._breakdown[rows][:, order].sum(axis=0) if rows else np.zeros(len(order))
+        return pd.Series(values, index=pd.Index(np.array(self._tenors, dtype=object)[order], name='Tenor'),
+                         name=strategy)
+
+    def to_csv(self, summary_file: str = 'delta_summary.csv', positions_file: Optional[str] = None) -> None:
+        """Write delta_summary.csv (and optionally the net delta_positions breakdown)."""
+        self.summary_frame().to_csv(summary_file)
+        if positions_file is not None:
+            self.positions_frame().to_csv(positions_file, index=False)
@@ -1,13 +1,19 @@
 """
 Position Tenor Expansion Module
 
-Expands contract tenors (quarterlies, halves, calendars, and spreads) into individual delta contracts
-using futures mappings and product mappings.
+Expands contract tenors (quarterlies, halves, calendars, seasons, strips and spreads) into individual
+delta contracts using the tenor calendar and product mappings.
 """
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
+
+import tenor_calendar
+from risk_engine.instrumentation import instrumented
+
+# Mapped products in delta_summary column order
+SUMMARY_PRODUCTS = ['HTT', 'HOUBR', 'CLBR', 'WDF', 'LH']
 
 # ============================================================================
 # TENOR MAPPINGS & PRODUCT MAPPINGS
@@ -15,55 +21,35 @@ from typing import Dict, List, Tuple, Optional
 
 def build_tenor_mappings():
     """
-    Build all tenor expansion dictionaries.
+    Build explicit tenor expansion dictionaries for 2026-2028.
+    
+    Expansion no longer needs these maps (tenors for any year resolve through
+    tenor_calendar); they are kept for callers that inspect or override them.
     
     Returns:
     --------
-    quarterly_map, half_year_map, calendar_map, futures_months
+    quarterly_map, half_year_map, calendar_map
     
     Futures Month Mapping (all 12 months):
     F=Jan, G=Feb, H=March, J=April, K=May, M=June,
     N=July, Q=Aug, U=Sep, V=Oct, X=Nov, Z=Dec
     """
-    
-    # Futures month codes in order (all 12 unique letters per year)
-    # F=Jan, G=Feb, H=Mar, J=Apr, K=May, M=Jun,
-    # N=Jul, Q=Aug, U=Sep, V=Oct, X=Nov, Z=Dec
-    futures_sequence = ['F', 'G', 'H', 'J', 'K', 'M', 'N', 'Q', 'U', 'V', 'X', 'Z']  # 12 months per year
-    
-    # Build quarterly mappings for each year (CALENDAR-BASED)
-    # Q1 = F, G, H (Jan, Feb, Mar)
-    # Q2 = J, K, M (Apr, May, Jun)
-    # Q3 = N, Q, U (Jul, Aug, Sep)
-    # Q4 = V, X, Z (Oct, Nov, Dec)
-    
     quarterly_map = {}
     half_year_map = {}
     calendar_map = {}
     
-    # Generate for multiple years (2026-2028)
+    # Generate for multiple years (2026-2028), CALENDAR-BASED:
+    # Q1=Jan-Mar, ..., Q4=Oct-Dec; H1=Jan-Jun, H2=Jul-Dec; Cal=Jan-Dec
     for year_code_int in range(6, 9):  # Years 2026, 2027, 2028
         year_code = str(year_code_int)
-        next_year_code = str(year_code_int + 1)
-        
-        # Quarterlies (CALENDAR-BASED: Q1=Jan-Mar, Q2=Apr-Jun, Q3=Jul-Sep, Q4=Oct-Dec)
-        quarterly_map[f'Q1-2{year_code}'] = [f'F{year_code}', f'G{year_code}', f'H{year_code}']
-        quarterly_map[f'Q2-2{year_code}'] = [f'J{year_code}', f'K{year_code}', f'M{year_code}']
-        quarterly_map[f'Q3-2{year_code}'] = [f'N{year_code}', f'Q{year_code}', f'U{year_code}']
-        quarterly_map[f'Q4-2{year_code}'] = [f'V{year_code}', f'X{year_code}', f'Z{year_code}']
-        
-        # Half-years (CALENDAR-BASED)
-        # H1 = first 6 months = Jan-Jun = F, G, H, J, K, M
-        # H2 = second 6 months = Jul-Dec = N, Q, U, V, X, Z
-        half_year_map[f'H1-2{year_code}'] = [f'F{year_code}', f'G{year_code}', f'H{year_code}', 
-                                              f'J{year_code}', f'K{year_code}', f'M{year_code}']
-        half_year_map[f'H2-2{year_code}'] = [f'N{year_code}', f'Q{year_code}', f'U{year_code}',
-                                              f'V{year_code}', f'X{year_code}', f'Z{year_code}']
-        
-        # Calendars (all 12 months)
-        calendar_map[f'Cal2{year_code}'] = [f'F{year_code}', f'G{year_code}', f'H{year_code}', f'J{year_code}',
-                                             f'K{year_code}', f'M{year_code}', f'N{year_code}', f'Q{year_code}',
-                                             f'U{year_code}', f'V{year_code}', f'X{year_code}', f'Z{year_code}']
+        for quarter in range(1, 5):
+            key = f'Q{quarter}-2{year_code}'
+            quarterly_map[key] = list(tenor_calendar.expand_tenor_codes(key))
+        for half in range(1, 3):
+            key = f'H{half}-2{year_code}'
+            half_year_map[key] = list(tenor_calendar.expand_tenor_codes(key))
+        key = f'Cal2{year_code}'
+        calendar_map[key] = list(tenor_calendar.expand_tenor_codes(key))
     
     return quarterly_map, half_year_map, calendar_map
 
@@ -90,33 +76,44 @@ def build_product_mapping():
     return product_map
 
 
+def load_product_mapping(product_mapping_file: str = 'product_mapping.csv') -> Dict[str, str]:
+    """
+    Load the product name to mapped product mapping from product_mapping.csv.
+    
+    Parameters:
+    -----------
+    product_mapping_file : str
+        CSV with columns: Product, Mapping
+    
+    Returns:
+    --------
+    product_map : Dict[str, str] (in file order)
+    """
+    mapping_df = pd.read_csv(product_mapping_file, encoding='utf-8-sig')
+    return dict(zip(mapping_df['Product'], mapping_df['Mapping']))
+
+
 # ============================================================================
 # TENOR TYPE DETECTION & PARSING
 # ============================================================================
 
 def parse_tenor_type(tenor_str: str) -> str:
     """
-    Detect tenor type: 'outright', 'quarterly', 'half', 'calendar', or 'spread'
+    Detect tenor type: 'outright', 'quarterly', 'half', 'calendar', 'season', 'strip' or 'spread'
     
     Parameters:
     -----------
     tenor_str : str
-        Tenor string (e.g., 'H6', 'Q2-26', 'Cal27', 'Z6/Z7', 'J6/Q2-26')
+        Tenor string (e.g., 'H6', 'Q2-26', 'Cal27', 'Sum26', 'F7-H7', 'Z6/Z7', 'J6/Q2-26')
     
     Returns:
     --------
-    str : tenor type
-    """
-    if '/' in tenor_str:
-        return 'spread'
-    elif tenor_str.startswith('Q') and '-' in tenor_str:
-        return 'quarterly'
-    elif tenor_str.startswith('H') and '-' in tenor_str:
-        return 'half'
-    elif tenor_str.startswith('Cal'):
-        return 'calendar'
-    else:
+    str : tenor type (unrecognized strings are treated as outrights)
+    """
+    tenor_type = tenor_calendar.tenor_type(tenor_str)
+    if tenor_type == 'unknown':
         return 'outright'
+    return tenor_type
 
 
 # ============================================================================
@@ -154,8 +151,9 @@ def normalize_tenor(tenor_str: str) -> str:
         return tenor_str
 
 
-def expand_tenor_structure(tenor_str: str, quarterly_map: Dict, half_year_map: Dict, 
-                           calendar_map: Dict) -> List[str]:
+def expand_tenor_structure(tenor_str: str, quarterly_map: Optional[Dict] = None,
+                           half_year_map: Optional[Dict] = None,
+                           calendar_map: Optional[Dict] = None) -> List[str]:
     """
     Expand a tenor and return just the list of futures tenors (without quantities).
     
@@ -164,108 +162,54 @@ def expand_tenor_structure(tenor_str: str, quarterly_map: Dict, half_year_map: D
     Parameters:
     -----------
     tenor_str : str
-        Tenor string (e.g., 'H6', 'Q2-26', 'Cal27')
-    quarterly_map, half_year_map, calendar_map : Dict
-        Tenor expansion mappings
+        Tenor string (e.g., 'H6', 'Q2-26', 'Cal27', 'Sum26', 'F7-H7')
+    quarterly_map, half_year_map, calendar_map : Dict, optional
+        Explicit expansion overrides; tenors not found in them resolve
+        through tenor_calendar for any year
     
     Returns:
     --------
     List[str] : [tenor1, tenor2, ...] (just the tenor strings)
     """
-    tenor_type = parse_tenor_type(tenor_str)
-    
-    if tenor_type == 'outright':
-        return [tenor_str]
-    
-    elif tenor_type == 'quarterly':
-        normalized = normalize_tenor(tenor_str)
-        if normalized in quarterly_map:
-            return quarterly_map[normalized]
-        else:
-            return [tenor_str]
-    
-    elif tenor_type == 'half':
+    explicit_maps = {'quarterly': quarterly_map, 'half': half_year_map, 'calendar': calendar_map}
+    tenor_map = explicit_maps.get(parse_tenor_type(tenor_str))
+    if tenor_map is not None:
         normalized = normalize_tenor(tenor_str)
-        if normalized in half_year_map:
-            return half_year_map[normalized]
-        else:
-            return [tenor_str]
+        if normalized in tenor_map:
+            return list(tenor_map[normalized])
     
-    elif tenor_type == 'calendar':
-        normalized = normalize_tenor(tenor_str)
-        if normalized in calendar_map:
-            return calendar_map[normalized]
-        else:
-            return [tenor_str]
-    
-    else:
-        return [tenor_str]
+    # Unresolvable tenors come back unexpanded
+    return list(tenor_calendar.expand_tenor_codes(tenor_str))
 
 
-def expand_tenor(tenor_str: str, qty: float, quarterly_map: Dict, half_year_map: Dict, 
-                 calendar_map: Dict) -> List[Tuple[float, str]]:
+def expand_tenor(tenor_str: str, qty: float, quarterly_map: Optional[Dict] = None,
+                 half_year_map: Optional[Dict] = None,
+                 calendar_map: Optional[Dict] = None) -> List[Tuple[float, str]]:
     """
     Expand a single tenor to list of (quantity, futures_tenor) tuples.
     
+    Every futures tenor gets the full quantity (no division).
+    
     Parameters:
     -----------
     tenor_str : str
         Tenor string (e.g., 'H6', 'Q2-26', 'Cal27')
     qty : float
         Quantity
-    quarterly_map, half_year_map, calendar_map : Dict
-        Tenor expansion mappings
+    quarterly_map, half_year_map, calendar_map : Dict, optional
+        Explicit expansion overrides (see expand_tenor_structure)
     
     Returns:
     --------
     List[Tuple[float, str]] : [(qty, tenor), ...]
     """
-    tenor_type = parse_tenor_type(tenor_str)
-    
-    if tenor_type == 'outright':
-        return [(qty, tenor_str)]
-    
-    elif tenor_type == 'quarterly':
-        # Normalize and build the map key: Q2-26 -> Q2-26
-        normalized = normalize_tenor(tenor_str)
-        # After normalize_tenor, we should have Q2-26 format
-        # The keys in quarterly_map are like Q1-26, Q2-26, etc.
-        if normalized in quarterly_map:
-            futures_list = quarterly_map[normalized]
-            # Assign full quantity to each tenor (no division)
-            return [(qty, f) for f in futures_list]
-        else:
-            return [(qty, tenor_str)]  # Fallback
-    
-    elif tenor_type == 'half':
-        # Normalize and build the map key: H2-26 -> H2-26
-        normalized = normalize_tenor(tenor_str)
-        # After normalize_tenor, we should have H2-26 format
-        # The keys in half_year_map are like H1-26, H2-26, etc.
-        if normalized in half_year_map:
-            futures_list = half_year_map[normalized]
-            # Assign full quantity to each tenor (no division)
-            return [(qty, f) for f in futures_list]
-        else:
-            return [(qty, tenor_str)]  # Fallback
-    
-    elif tenor_type == 'calendar':
-        # Normalize tenor name: Cal27 or Cal2027 -> Cal27
-        normalized = normalize_tenor(tenor_str)
-        # The keys in calendar_map are like Cal26, Cal27, etc.
-        if normalized in calendar_map:
-            futures_list = calendar_map[normalized]
-            # Assign full quantity to each tenor (no division)
-            return [(qty, f) for f in futures_list]
-        else:
-            return [(qty, tenor_str)]  # Fallback
-    
-    else:
-        return [(qty, tenor_str)]
+    futures_list = expand_tenor_structure(tenor_str, quarterly_map, half_year_map, calendar_map)
+    return [(qty, f) for f in futures_list]
 
 
-def expand_spread(spread_str: str, qty: float, quarterly_map: Dict, half_year_map: Dict,
-                  calendar_map: Dict) -> List[Tuple[float, str]]:
+def expand_spread(spread_str: str, qty: float, quarterly_map: Optional[Dict] = None,
+                  half_year_map: Optional[Dict] = None,
+                  calendar_map: Optional[Dict] = None) -> List[Tuple[float, str]]:
     """
     Expand a spread intelligently based on tenor counts.
     
@@ -286,8 +230,8 @@ def expand_spread(spread_str: str, qty: float, quarterly_map: Dict, half_year_ma
         Spread string (e.g., 'Z6/Z7', 'J6/Q2-26')
     qty : float
         Quantity for the spread (preserves sign)
-    quarterly_map, half_year_map, calendar_map : Dict
-        Tenor expansion mappings
+    quarterly_map, half_year_map, calendar_map : Dict, optional
+        Explicit expansion overrides (see expand_tenor_structure)
     
     Returns:
     --------
@@ -333,10 +277,256 @@ def expand_spread(spread_str: str, qty: float, quarterly_map: Dict, half_year_ma
     return result
 
 
+# ============================================================================
+# EXPANSION TABLE (one entry per distinct tenor string)
+# ============================================================================
+
+def build_expansion_table(tenors, quarterly_map: Optional[Dict] = None,
+                          half_year_map: Optional[Dict] = None,
+                          calendar_map: Optional[Dict] = None) -> Dict[str, np.ndarray]:
+    """
+    Precompute the (leg, futures tenor, weight) explosion for each distinct tenor.
+    
+    Each tenor string is parsed once. The result is a flat index table: the
+    entries for tenors[k] live in rows offsets[k]:offsets[k+1].
+    
+    The quantity for an entry is ``leg_sign * q / divisor`` where ``q`` is the
+    position quantity for outrights/quarterlies/halves/calendars and
+    ``sign(qty) * |qty|`` for spreads. This reproduces the arithmetic of
+    expand_tenor/expand_spread exactly, so results are bit-identical.
+    
+    Parameters:
+    -----------
+    tenors : sequence of str
+        Distinct tenor strings (e.g., the uniques from pd.factorize)
+    quarterly_map, half_year_map, calendar_map : Dict, optional
+        Explicit expansion overrides (see expand_tenor_structure)
+    
+    Returns:
+    --------
+    Dict with keys:
+        offsets : int64 array (len(tenors) + 1)
+        futures_tenor : object array of expanded futures tenors
+        futures_month : int64 array of month ordinals (tenor_calendar.UNKNOWN_ORDINAL if unresolvable)
+        leg_sign : float64 array (+1.0 first leg, -1.0 second leg)
+        divisor : float64 array (1.0, or leg tenor count for divided spread legs)
+        is_spread : bool array (len(tenors))
+    """
+    offsets = [0]
+    futures_tenor = []
+    leg_sign = []
+    divisor = []
+    is_spread = []
+    
+    for tenor_str in tenors:
+        if parse_tenor_type(tenor_str) == 'spread':
+            parts = tenor_str.split('/')
+            if len(parts) != 2:
+                raise ValueError(f"Invalid spread format: {tenor_str}")
+            leg1_tenors = expand_tenor_structure(parts[0], quarterly_map, half_year_map, calendar_map)
+            leg2_tenors = expand_tenor_structure(parts[1], quarterly_map, half_year_map, calendar_map)
+            num_leg1 = len(leg1_tenors)
+            num_leg2 = len(leg2_tenors)
+            
+            # Same rules as expand_spread: only the leg with more tenors is divided
+            div1 = float(num_leg1) if num_leg1 > num_leg2 else 1.0
+            div2 = float(num_leg2) if num_leg2 > num_leg1 else 1.0
+            
+            futures_tenor.extend(leg1_tenors)
+            leg_sign.extend([1.0] * num_leg1)
+            divisor.extend([div1] * num_leg1)
+            futures_tenor.extend(leg2_tenors)
+            leg_sign.extend([-1.0] * num_leg2)
+            divisor.extend([div2] * num_leg2)
+            is_spread.append(True)
+        else:
+            # Outrights and strips carry the full quantity on every futures tenor
+            expanded = expand_tenor_structure(tenor_str, quarterly_map, half_year_map, calendar_map)
+            futures_tenor.extend(expanded)
+            leg_sign.extend([1.0] * len(expanded))
+            divisor.extend([1.0] * len(expanded))
+            is_spread.append(False)
+        
+        offsets.append(len(futures_tenor))
+    
+    return {
+        'offsets': np.asarray(offsets, dtype=np.int64),
+        'futures_tenor': np.asarray(futures_tenor, dtype=object),
+        'futures_month': np.asarray([tenor_calendar.tenor_ordinal(t) for t in futures_tenor], dtype=np.int64),
+        'leg_sign': np.asarray(leg_sign, dtype=np.float64),
+        'divisor': np.asarray(divisor, dtype=np.float64),
+        'is_spread': np.asarray(is_spread, dtype=bool),
+    }
+
+
 # ============================================================================
 # MAIN EXPANSION FUNCTION
 # ============================================================================
 
+def _explode_positions(df_pos: pd.DataFrame) -> Tuple[Dict[str, np.ndarray], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Explode positions against the expansion table.
+    
+    Returns (table, entry_idx, row_idx, exp_qty): output row k is table entry
+    entry_idx[k] of input position row_idx[k], with quantity exp_qty[k].
+    """
+    # Parse each distinct tenor once
+    tenor_codes, tenor_uniques = pd.factorize(df_pos['Tenor'])
+    table = build_expansion_table(tenor_uniques)
+    offsets = table['offsets']
+    
+    # Explode: one output row per (position, table entry)
+    counts = np.diff(offsets)[tenor_codes]
+    row_idx = np.repeat(np.arange(len(df_pos)), counts)
+    out_starts = np.cumsum(counts) - counts
+    entry_idx = offsets[tenor_codes][row_idx] + (np.arange(len(row_idx)) - np.repeat(out_starts, counts))
+    
+    # Quantities: spreads use sign(qty) * |qty| like expand_spread, others use qty as-is
+    qty = df_pos['Qty'].to_numpy(dtype=np.float64)
+    spread_qty = np.where(qty >= 0, 1.0, -1.0) * np.abs(qty)
+    base_qty = np.where(table['is_spread'][tenor_codes], spread_qty, qty)
+    exp_qty = table['leg_sign'][entry_idx] * base_qty[row_idx] / table['divisor'][entry_idx]
+    
+    return table, entry_idx, row_idx, exp_qty
+
+
+@instrumented('expansion')
+def expand_position_frame(df_pos: pd.DataFrame, product_map: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    Expand a pos_summary-format DataFrame to individual futures contracts.
+    
+    Columnar implementation: every distinct tenor is parsed once into an
+    expansion table, then all positions are exploded with a single NumPy
+    repeat/gather. Row order matches the row-by-row expansion.
+    
+    Parameters:
+    -----------
+    df_pos : pd.DataFrame
+        Positions with columns: Qty, Tenor, Product, Strategy
+    product_map : Dict[str, str], optional
+        Product -> Mapped_Product (defaults to build_product_mapping())
+    
+    Returns:
+    --------
+    delta_positions_df : pd.DataFrame
+        Expanded positions with columns: Qty, Tenor, Product, Mapped_Product, Strategy
+    """
+    if product_map is None:
+        product_map = build_product_mapping()
+    
+    table, entry_idx, row_idx, exp_qty = _explode_positions(df_pos)
+    
+    # Product mapping: one lookup per distinct product
+    product_codes, product_uniques = pd.factorize(df_pos['Product'])
+    mapped_uniques = np.asarray([product_map.get(p, p) for p in product_uniques], dtype=object)
+    product_uniques = np.asarray(product_uniques, dtype=object)
+    
+    strategies = df_pos['Strategy'].to_numpy(dtype=object)
+    
+    delta_positions_df = pd.DataFrame({
+        'Qty': exp_qty,
+        'Tenor': table['futures_tenor'][entry_idx],
+        'Product': product_uniques[product_codes][row_idx],
+        'Mapped_Product': mapped_uniques[product_codes][row_idx],
+        'Strategy': strategies[row_idx],
+    })
+    return delta_positions_df
+
+
+def expand_position_frame_encoded(df_pos: pd.DataFrame,
+                                  product_map: Optional[Dict[str, str]] = None
+                                  ) -> Tuple[pd.DataFrame, Dict[str, np.ndarray]]:
+    """
+    Expand positions into a compact int-coded representation.
+    
+    Same rows as expand_position_frame, but the label columns are int32 codes
+    into per-column code tables, so downstream vector builders can scatter
+    with np.bincount/np.add.at instead of string masks.
+    
+    Code table order:
+    - Tenor: calendar order (unresolvable tenors last)
+    - Product / Mapped_Product: product_map order, then unmapped products as seen
+    - Strategy: order of first appearance
+    
+    Parameters:
+    -----------
+    df_pos : pd.DataFrame
+        Positions with columns: Qty, Tenor, Product, Strategy
+    product_map : Dict[str, str], optional
+        Product -> Mapped_Product (e.g., load_product_mapping(); defaults to build_product_mapping())
+    
+    Returns:
+    --------
+    coded_df : pd.DataFrame
+        Columns: Qty (float64), Tenor, Product, Mapped_Product, Strategy (int32 codes)
+    codes : Dict[str, np.ndarray]
+        Column name -> object array of labels (codes index into it)
+    """
+    if product_map is None:
+        product_map = build_product_mapping()
+    
+    table, entry_idx, row_idx, exp_qty = _explode_positions(df_pos)
+    
+    # Tenor codes: label each table entry once, then gather
+    futures = table['futures_tenor']
+    tenor_labels = sorted(set(futures), key=lambda t: (tenor_calendar.tenor_ordinal(t), t))
+    tenor_lookup = {t: i for i, t in enumerate(tenor_labels)}
+    entry_tenor_codes = np.array([tenor_lookup[t] for t in futures], dtype=np.int32)
+    
+    # Product codes follow the mapping table so codes are stable across books
+    product_labels = list(product_map)
+    product_labels += [p for p in pd.unique(df_pos['Product']) if p not in product_map]
+    mapped_labels = list(dict.fromkeys(product_map.get(p, p) for p in product_labels))
+    mapped_lookup = {m: i for i, m in enumerate(mapped_labels)}
+    product_to_mapped = np.array([mapped_lookup[product_map.get(p, p)] for p in product_labels], dtype=np.int32)
+    
+    position_products = pd.Index(product_labels).get_indexer(df_pos['Product']).astype(np.int32)
+    position_strategies, strategy_labels = pd.factorize(df_pos['Strategy'])
+    
+    coded_df = pd.DataFrame({
+        'Qty': exp_qty,
+        'Tenor': entry_tenor_codes[entry_idx],
+        'Product': position_products[row_idx],
+        'Mapped_Product': product_to_mapped[position_products][row_idx],
+        'Strategy': position_strategies.astype(np.int32)[row_idx],
+    })
+    codes = {
+        'Tenor': np.asarray(tenor_labels, dtype=object),
+        'Product': np.asarray(product_labels, dtype=object),
+        'Mapped_Product': np.asarray(mapped_labels, dtype=object),
+        'Strategy': np.asarray(strategy_labels, dtype=object),
+    }
+    return coded_df, codes
+
+
+def decode_positions(coded_df: pd.DataFrame, codes: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """Convert an int-coded frame back to the delta_positions string layout."""
+    decoded = coded_df.copy()
+    for column, labels in codes.items():
+        decoded[column] = labels[coded_df[column].to_numpy()]
+    return decoded
+
+
+def strategy_tenor_cube(coded_df: pd.DataFrame, codes: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Net quantity cube (strategy x mapped product x tenor) from an int-coded frame.
+    
+    One np.bincount over the flattened code index replaces a boolean mask
+    per strategy x product.
+    
+    Returns:
+    --------
+    np.ndarray : shape (len(codes['Strategy']), len(codes['Mapped_Product']), len(codes['Tenor']))
+    """
+    shape = (len(codes['Strategy']), len(codes['Mapped_Product']), len(codes['Tenor']))
+    flat_idx = np.ravel_multi_index(
+        (coded_df['Strategy'].to_numpy(), coded_df['Mapped_Product'].to_numpy(), coded_df['Tenor'].to_numpy()),
+        shape,
+    )
+    cube = np.bincount(flat_idx, weights=coded_df['Qty'].to_numpy(), minlength=int(np.prod(shape)))
+    return cube.reshape(shape)
+
+
 def expand_positions(pos_summary_file: str) -> pd.DataFrame:
     """
     Read position summary and expand all tenors to individual futures contracts.
@@ -351,13 +541,133 @@ def expand_positions(pos_summary_file: str) -> pd.DataFrame:
     delta_positions_df : pd.DataFrame
         Expanded positions with columns: Qty, Tenor, Product, Mapped_Product, Strategy
     """
+    df_pos = pd.read_csv(pos_summary_file)
+    return expand_position_frame(df_pos)
+
+
+def iter_expanded_chunks(pos_summary_file: str, chunksize: int = 100_000,
+                         product_map: Optional[Dict[str, str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Stream a pos_summary-format file and yield expanded positions chunk by chunk.
     
-    # Build mappings
-    quarterly_map, half_year_map, calendar_map = build_tenor_mappings()
-    product_map = build_product_mapping()
+    Only one input chunk and its expansion are held in memory at a time.
+    
+    Parameters:
+    -----------
+    pos_summary_file : str
+        Path to pos_summary.csv
+    chunksize : int
+        Input rows per chunk
+    product_map : Dict[str, str], optional
+        Product -> Mapped_Product (defaults to build_product_mapping())
+    
+    Yields:
+    -------
+    pd.DataFrame : expanded rows (Qty, Tenor, Product, Mapped_Product, Strategy)
+    """
+    if product_map is None:
+        product_map = build_product_mapping()
+    
+    with pd.read_csv(pos_summary_file, chunksize=chunksize) as reader:
+        for df_chunk in reader:
+            yield expand_position_frame(df_chunk, product_map)
+
+
+def iter_summary_chunks(pos_summary_file: str, chunksize: int = 100_000,
+                        product_map: Optional[Dict[str, str]] = None) -> Iterator[pd.Series]:
+    """
+    Stream a pos_summary-format file and yield per-chunk (Tenor, Mapped_Product) net quantities.
+    
+    For callers that only need the aggregate: each yielded Series is small
+    (distinct tenors x products) and partial results can be summed with
+    Series.add(..., fill_value=0).
+    
+    Yields:
+    -------
+    pd.Series : Qty indexed by (Tenor, Mapped_Product)
+    """
+    for expanded in iter_expanded_chunks(pos_summary_file, chunksize, product_map):
+        yield expanded.groupby(['Tenor', 'Mapped_Product'])['Qty'].sum()
+
+
+def stream_expand_positions(pos_summary_file: str, output_file: Optional[str] = None,
+                            chunksize: int = 100_000,
+                            product_map: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    Expand a position file in bounded memory and fold it into the delta summary.
+    
+    Each chunk is expanded, optionally appended to output_file (delta_positions.csv
+    format), and reduced to (Tenor, Mapped_Product) totals before the next chunk
+    is read, so peak memory depends on chunksize rather than file size.
+    
+    Parameters:
+    -----------
+    pos_summary_file : str
+        Path to pos_summary.csv
+    output_file : str, optional
+        Path for the expanded rows (written with a header, then appended)
+    chunksize : int
+        Input rows per chunk
+    product_map : Dict[str, str], optional
+        Product -> Mapped_Product (defaults to build_product_mapping())
+    
+    Returns:
+    --------
+    summary_df : pd.DataFrame
+        Same table as create_delta_summary(expand_positions(pos_summary_file))
+    """
+    totals = None
+    first_chunk = True
+    
+    for expanded in iter_expanded_chunks(pos_summary_file, chunksize, product_map):
+        if output_file is not None:
+            expanded.to_csv(output_file, mode='w' if first_chunk else 'a', header=first_chunk, index=False)
+            first_chunk = False
+        
+        chunk_totals = expanded.groupby(['Tenor', 'Mapped_Product'])['Qty'].sum()
+        totals = chunk_totals if totals is None else totals.add(chunk_totals, fill_value=0)
+    
+    if totals is None:
+        totals = pd.Series([], index=pd.MultiIndex.from_arrays([[], []], names=['Tenor', 'Mapped_Product']),
+                           name='Qty', dtype=np.float64)
+    
+    # Totals are already one row per (Tenor, Mapped_Product); grouping again is a no-op
+    return create_delta_summary(totals.reset_index())
+
+
+def expand_positions_encoded(pos_summary_file: str,
+                             product_mapping_file: str = 'product_mapping.csv'
+                             ) -> Tuple[pd.DataFrame, Dict[str, np.ndarray]]:
+    """
+    Read position summary and expand it to the int-coded representation,
+    mapping products with product_mapping.csv.
     
-    # Load position summary
+    Returns:
+    --------
+    coded_df, codes : see expand_position_frame_encoded
+    """
     df_pos = pd.read_csv(pos_summary_file)
+    return expand_position_frame_encoded(df_pos, load_product_mapping(product_mapping_file))
+
+
+def expand_positions_rowwise(df_pos: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reference row-by-row expansion (one expand_tenor/expand_spread call per position).
+    
+    Kept for verification and benchmarking of expand_position_frame.
+    
+    Parameters:
+    -----------
+    df_pos : pd.DataFrame
+        Positions with columns: Qty, Tenor, Product, Strategy
+    
+    Returns:
+    --------
+    delta_positions_df : pd.DataFrame
+        Expanded positions with columns: Qty, Tenor, Product, Mapped_Product, Strategy
+    """
+    
+    product_map = build_product_mapping()
     
     # List to collect all expanded rows
     expanded_rows = []
@@ -376,9 +686,9 @@ def expand_positions(pos_summary_file: str) -> pd.DataFrame:
         tenor_type = parse_tenor_type(tenor_str)
         
         if tenor_type == 'spread':
-            expanded = expand_spread(tenor_str, qty, quarterly_map, half_year_map, calendar_map)
+            expanded = expand_spread(tenor_str, qty)
         else:
-            expanded = expand_tenor(tenor_str, qty, quarterly_map, half_year_map, calendar_map)
+            expanded = expand_tenor(tenor_str, qty)
         
         # Add rows for each expanded tenor
         for exp_qty, exp_tenor in expanded:
@@ -398,6 +708,7 @@ def expand_positions(pos_summary_file: str) -> pd.DataFrame:
 # SUMMARY TABLE CREATION
 # ============================================================================
 
+@instrumented('summary')
 def create_delta_summary(delta_positions_df: pd.DataFrame) -> pd.DataFrame:
     """
     Create a pivot table summary: rows=tenors, columns=products, values=quantities
@@ -424,37 +735,15 @@ def create_delta_summary(delta_positions_df: pd.DataFrame) -> pd.DataFrame:
         fill_value=0  # Fill zeros for missing combinations
     )
     
-    # Define all possible products for consistent column order
-    all_products = ['HTT', 'HOUBR', 'CLBR', 'WDF', 'LH']
-    
     # Reorder columns to match desired order, only include columns that exist
-    existing_products = [p for p in all_products if p in summary_df.columns]
+    existing_products = [p for p in SUMMARY_PRODUCTS if p in summary_df.columns]
     summary_df = summary_df[existing_products]
     
-    # Sort tenor rows in chronological order
-    # Define sort order for month codes and year codes
-    # F=Jan, G=Feb, H=Mar, J=Apr, K=May, M=Jun,
-    # N=Jul, Q=Aug, U=Sep, V=Oct, X=Nov, Z=Dec
-    month_order = {'F': 0, 'G': 1, 'H': 2, 'J': 3, 'K': 4, 'M': 5, 
-                   'N': 6, 'Q': 7, 'U': 8, 'V': 9, 'X': 10, 'Z': 11}
-    
-    def tenor_sort_key(tenor):
-        """Extract sort key from tenor string like 'J6' or 'F7'"""
-        if len(tenor) < 2:
-            return (9999, 9999)  # Invalid tenors go to the end
-        
-        month_letter = tenor[0]
-        try:
-            year_code = int(tenor[1:])
-            year = 2000 + year_code
-            month_idx = month_order.get(month_letter, 10)
-            return (year, month_idx)
-        except ValueError:
-            return (9999, 9999)  # Invalid year code
-    
-    # Create a sorted index
-    sorted_tenors = sorted(summary_df.index, key=tenor_sort_key)
-    summary_df = summary_df.loc[sorted_tenors]
+    # Sort tenor rows in chronological order by month ordinal
+    # (unresolvable tenors go to the end, keeping their relative order)
+    month_keys = np.fromiter((tenor_calendar.tenor_ordinal(t) for t in summary_df.index),
+                             dtype=np.int64, count=len(summary_df.index))
+    summary_df = summary_df.iloc[np.argsort(month_keys, kind='stable')]
     
     return summary_df
 
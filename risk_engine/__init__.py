@@ -0,0 +1,55 @@
+"""
+risk_engine
+
+EWMA covariances, Q risk, marginal contributions, factor decomposition and
+hedge recommendations for futures books (q_risk_report.ipynb and
+position_mc_report_clean.ipynb as a library).
+
+Submodules are imported on first attribute access, so `import risk_engine`
+does not pull in numpy or pandas.
+"""
+
+__version__ = '0.1.0'
+
+# Public name -> submodule
+_EXPORTS = {
+    'compute_ewma_covariance': 'ewma',
+    'compute_bucket_covariances': 'ewma',
+    'compute_multi_product_ewma_covariance': 'ewma',
+    'compute_q_risk': 'q_risk',
+    'compute_mc_to_total': 'q_risk',
+    'compute_bucket_summary': 'q_risk',
+    'build_factor_matrix_bucket': 'factors',
+    'compute_factor_risk_metrics': 'factors',
+    'compute_position_mc_table': 'mc_engine',
+    'compute_multi_product_mc_table': 'mc_engine',
+    'recommend_portfolio_hedge': 'hedge_engine',
+    'recommend_hedge': 'hedge_engine',
+    'HedgeOptimizer': 'hedge_optimizer',
+    'CovarianceModel': 'covariance_model',
+    'FactorCovariance': 'factor_model',
+    'fit_factor_covariance': 'factor_model',
+    'parametric_var_es': 'var_es',
+    'historical_var_es': 'var_es',
+    'MonteCarloSimulator': 'monte_carlo',
+    'evaluate_scenarios': 'stress',
+    'MarketDataStore': 'market_data',
+    'record_run': 'instrumentation',
+    'NodeMap': 'node_map',
+    'RiskEngine': 'pipeline',
+}
+
+__all__ = sorted(_EXPORTS) + ['__version__']
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        import importlib
+        value = getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
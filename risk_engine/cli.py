@@ -0,0 +1,123 @@
+"""
+Command line interface
+
+    risk-engine run --data data_.csv --holidays holidays.csv \\
+        --summary delta_summary.csv --positions delta_positions.csv --out reports
+
+Writes the notebook tables as CSVs. Several books can be given as repeated
+--summary / --positions pairs; they share one RiskEngine, so market data,
+returns and covariances are built once for the whole run.
+
+--manifest writes a JSON run manifest with the wall / CPU time, memory and
+sizes of every stage (see risk_engine.instrumentation); -v logs each stage as
+it finishes, -q keeps only warnings.
+"""
+
+import argparse
+import os
+from typing import List, Optional
+
+REPORTS = ('q_risk', 'position_mc', 'var', 'monte_carlo', 'stress')
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='risk-engine', description='Q risk, MC and hedge reports')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='Compute the report tables and write them as CSVs')
+    run.add_argument('--data', default='data_.csv', help='Wide price file (date + {product}_A{n} columns)')
+    run.add_argument('--holidays', default='holidays.csv', help='Holiday file (M/D/YYYY per line)')
+    run.add_argument('--cache-dir', default='.market_cache', help='Market data cache directory')
+    run.add_argument('--summary', action='append', required=True,
+                     help='delta_summary CSV (repeat for several books)')
+    run.add_argument('--positions', action='append', default=[],
+                     help='delta_positions CSV, paired with --summary in order')
+    run.add_argument('--product', default='clbr', help='Data product for the Q risk report')
+    run.add_argument('--hedge-products', nargs='+', default=None, help='Hedge products (default HTT CLBR)')
+    run.add_argument('--top-n', type=int, default=20, help='Number of hedge recommendations')
+    run.add_argument('--init-obs', type=int, default=60, help='Observations for the EWMA initial covariance')
+    run.add_argument('--workers', type=int, default=None,
+                     help='Processes for per-product covariances (default: one per CPU; 1: serial)')
+    run.add_argument('--factor-model', choices=('pca', 'lsc', 'bucket'), default=None,
+                     help="Factor covariance B F B' + D for the multi-product tables (default: dense)")
+    run.add_argument('--confidence', type=float, default=0.99, help='VaR / ES confidence level')
+    run.add_argument('--var-window', type=int, default=None,
+                     help='Most recent scenario days for historical VaR (default: all)')
+    run.add_argument('--paths', type=int, default=100_000, help='Monte Carlo paths')
+    run.add_argument('--innovations', choices=('normal', 'student_t', 'bootstrap'), default='normal',
+                     help='Monte Carlo innovations')
+    run.add_argument('--seed', type=int, default=0, help='Monte Carlo root seed')
+    run.add_argument('--report', choices=REPORTS + ('all',), default='all', help='Reports to produce')
+    run.add_argument('--out', default='reports', help='Output directory')
+    run.add_argument('--manifest', default=None, help='Write a JSON run manifest with per-stage timings')
+    run.add_argument('--profile-dir', default=None, help='Directory for a cProfile dump per top-level stage')
+    run.add_argument('--trace-memory', action='store_true', help='Record the tracemalloc peak of each stage')
+    run.add_argument('-v', '--verbose', action='count', default=0, help='Log stage timings (-v)')
+    run.add_argument('-q', '--quiet', action='store_true', help='Only log warnings')
+    return parser
+
+
+def run(args: argparse.Namespace) -> int:
+    from .instrumentation import configure_logging, record_run
+
+    if args.report != 'q_risk' and len(args.positions) != len(args.summary):
+        raise SystemExit("risk-engine: error: each --summary needs a matching --positions")
+
+    configure_logging(-1 if args.quiet else args.verbose)
+    # Stages are only timed when something consumes the spans
+    if args.manifest is None and args.profile_dir is None and not args.trace_memory and not args.verbose:
+        return run_books(args)
+    with record_run(args.manifest, args.profile_dir, trace_memory=args.trace_memory):
+        return run_books(args)
+
+
+def run_books(args: argparse.Namespace) -> int:
+    import pandas as pd
+    from .instrumentation import logger, span
+    from .pipeline import RiskEngine
+
+    engine = RiskEngine(args.data, args.holidays, args.cache_dir, init_obs=args.init_obs,
+                        workers=args.workers, factor_method=args.factor_model)
+    multiple = len(args.summary) > 1
+    for k, summary_file in enumerate(args.summary):
+        book = os.path.splitext(os.path.basename(summary_file))[0]
+        out_dir = os.path.join(args.out, book) if multiple else args.out
+        os.makedirs(out_dir, exist_ok=True)
+
+        with span('book_load') as s:
+            delta_summary_df = pd.read_csv(summary_file)
+            delta_positions_df = pd.read_csv(args.positions[k]) if args.report != 'q_risk' else None
+            s.count(summary_rows=len(delta_summary_df),
+                    position_rows=len(delta_positions_df) if delta_positions_df is not None else 0)
+        tables = {}
+        if args.report in ('q_risk', 'all'):
+            tables.update(engine.q_risk_report(delta_summary_df, args.product))
+        if args.report in ('position_mc', 'all'):
+            tables.update(engine.position_mc_report(delta_positions_df, delta_summary_df,
+                                                    args.hedge_products, args.top_n))
+        if args.report in ('var', 'all'):
+            tables.update(engine.var_report(delta_positions_df, delta_summary_df, args.confidence,
+                                            args.var_window))
+        if args.report in ('monte_carlo', 'all'):
+            tables.update(engine.monte_carlo_report(delta_positions_df, delta_summary_df, args.paths,
+                                                    args.innovations, args.confidence, args.seed))
+        if args.report in ('stress', 'all'):
+            tables.update(engine.stress_report(delta_positions_df, delta_summary_df,
+                                               out_file=os.path.join(out_dir, 'stress_pnl.npy')))
+
+        with span('write_tables', tables=len(tables)):
+            for name, table in tables.items():
+                table.to_csv(os.path.join(out_dir, f'{name}.csv'), index=False)
+        logger.info("%s: wrote %d tables to %s", summary_file, len(tables), out_dir)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == 'run':
+        return run(args)
+    return 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
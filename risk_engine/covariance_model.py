@@ -0,0 +1,257 @@
+"""
+Covariance Model
+
+One EWMA Σ with its expensive derived quantities computed lazily and cached:
+eigen-decomposition, PSD check, PSD-repaired matrix (negative eigenvalues
+clipped to zero, the nearest PSD matrix in Frobenius norm), Cholesky and
+simulation factors, and Σ w for recently used vectors (w_total).
+
+CovarianceModel supports `Sigma @ x` and `X @ Sigma` like FactorCovariance,
+so Q risk, MCs and hedging accept it in place of a dense matrix. The
+operators multiply by Σ itself: the PSD check and repair run only when a
+factorization is requested (Cholesky, simulation factor, eigen-scenarios) or
+when w' Σ w comes out negative (quadratic). Consumers that factor Σ
+(HedgeOptimizer, MonteCarloSimulator, eigen_scenarios) call
+as_covariance_model, which returns a shared model per Σ content hash, so the
+O(N³) work happens once per Σ rather than once per consumer. A model owns a
+read-only copy of Σ; update() swaps in a new matrix and drops the cache only
+when the content hash changes.
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+# Jitter (relative to the mean diagonal) added when Σ is not numerically positive definite
+CHOLESKY_JITTER = (0.0, 1e-12, 1e-10, 1e-8, 1e-6)
+
+# Models kept by as_covariance_model, and Σ w products kept per model
+MODEL_CACHE_SIZE = 2
+VECTOR_CACHE_SIZE = 8
+
+
+def robust_cholesky(Sigma: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Lower Cholesky factor of Σ, adding diagonal jitter if Σ is only semi-definite.
+
+    Returns:
+    --------
+    L : ndarray
+        Lower-triangular factor of Σ + jitter * I
+    jitter : float
+        Diagonal jitter that was added (0.0 when Σ factors as is)
+    """
+    scale = max(float(np.mean(np.diag(Sigma))), 1e-300)
+    for rel in CHOLESKY_JITTER:
+        jitter = rel * scale
+        try:
+            return np.linalg.cholesky(Sigma + jitter * np.eye(len(Sigma))), jitter
+        except np.linalg.LinAlgError:
+            continue
+    raise np.linalg.LinAlgError("Covariance matrix is not positive semi-definite")
+
+
+def content_hash(array: np.ndarray) -> str:
+    """Hash of an array's shape, dtype and bytes."""
+    array = np.ascontiguousarray(array)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{array.shape}{array.dtype.str}".encode())
+    digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+# ============================================================================
+# COVARIANCE MODEL
+# ============================================================================
+
+class CovarianceModel:
+    """
+    Σ with cached factorizations.
+
+    Parameters:
+    -----------
+    Sigma : ndarray
+        Covariance matrix (N x N)
+    repair : bool
+        Factor Σ as its PSD repair (identical to Σ when Σ is PSD), and use
+        the repair for w' Σ w when Σ gives a negative value
+    tol : float
+        Eigenvalues above -tol * max eigenvalue count as non-negative
+    """
+
+    # Makes ndarray @ CovarianceModel dispatch to __rmatmul__
+    __array_ufunc__ = None
+
+    def __init__(self, Sigma: np.ndarray, repair: bool = True, tol: float = 1e-10):
+        self.repair = repair
+        self.tol = tol
+        self._set(Sigma)
+
+    def _set(self, Sigma: np.ndarray) -> None:
+        matrix = np.array(Sigma, dtype=np.float64)
+        matrix.setflags(write=False)
+        self.matrix = matrix
+        self.key = content_hash(matrix)
+        self.shape = matrix.shape
+        self._cache: Dict[str, object] = {}
+        self._vectors: 'OrderedDict[str, np.ndarray]' = OrderedDict()
+
+    def update(self, Sigma: np.ndarray) -> bool:
+        """Replace Σ; cached results are dropped only if the content changed. Returns True if it did."""
+        if content_hash(np.asarray(Sigma, dtype=np.float64)) == self.key:
+            return False
+        self._set(Sigma)
+        return True
+
+    def _cached(self, name: str, compute: Callable[[], object]):
+        if name not in self._cache:
+            self._cache[name] = compute()
+        return self._cache[name]
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    # ------------------------------------------------------------------------
+    # Decompositions
+    # ------------------------------------------------------------------------
+
+    @property
+    def eigh(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(eigenvalues ascending, eigenvectors) of the symmetrized Σ."""
+        return self._cached('eigh', lambda: np.linalg.eigh((self.matrix + self.matrix.T) / 2))
+
+    @property
+    def min_eigenvalue(self) -> float:
+        return float(self.eigh[0][0])
+
+    @property
+    def is_psd(self) -> bool:
+        eigenvalues = self.eigh[0]
+        return bool(eigenvalues[0] >= -self.tol * max(float(eigenvalues[-1]), 1e-300))
+
+    @property
+    def repaired(self) -> np.ndarray:
+        """Nearest PSD matrix (eigenvalue clipping); Σ itself when Σ is PSD."""
+        def compute():
+            if self.is_psd:
+                return self.matrix
+            eigenvalues, eigenvectors = self.eigh
+            repaired = (eigenvectors * np.maximum(eigenvalues, 0.0)) @ eigenvectors.T
+            repaired = (repaired + repaired.T) / 2
+            repaired.setflags(write=False)
+            return repaired
+        return self._cached('repaired', compute)
+
+    @property
+    def effective(self) -> np.ndarray:
+        """Matrix factored by cholesky / factor: the repair when repair=True, else Σ."""
+        return self.repaired if self.repair else self.matrix
+
+    @property
+    def cholesky(self) -> Tuple[np.ndarray, float]:
+        """robust_cholesky of the effective matrix: (L, jitter)."""
+        return self._cached('cholesky', lambda: robust_cholesky(self.effective))
+
+    @property
+    def factor(self) -> Tuple[np.ndarray, str]:
+        """
+        G with G G' = effective matrix: the Cholesky factor ('cholesky') when
+        it needs no jitter, else the eigen-factor with negative eigenvalues
+        clipped ('eigen').
+        """
+        def compute():
+            L, jitter = self.cholesky
+            if jitter == 0.0:
+                return L, 'cholesky'
+            eigenvalues, eigenvectors = self.eigh
+            return eigenvectors * np.sqrt(np.maximum(eigenvalues, 0.0)), 'eigen'
+        return self._cached('factor', compute)
+
+    # ------------------------------------------------------------------------
+    # Operators
+    # ------------------------------------------------------------------------
+
+    def sigma_w(self, w: np.ndarray) -> np.ndarray:
+        """Σ w, cached for the last VECTOR_CACHE_SIZE vectors (read-only result)."""
+        w = np.asarray(w, dtype=np.float64)
+        key = content_hash(w)
+        if key in self._vectors:
+            self._vectors.move_to_end(key)
+            return self._vectors[key]
+        result = self.matrix @ w
+        result.setflags(write=False)
+        self._vectors[key] = result
+        if len(self._vectors) > VECTOR_CACHE_SIZE:
+            self._vectors.popitem(last=False)
+        return result
+
+    def quadratic(self, w: np.ndarray) -> float:
+        """w' Σ w; w' Σ_repaired w when that is negative and repair=True."""
+        w = np.asarray(w, dtype=np.float64)
+        value = float(w @ self.sigma_w(w))
+        if value < 0 and self.repair:
+            value = float(w @ (self.repaired @ w))
+        return value
+
+    def __matmul__(self, x) -> np.ndarray:
+        """Σ x for x of shape (N,) (cached) or (N, m)."""
+        x = np.asarray(x, dtype=np.float64)
+        if x.ndim == 1:
+            return self.sigma_w(x)
+        return self.matrix @ x
+
+    def __rmatmul__(self, X) -> np.ndarray:
+        """X Σ for X of shape (N,) (cached, Σ is symmetric) or (K, N)."""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            return self.sigma_w(X)
+        return X @ self.matrix
+
+    def diagonal(self) -> np.ndarray:
+        return np.diag(self.matrix).copy()
+
+    def to_dense(self) -> np.ndarray:
+        return self.matrix
+
+
+# Shared models by (content hash, repair, tol), most recently used last
+_MODELS: 'OrderedDict[Tuple[str, bool, float], CovarianceModel]' = OrderedDict()
+
+
+def as_covariance_model(Sigma, repair: bool = True, tol: float = 1e-10):
+    """
+    Shared CovarianceModel for a dense Σ (same content -> same model), for
+    consumers that factor Σ; operators alone do not need one. A
+    CovarianceModel, or another covariance operator such as FactorCovariance,
+    is returned unchanged.
+    """
+    if isinstance(Sigma, CovarianceModel) or not isinstance(Sigma, (np.ndarray, list)):
+        return Sigma
+    matrix = np.asarray(Sigma, dtype=np.float64)
+    key = (content_hash(matrix), repair, tol)
+    if key in _MODELS:
+        _MODELS.move_to_end(key)
+        return _MODELS[key]
+    model = CovarianceModel(matrix, repair, tol)
+    _MODELS[key] = model
+    if len(_MODELS) > MODEL_CACHE_SIZE:
+        _MODELS.popitem(last=False)
+    return model
+
+
+def quadratic_form(Sigma, w: np.ndarray, Sigma_w: Optional[np.ndarray] = None) -> float:
+    """
+    w' Σ w for a dense Σ or covariance operator (Sigma_w: Σ w if already
+    computed). A CovarianceModel falls back to its PSD repair when the value
+    is negative; other Σ are applied as given.
+    """
+    if isinstance(Sigma, CovarianceModel):
+        return Sigma.quadratic(w)
+    return float(w @ (Sigma @ w if Sigma_w is None else Sigma_w))
+
+
+def clear_model_cache() -> None:
+    """Drop the shared models (the next consumer of each Σ factors it again)."""
+    _MODELS.clear()
@@ -0,0 +1,662 @@
+"""
+EWMA Covariance Engine
+
+Closed-form EWMA covariance: instead of replaying
+
+    Σ_t = λ Σ_{t-1} + (1 - λ) r_t r_t'
+
+day by day, the terminal matrix is computed as one weighted Gram product
+
+    Σ_T = λ^k Σ_0 + R' W R,   W = diag((1 - λ) λ^(k-1-j)),
+
+over the k valid (non-NaN) observations after the initialization window.
+Initialization (sample covariance of the first init_obs rows, NaN rows
+dropped, scaled-identity fallback) matches the notebook recursion exactly.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .instrumentation import instrumented
+
+# ============================================================================
+# INITIALIZATION & WEIGHTS
+# ============================================================================
+
+def ewma_initial_covariance(returns: np.ndarray, init_obs: int = 60) -> np.ndarray:
+    """
+    Sample covariance of the first init_obs observations (rows with NaN removed).
+
+    Falls back to identity * mean variance when fewer than 10 valid rows remain,
+    as in the notebook implementation.
+    """
+    n_obs, n_vars = returns.shape
+    if n_obs < init_obs:
+        raise ValueError(f"Need at least {init_obs} observations, got {n_obs}")
+
+    init_returns = returns[:init_obs]
+    init_returns = init_returns[~np.isnan(init_returns).any(axis=1)]
+
+    if len(init_returns) < 10:
+        return np.eye(n_vars) * np.var(returns, axis=0).mean()
+    return np.atleast_2d(np.cov(init_returns.T))
+
+
+def ewma_update_rows(returns: np.ndarray) -> np.ndarray:
+    """Observations that enter the EWMA recursion: rows with no NaN (NaN rows are skipped)."""
+    return returns[~np.isnan(returns).any(axis=1)]
+
+
+def ewma_decay_weights(n_obs: int, lambda_val: float) -> np.ndarray:
+    """Weights (1 - λ) λ^(n-1-j) for j = 0..n-1 (most recent observation last)."""
+    return (1.0 - lambda_val) * lambda_val ** np.arange(n_obs - 1, -1, -1, dtype=np.float64)
+
+
+# Cap on the (n_lambdas x n_vars x n_obs) temporary of a batched Gram product
+GRAM_BATCH_ELEMENTS = 8_000_000
+
+# Distinct element-wise decays above which one Gram product per decay
+# (O(n_lambdas T N^2)) loses to the element-wise recursion (O(T N^2))
+MAX_GRAM_LAMBDAS = 32
+
+
+def _weighted_gram(rows: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    return (rows * weights[:, None]).T @ rows
+
+
+def _weighted_grams(rows: np.ndarray, lambdas: Sequence[float]) -> np.ndarray:
+    """R' W_l R for every decay l as one batched matmul (chunked to GRAM_BATCH_ELEMENTS)."""
+    n_updates, n_vars = rows.shape
+    weights = np.stack([ewma_decay_weights(n_updates, lambda_val) for lambda_val in lambdas])
+    grams = np.empty((len(weights), n_vars, n_vars))
+    step = max(1, GRAM_BATCH_ELEMENTS // max(1, n_vars * n_updates))
+
+    for start in range(0, len(weights), step):
+        batch = weights[start:start + step]
+        grams[start:start + len(batch)] = np.matmul(rows.T[None, :, :] * batch[:, None, :], rows)
+    return grams
+
+
+def _layered_gram(rows: np.ndarray, lambdas: np.ndarray, layer: np.ndarray) -> np.ndarray:
+    """
+    Entry [i, j] of R' W_l R for l = layer[i, j]. Decays are batched as in
+    _weighted_grams, but each batch only writes the entries its decays own,
+    so memory stays O(N^2) rather than a full (n_lambdas, N, N) cube.
+    """
+    n_updates, n_vars = rows.shape
+    out = np.empty((n_vars, n_vars))
+    step = max(1, GRAM_BATCH_ELEMENTS // max(1, n_vars * max(n_updates, n_vars)))
+    for start in range(0, len(lambdas), step):
+        stop = min(start + step, len(lambdas))
+        ii, jj = np.nonzero((layer >= start) & (layer < stop))
+        grams = _weighted_grams(rows, lambdas[start:stop])
+        out[ii, jj] = grams[layer[ii, jj] - start, ii, jj]
+    return out
+
+
+def _elementwise_recursion(cov_matrix: np.ndarray, rows: np.ndarray, lambda_matrix: np.ndarray) -> np.ndarray:
+    """Σ = Λ ∘ Σ + (1 - Λ) ∘ r r' over every row, on a copy of cov_matrix (O(N^2) memory)."""
+    cov = np.array(cov_matrix, dtype=np.float64)
+    weight = 1.0 - lambda_matrix
+    update = np.empty_like(cov)
+    for r in rows:
+        np.multiply.outer(r, r, out=update)
+        update *= weight
+        cov *= lambda_matrix
+        cov += update
+    return cov
+
+
+# ============================================================================
+# EWMA COVARIANCE
+# ============================================================================
+
+def ewma_update(cov_matrix: np.ndarray, returns: np.ndarray, lambda_val: float) -> np.ndarray:
+    """
+    Apply a block of observations to an EWMA covariance in one step.
+
+    Equivalent to running Σ = λ Σ + (1 - λ) r r' over each non-NaN row of
+    returns in order: λ^k Σ + R' W R.
+
+    Parameters:
+    -----------
+    cov_matrix : ndarray
+        Covariance before the block (n_vars x n_vars)
+    returns : ndarray
+        New observations, shape (n_new, n_vars), oldest first
+    lambda_val : float
+        EWMA decay parameter
+
+    Returns:
+    --------
+    cov_matrix : ndarray
+        Covariance after the last observation
+    """
+    rows = ewma_update_rows(np.asarray(returns, dtype=np.float64))
+    n_updates = len(rows)
+    return lambda_val ** n_updates * cov_matrix + _weighted_gram(rows, ewma_decay_weights(n_updates, lambda_val))
+
+
+def ewma_update_multi_lambda(cov_matrix: np.ndarray, returns: np.ndarray, lambda_vec: np.ndarray,
+                             lambda_mean: str = 'arithmetic') -> np.ndarray:
+    """
+    Apply a block of observations with element-wise decay λ_ij in one step.
+
+    Each element follows Σ_t[i,j] = λ_ij Σ_{t-1}[i,j] + (1 - λ_ij) r_t[i] r_t[j].
+
+    - 'geometric' means factorize: scaling each column i by λ_i^((k-1-j)/2)
+      turns the whole matrix into a single Gram product.
+    - 'arithmetic' means (the notebook default) take one weighted Gram product
+      per distinct λ_ij value; bucketed lambdas give only a handful (3 buckets -> 5).
+      Above MAX_GRAM_LAMBDAS distinct values (e.g., a different λ per
+      variable, ~N^2/2 values) the element-wise recursion is cheaper.
+    """
+    rows = ewma_update_rows(np.asarray(returns, dtype=np.float64))
+    n_updates = len(rows)
+    lambda_vec = np.asarray(lambda_vec, dtype=np.float64)
+    lambda_matrix = pairwise_lambda_matrix(lambda_vec, lambda_mean)
+
+    if lambda_mean == 'geometric':
+        ages = np.arange(n_updates - 1, -1, -1, dtype=np.float64)
+        scaled = rows * lambda_vec[None, :] ** (ages[:, None] / 2)
+        return lambda_matrix ** n_updates * cov_matrix + (1.0 - lambda_matrix) * (scaled.T @ scaled)
+
+    unique_lambdas, inverse = np.unique(lambda_matrix, return_inverse=True)
+    if len(unique_lambdas) > MAX_GRAM_LAMBDAS:
+        return _elementwise_recursion(cov_matrix, rows, lambda_matrix)
+    layer = inverse.reshape(lambda_matrix.shape)
+    return lambda_matrix ** n_updates * cov_matrix + _layered_gram(rows, unique_lambdas, layer)
+
+
+@instrumented('ewma')
+def ewma_covariance(returns: np.ndarray, lambda_val: float, init_obs: int = 60) -> np.ndarray:
+    """
+    Terminal EWMA covariance matrix in closed form.
+
+    Parameters:
+    -----------
+    returns : ndarray
+        Returns (daily changes), shape (n_obs, n_vars), oldest first
+    lambda_val : float
+        EWMA decay parameter
+    init_obs : int
+        Number of observations to use for initial covariance
+
+    Returns:
+    --------
+    cov_matrix : ndarray
+        Final EWMA covariance matrix (n_vars x n_vars)
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    return ewma_update(ewma_initial_covariance(returns, init_obs), returns[init_obs:], lambda_val)
+
+
+def pairwise_lambda_matrix(lambda_vec: np.ndarray, lambda_mean: str = 'arithmetic') -> np.ndarray:
+    """
+    Element-wise decay λ_ij from per-variable lambdas.
+
+    'arithmetic': λ_ij = (λ_i + λ_j) / 2 (compute_multi_product_ewma_covariance)
+    'geometric' : λ_ij = sqrt(λ_i λ_j)
+    """
+    lambda_vec = np.asarray(lambda_vec, dtype=np.float64)
+    if lambda_mean == 'arithmetic':
+        lambda_matrix = np.outer(lambda_vec, np.ones(len(lambda_vec)))
+        return (lambda_matrix + lambda_matrix.T) / 2
+    elif lambda_mean == 'geometric':
+        return np.sqrt(np.outer(lambda_vec, lambda_vec))
+    raise ValueError(f"Unknown lambda_mean: {lambda_mean}")
+
+
+@instrumented('ewma_multi_lambda')
+def ewma_covariance_multi_lambda(returns: np.ndarray, lambda_vec: np.ndarray, init_obs: int = 60,
+                                 lambda_mean: str = 'arithmetic') -> np.ndarray:
+    """
+    Terminal EWMA covariance with a decay per variable, in closed form.
+
+    Parameters:
+    -----------
+    returns : ndarray
+        Returns, shape (n_obs, n_vars), oldest first
+    lambda_vec : ndarray
+        Decay per variable, shape (n_vars,)
+    init_obs : int
+        Number of observations for initial covariance
+    lambda_mean : str
+        'arithmetic' or 'geometric' pairing of per-variable lambdas
+
+    Returns:
+    --------
+    cov_matrix : ndarray
+        Final EWMA covariance matrix (n_vars x n_vars)
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    return ewma_update_multi_lambda(ewma_initial_covariance(returns, init_obs), returns[init_obs:],
+                                    lambda_vec, lambda_mean)
+
+
+# ============================================================================
+# SINGLE-PASS MULTI-DECAY (BUCKETS, CROSS, MULTI-PRODUCT)
+# ============================================================================
+
+@instrumented('ewma_multi_decay')
+def ewma_covariance_multi_decay(returns: np.ndarray, lambdas: Sequence[float], init_obs: int = 60) -> np.ndarray:
+    """
+    Terminal EWMA covariance for several decays from one scan of the returns.
+
+    Parameters:
+    -----------
+    returns : ndarray
+        Returns, shape (n_obs, n_vars), oldest first
+    lambdas : sequence of float
+        Decays to compute (e.g., [0.97, 0.98, 0.985, 0.99])
+    init_obs : int
+        Number of observations for initial covariance
+
+    Returns:
+    --------
+    cube : ndarray
+        Covariances, shape (n_lambdas, n_vars, n_vars); cube[l] equals
+        ewma_covariance(returns, lambdas[l], init_obs)
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    lambdas = np.asarray(lambdas, dtype=np.float64)
+    cov_init = ewma_initial_covariance(returns, init_obs)
+    rows = ewma_update_rows(returns[init_obs:])
+
+    return (lambdas ** len(rows))[:, None, None] * cov_init + _weighted_grams(rows, lambdas)
+
+
+def ewma_covariance_set(returns_df: pd.DataFrame,
+                        specs: Dict[str, Tuple[List[str], Union[float, Sequence[float]]]],
+                        init_obs: int = 60) -> Dict[str, np.ndarray]:
+    """
+    Several EWMA covariances over column subsets of one returns frame.
+
+    Each spec is (columns, lambdas): a single decay, or one decay per column
+    paired arithmetically as in compute_multi_product_ewma_covariance. Specs
+    whose columns have the same NaN rows share one ewma_covariance_multi_decay
+    call over the union of their columns (one Gram product per distinct decay).
+    Every result is a slice of that cube. Each result equals computing its spec
+    on its own columns, because NaN rows are skipped per spec as in the
+    separate calls. Two cases are computed spec by spec instead: groups whose
+    initialization window has fewer than 10 valid rows (the identity fallback
+    of ewma_initial_covariance averages the variance over the spec's own
+    columns), and groups with more than MAX_GRAM_LAMBDAS distinct decays.
+
+    Parameters:
+    -----------
+    returns_df : DataFrame
+        Returns (daily changes), oldest first
+    specs : dict
+        name -> (columns, lambda or per-column lambdas)
+    init_obs : int
+        Number of observations for initial covariance
+
+    Returns:
+    --------
+    covariances : dict
+        name -> covariance matrix over the spec's columns (in spec order)
+    """
+    columns = list(dict.fromkeys(c for cols, _ in specs.values() for c in cols))
+    values = returns_df[columns].to_numpy(dtype=np.float64)
+    position = {c: i for i, c in enumerate(columns)}
+
+    # Group specs by the NaN-row pattern of their columns
+    groups: Dict[bytes, List[str]] = {}
+    for name, (cols, _) in specs.items():
+        idx = [position[c] for c in cols]
+        key = (~np.isnan(values[:, idx]).any(axis=1)).tobytes()
+        groups.setdefault(key, []).append(name)
+
+    def single(name: str) -> np.ndarray:
+        cols, lambdas = specs[name]
+        sub_values = values[:, [position[c] for c in cols]]
+        if np.ndim(lambdas) == 0:
+            return ewma_covariance(sub_values, float(lambdas), init_obs)
+        return ewma_covariance_multi_lambda(sub_values, lambdas, init_obs)
+
+    covariances = {}
+    for key, names in groups.items():
+        if np.frombuffer(key, dtype=bool)[:init_obs].sum() < 10:
+            for name in names:
+                covariances[name] = single(name)
+            continue
+        group_idx = sorted({position[c] for name in names for c in specs[name][0]})
+        group_position = {col: k for k, col in enumerate(group_idx)}
+
+        lambda_matrices = {}
+        for name in names:
+            cols, lambdas = specs[name]
+            if np.ndim(lambdas) == 0:
+                lambda_matrices[name] = np.full((len(cols), len(cols)), float(lambdas))
+            else:
+                lambda_matrices[name] = pairwise_lambda_matrix(lambdas)
+        unique_lambdas, inverse = np.unique(np.concatenate([m.ravel() for m in lambda_matrices.values()]),
+                                            return_inverse=True)
+        if len(unique_lambdas) > MAX_GRAM_LAMBDAS:
+            # Per-column decays: one element-wise pass per spec instead of a huge cube
+            for name in names:
+                covariances[name] = single(name)
+            continue
+        cube = ewma_covariance_multi_decay(values[:, group_idx], unique_lambdas, init_obs)
+
+        offset = 0
+        for name in names:
+            sub = np.array([group_position[position[c]] for c in specs[name][0]], dtype=np.intp)
+            shape = lambda_matrices[name].shape
+            layer = inverse.ravel()[offset:offset + lambda_matrices[name].size].reshape(shape)
+            offset += lambda_matrices[name].size
+            covariances[name] = cube[layer, sub[:, None], sub[None, :]]
+
+    return {name: covariances[name] for name in specs}
+
+
+def compute_bucket_covariances(returns_df: pd.DataFrame, product: str, buckets: Dict[str, List[str]],
+                               bucket_lambdas: Dict[str, float], lambda_cross: Optional[float] = None,
+                               init_obs: int = 60) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """
+    Front/mid/back (and cross) covariances for one product from a single scan.
+
+    Parameters:
+    -----------
+    returns_df : DataFrame
+        DataFrame with returns, columns '{product}_{node}'
+    product : str
+        Product name (e.g., 'clbr')
+    buckets : dict
+        Bucket name -> nodes, in Sigma_total order (e.g., {'Front': front, 'Mid': mid, 'Back': back})
+    bucket_lambdas : dict
+        Bucket name -> EWMA decay
+    lambda_cross : float, optional
+        Decay for the cross-bucket blocks. None gives the block-diagonal
+        Sigma_total of the notebooks (Option 1).
+    init_obs : int
+        Number of observations for initial covariance
+
+    Returns:
+    --------
+    bucket_covs : dict
+        Bucket name -> covariance (plus 'Cross' over all nodes when lambda_cross is set)
+    Sigma_total : ndarray
+        Total covariance over all bucket nodes; off-diagonal blocks are zero or
+        taken from the lambda_cross covariance (not guaranteed PSD when mixing decays)
+    """
+    specs = {name: ([f'{product}_{node}' for node in nodes], bucket_lambdas[name])
+             for name, nodes in buckets.items()}
+    all_cols = [c for cols, _ in specs.values() for c in cols]
+    if lambda_cross is not None:
+        specs['Cross'] = (all_cols, lambda_cross)
+
+    bucket_covs = ewma_covariance_set(returns_df, specs, init_obs)
+
+    if lambda_cross is not None:
+        Sigma_total = bucket_covs['Cross'].copy()
+    else:
+        Sigma_total = np.zeros((len(all_cols), len(all_cols)))
+    start = 0
+    for name, nodes in buckets.items():
+        end = start + len(nodes)
+        Sigma_total[start:end, start:end] = bucket_covs[name]
+        start = end
+
+    return bucket_covs, Sigma_total
+
+
+# ============================================================================
+# COVARIANCE HISTORY (Σ_t FOR EVERY DATE)
+# ============================================================================
+
+@instrumented('ewma_history')
+def ewma_covariance_history(returns: np.ndarray, lambdas: Union[float, np.ndarray], init_obs: int = 60,
+                            lambda_mean: str = 'arithmetic', out_file: Optional[str] = None,
+                            dtype=np.float64) -> np.ndarray:
+    """
+    Σ_t for every observation date in one pass, optionally into a memory-mapped .npy.
+
+    Row t of the cube is the covariance after observation t, aligned with the
+    rows of returns:
+    - t < init_obs - 1 : NaN (still inside the initialization window)
+    - t = init_obs - 1 : initial sample covariance
+    - NaN return rows  : previous Σ carried forward (the row is skipped)
+
+    The recursion state is kept in float64 whatever the output dtype.
+
+    Parameters:
+    -----------
+    returns : ndarray
+        Returns, shape (T, N), oldest first
+    lambdas : float or ndarray
+        Single EWMA decay, or one decay per variable (paired via lambda_mean)
+    init_obs : int
+        Number of observations for initial covariance
+    lambda_mean : str
+        'arithmetic' or 'geometric' pairing of per-variable lambdas
+    out_file : str, optional
+        Write the cube to this .npy file (opened with np.lib.format.open_memmap);
+        reopen later with np.load(out_file, mmap_mode='r')
+    dtype : numpy dtype
+        float64 or float32 for the stored cube
+
+    Returns:
+    --------
+    cube : ndarray or np.memmap
+        Covariance history, shape (T, N, N)
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    n_obs, n_vars = returns.shape
+    cov_current = ewma_initial_covariance(returns, init_obs)
+    if np.ndim(lambdas) == 0:
+        lambda_matrix = float(lambdas)
+    else:
+        lambda_matrix = pairwise_lambda_matrix(lambdas, lambda_mean)
+
+    shape = (n_obs, n_vars, n_vars)
+    if out_file is not None:
+        cube = np.lib.format.open_memmap(out_file, mode='w+', dtype=dtype, shape=shape)
+    else:
+        cube = np.empty(shape, dtype=dtype)
+
+    cube[:init_obs - 1] = np.nan
+    cube[init_obs - 1] = cov_current
+    ewma_history_block(returns, lambda_matrix, cov_current, init_obs, n_obs, cube)
+
+    if isinstance(cube, np.memmap):
+        cube.flush()
+    return cube
+
+
+def ewma_history_block(returns: np.ndarray, lambda_matrix: Union[float, np.ndarray], cov_current: np.ndarray,
+                       start: int, stop: int, cube: np.ndarray) -> np.ndarray:
+    """
+    Run the recursion over rows start..stop-1, writing Σ_t into cube[t].
+
+    cov_current is the covariance after row start-1 and is updated in place;
+    NaN return rows carry the previous Σ forward.
+    """
+    valid = ~np.isnan(returns[start:stop]).any(axis=1)
+    update = np.empty_like(cov_current)
+
+    for k, t in enumerate(range(start, stop)):
+        if valid[k]:
+            np.outer(returns[t], returns[t], out=update)
+            update *= 1 - lambda_matrix
+            cov_current *= lambda_matrix
+            cov_current += update
+        cube[t] = cov_current
+    return cov_current
+
+
+def ewma_risk_history(cube: np.ndarray, positions: np.ndarray, w_total: Optional[np.ndarray] = None,
+                      index=None, names: Optional[List[str]] = None,
+                      chunk_size: int = 256) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Q-risk and marginal contribution to total for fixed books over a covariance history.
+
+    Q_t  = 1000 * sqrt(w' Σ_t w)                          (0 if the variance is negative)
+    MC_t = 1000 * (w' Σ_t w_total) / sqrt(w_total' Σ_t w_total)  (0 if the total variance <= 0)
+
+    Dates are processed in chunks with batched matmuls, so a memory-mapped
+    cube is never loaded whole.
+
+    Parameters:
+    -----------
+    cube : ndarray or np.memmap
+        Covariance history, shape (T, N, N) (from ewma_covariance_history)
+    positions : ndarray
+        One book (N,) or several books (K, N)
+    w_total : ndarray, optional
+        Total portfolio vector for MC (defaults to the sum of the books)
+    index : array-like, optional
+        Dates for the T rows (defaults to 0..T-1)
+    names : list, optional
+        Column names for the K books
+    chunk_size : int
+        Dates per batch
+
+    Returns:
+    --------
+    q_df : DataFrame
+        Q_t, shape (T, K); NaN inside the initialization window
+    mc_df : DataFrame
+        MC_t to total, shape (T, K)
+    """
+    W = np.atleast_2d(np.asarray(positions, dtype=np.float64))
+    w_total = W.sum(axis=0) if w_total is None else np.asarray(w_total, dtype=np.float64)
+    n_dates = cube.shape[0]
+    q = np.empty((n_dates, len(W)))
+    mc = np.empty((n_dates, len(W)))
+
+    for start in range(0, n_dates, chunk_size):
+        Sigma = np.asarray(cube[start:start + chunk_size], dtype=np.float64)
+        SW = Sigma @ W.T                                      # (B, N, K)
+        var = np.einsum('tik,ki->tk', SW, W)
+        Sw_total = Sigma @ w_total                            # (B, N)
+        total_var = Sw_total @ w_total
+        numerator = Sw_total @ W.T                            # (B, K)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            q_chunk = 1000 * np.sqrt(np.where(var < 0, 0.0, var))
+            mc_chunk = np.where(total_var[:, None] <= 0, 0.0,
+                                1000 * numerator / np.sqrt(total_var)[:, None])
+
+        q[start:start + len(Sigma)] = q_chunk
+        mc[start:start + len(Sigma)] = mc_chunk
+
+    index = pd.RangeIndex(n_dates) if index is None else index
+    names = names if names is not None else list(range(len(W)))
+    return pd.DataFrame(q, index=index, columns=names), pd.DataFrame(mc, index=index, columns=names)
+
+
+# ============================================================================
+# REFERENCE RECURSIONS (verification & benchmarking)
+# ============================================================================
+
+def ewma_covariance_loop(returns: np.ndarray, lambda_val: float, init_obs: int = 60) -> np.ndarray:
+    """Day-by-day EWMA recursion as in the notebooks (reference implementation)."""
+    returns = np.asarray(returns, dtype=np.float64)
+    cov_current = ewma_initial_covariance(returns, init_obs)
+
+    for t in range(init_obs, len(returns)):
+        r_t = returns[t]
+        if np.isnan(r_t).any():
+            continue
+        cov_current = lambda_val * cov_current + (1 - lambda_val) * np.outer(r_t, r_t)
+
+    return cov_current
+
+
+def ewma_covariance_multi_lambda_loop(returns: np.ndarray, lambda_vec: np.ndarray, init_obs: int = 60,
+                                      lambda_mean: str = 'arithmetic') -> np.ndarray:
+    """Day-by-day element-wise-lambda recursion (reference implementation)."""
+    returns = np.asarray(returns, dtype=np.float64)
+    cov_current = ewma_initial_covariance(returns, init_obs)
+    lambda_matrix = pairwise_lambda_matrix(lambda_vec, lambda_mean)
+
+    for t in range(init_obs, len(returns)):
+        r_t = returns[t]
+        if np.isnan(r_t).any():
+            continue
+        cov_current = lambda_matrix * cov_current + (1 - lambda_matrix) * np.outer(r_t, r_t)
+
+    return cov_current
+
+
+# ============================================================================
+# NOTEBOOK-COMPATIBLE WRAPPERS
+# ============================================================================
+
+def compute_ewma_covariance(returns_df: pd.DataFrame, nodes, product: str, lambda_val: float,
+                            init_obs: int = 60) -> np.ndarray:
+    """
+    Compute EWMA covariance matrix for given nodes.
+
+    Parameters:
+    -----------
+    returns_df : DataFrame
+        DataFrame with returns (daily changes)
+    nodes : list
+        List of node names (e.g., ['A01', 'A02', ...])
+    product : str
+        Product name (e.g., 'htt', 'houbr', etc.)
+    lambda_val : float
+        EWMA decay parameter
+    init_obs : int
+        Number of observations to use for initial covariance
+
+    Returns:
+    --------
+    cov_matrix : ndarray
+        Final EWMA covariance matrix
+    """
+    cols = [f'{product}_{node}' for node in nodes]
+    return ewma_covariance(returns_df[cols].values, lambda_val, init_obs)
+
+
+def bucket_lambda_vector(n_products: int, all_nodes, front, mid, back,
+                         lambda_front: float, lambda_mid: float, lambda_back: float) -> np.ndarray:
+    """Per-variable lambdas for a combined [product1_A01..A15, product2_A01..] layout."""
+    lambda_by_node = []
+    for node_code in all_nodes:
+        if node_code in front:
+            lambda_by_node.append(lambda_front)
+        elif node_code in mid:
+            lambda_by_node.append(lambda_mid)
+        else:
+            lambda_by_node.append(lambda_back)  # Back, and default for unassigned nodes
+    return np.tile(np.asarray(lambda_by_node, dtype=np.float64), n_products)
+
+
+def compute_multi_product_ewma_covariance(combined_returns_df: pd.DataFrame, n_products: int, all_nodes,
+                                          front, mid, back, lambda_front: float, lambda_mid: float,
+                                          lambda_back: float, init_obs: int = 60) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Multi-product EWMA covariance with bucket-specific lambdas.
+
+    Parameters:
+    -----------
+    combined_returns_df : DataFrame
+        Combined returns, columns ordered product by product (A01..A15 each)
+    n_products : int
+        Number of products in the combined matrix
+    all_nodes : list
+        Node codes per product (e.g., ['A01', ..., 'A15'])
+    front, mid, back : list
+        Node lists for each bucket
+    lambda_front, lambda_mid, lambda_back : float
+        EWMA decay parameters for each bucket
+    init_obs : int
+        Number of observations for initial covariance
+
+    Returns:
+    --------
+    Sigma_multi : ndarray
+        Full multi-product covariance matrix
+    lambda_vec : ndarray
+        Decay used for each variable
+    """
+    lambda_vec = bucket_lambda_vector(n_products, all_nodes, front, mid, back,
+                                      lambda_front, lambda_mid, lambda_back)
+    Sigma_multi = ewma_covariance_multi_lambda(combined_returns_df.values, lambda_vec, init_obs)
+    return Sigma_multi, lambda_vec
@@ -0,0 +1,285 @@
+"""
+Factor Covariance Model
+
+Low-rank multi-product covariance
+
+    Σ = B F B' + D
+
+with per-product loadings B (block-diagonal: PCA, level/slope/curvature or
+bucket levels), a cross-product factor covariance F and diagonal specific
+risk D. FactorCovariance applies Σ without forming it: Σ x costs
+O(N k_p + k²) instead of O(N²). It supports `Sigma @ x` and `X @ Sigma`, so
+compute_q_risk, marginal_contributions, compute_bucket_mc and evaluate_hedges
+accept it in place of a dense matrix.
+
+F and D are EWMA estimates over factor returns f_t = B⁺ r_t and specific
+returns e_t = r_t - B f_t, using the same initialization, NaN-row skipping
+and per-variable decays as compute_multi_product_ewma_covariance.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .ewma import ewma_covariance_multi_lambda, ewma_update_rows
+from .factors import build_factor_matrix_bucket
+from .hedge_engine import evaluate_hedges
+from .instrumentation import instrumented
+from .mc_engine import marginal_contributions
+
+FACTOR_METHODS = ('pca', 'lsc', 'bucket')
+
+
+# ============================================================================
+# FACTOR COVARIANCE
+# ============================================================================
+
+class FactorCovariance:
+    """
+    Σ = B F B' + diag(D) with block-diagonal B.
+
+    Parameters:
+    -----------
+    loadings : list of ndarray
+        Per-product loadings (n_p x k_p), in combined-vector order
+    F : ndarray
+        Factor covariance (k x k), k = sum of k_p
+    D : ndarray
+        Specific variances (N)
+    """
+
+    # Makes ndarray @ FactorCovariance dispatch to __rmatmul__
+    __array_ufunc__ = None
+
+    def __init__(self, loadings: List[np.ndarray], F: np.ndarray, D: np.ndarray):
+        self.loadings = [np.asarray(L, dtype=np.float64) for L in loadings]
+        self.F = np.asarray(F, dtype=np.float64)
+        self.D = np.asarray(D, dtype=np.float64)
+        rows = np.cumsum([0] + [L.shape[0] for L in self.loadings])
+        cols = np.cumsum([0] + [L.shape[1] for L in self.loadings])
+        self._rows = list(zip(rows[:-1], rows[1:]))
+        self._cols = list(zip(cols[:-1], cols[1:]))
+        self.shape = (int(rows[-1]), int(rows[-1]))
+        self.n_factors = int(cols[-1])
+
+    def project(self, X: np.ndarray) -> np.ndarray:
+        """X B for X of shape (..., N) -> (..., k)."""
+        return np.concatenate([X[..., r0:r1] @ L for (r0, r1), L in zip(self._rows, self.loadings)], axis=-1)
+
+    def expand(self, Y: np.ndarray) -> np.ndarray:
+        """Y B' for Y of shape (..., k) -> (..., N)."""
+        return np.concatenate([Y[..., c0:c1] @ L.T for (c0, c1), L in zip(self._cols, self.loadings)], axis=-1)
+
+    def __rmatmul__(self, X) -> np.ndarray:
+        """X Σ for X of shape (N,) or (K, N) (Σ is symmetric)."""
+        X = np.asarray(X, dtype=np.float64)
+        return self.expand(self.project(X) @ self.F) + X * self.D
+
+    def __matmul__(self, x) -> np.ndarray:
+        """Σ x for x of shape (N,) or (N, m)."""
+        x = np.asarray(x, dtype=np.float64)
+        if x.ndim == 1:
+            return self.__rmatmul__(x)
+        return self.__rmatmul__(x.T).T
+
+    @property
+    def B(self) -> np.ndarray:
+        """Dense loadings (N x k)."""
+        B = np.zeros((self.shape[0], self.n_factors))
+        for (r0, r1), (c0, c1), L in zip(self._rows, self._cols, self.loadings):
+            B[r0:r1, c0:c1] = L
+        return B
+
+    def diagonal(self) -> np.ndarray:
+        """Variances diag(Σ) without forming Σ."""
+        return np.concatenate([np.einsum('ij,jk,ik->i', L, self.F[c0:c1, c0:c1], L)
+                               for (c0, c1), L in zip(self._cols, self.loadings)]) + self.D
+
+    def to_dense(self) -> np.ndarray:
+        """Materialized Σ (N x N), for reports and small books."""
+        B = self.B
+        return B @ self.F @ B.T + np.diag(self.D)
+
+
+# ============================================================================
+# LOADINGS & ESTIMATION
+# ============================================================================
+
+def factor_loadings(n_nodes: int, method: str = 'pca', n_factors: int = 3,
+                    block_cov: Optional[np.ndarray] = None,
+                    bucket_slices: Optional[Dict[str, slice]] = None) -> np.ndarray:
+    """
+    Loadings (n_nodes x k) for one product.
+
+    'pca'    : top n_factors eigenvectors of block_cov
+    'lsc'    : orthonormal level / slope / curvature curves (first n_factors)
+    'bucket' : Level column of build_factor_matrix_bucket for each bucket (bucket_slices)
+    """
+    if method == 'pca':
+        eigenvalues, eigenvectors = np.linalg.eigh(block_cov)
+        order = np.argsort(eigenvalues)[::-1][:min(n_factors, n_nodes)]
+        return eigenvectors[:, order]
+    if method == 'lsc':
+        x = np.linspace(-1.0, 1.0, n_nodes)
+        curves = np.column_stack([np.ones(n_nodes), x, x ** 2])[:, :min(n_factors, n_nodes, 3)]
+        Q, R = np.linalg.qr(curves)
+        return Q * np.sign(np.diag(R))                       # level loads positively, slope rises
+    if method == 'bucket':
+        L = np.zeros((n_nodes, len(bucket_slices)))
+        for k, (name, rows) in enumerate(bucket_slices.items()):
+            nodes = list(range(n_nodes))[rows]
+            if nodes:
+                B, _, _ = build_factor_matrix_bucket([f"A{i + 1:02d}" for i in nodes], name.lower())
+                L[rows, k] = B[:, 0]
+        return L[:, np.abs(L).sum(axis=0) > 0]
+    raise ValueError(f"Unknown factor method: {method}")
+
+
+def ewma_variances(returns: np.ndarray, lambda_vec: np.ndarray, init_obs: int = 60) -> np.ndarray:
+    """
+    Diagonal of ewma_covariance_multi_lambda in O(T N): same initialization
+    (sample variance of the first init_obs rows, NaN rows dropped) and NaN-row skipping.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    if len(returns) < init_obs:
+        raise ValueError(f"Need at least {init_obs} observations, got {len(returns)}")
+    init_returns = ewma_update_rows(returns[:init_obs])
+    if len(init_returns) < 10:
+        variances = np.full(returns.shape[1], np.var(returns, axis=0).mean())
+    else:
+        variances = np.var(init_returns, axis=0, ddof=1)
+
+    rows = ewma_update_rows(returns[init_obs:])
+    ages = np.arange(len(rows) - 1, -1, -1, dtype=np.float64)
+    weights = (1.0 - lambda_vec)[None, :] * lambda_vec[None, :] ** ages[:, None]
+    return lambda_vec ** len(rows) * variances + (weights * rows ** 2).sum(axis=0)
+
+
+@instrumented('factor_covariance')
+def fit_factor_covariance(combined_returns, product_indices: Dict[str, Tuple[int, int]], lambda_vec: np.ndarray,
+                          method: str = 'pca', n_factors: int = 3, init_obs: int = 60,
+                          buckets: Optional[Dict[str, List[str]]] = None,
+                          all_nodes: Optional[List[str]] = None) -> FactorCovariance:
+    """
+    Factor model of the multi-product EWMA covariance from combined returns.
+
+    Parameters:
+    -----------
+    combined_returns : DataFrame or ndarray
+        Combined returns (from build_combined_returns), oldest first
+    product_indices : dict
+        Product -> (start_idx, end_idx) in the combined vector
+    lambda_vec : ndarray
+        Decay per variable (bucket_lambda_vector)
+    method : str
+        'pca', 'lsc' or 'bucket' loadings per product
+    n_factors : int
+        Factors per product for 'pca' / 'lsc'
+    init_obs : int
+        Number of observations for initial covariance
+    buckets, all_nodes : dict, list
+        Bucket name -> nodes and the node order of each product block ('bucket' method)
+
+    Returns:
+    --------
+    FactorCovariance
+        Factor decays are loading-weighted averages of the node decays (one
+        distinct decay per factor: F uses the element-wise recursion, O(k^2) memory)
+    """
+    if method not in FACTOR_METHODS:
+        raise ValueError(f"Unknown factor method: {method}")
+    returns = np.asarray(getattr(combined_returns, 'values', combined_returns), dtype=np.float64)
+    lambda_vec = np.asarray(lambda_vec, dtype=np.float64)
+
+    loadings, factor_returns, factor_lambdas = [], [], []
+    residuals = np.empty_like(returns)
+    for start, end in product_indices.values():
+        block = returns[:, start:end]
+        block_cov = None
+        if method == 'pca':
+            block_cov = ewma_covariance_multi_lambda(block, lambda_vec[start:end], init_obs)
+        bucket_slices = None
+        if method == 'bucket':
+            positions = {node: k for k, node in enumerate(all_nodes[:end - start])}
+            bucket_slices = {}
+            for name, nodes in buckets.items():
+                idx = [positions[n] for n in nodes if n in positions]
+                bucket_slices[name] = slice(min(idx), max(idx) + 1) if idx else slice(0, 0)
+        L = factor_loadings(end - start, method, n_factors, block_cov, bucket_slices)
+
+        f = block @ np.linalg.pinv(L).T
+        loadings.append(L)
+        factor_returns.append(f)
+        residuals[:, start:end] = block - f @ L.T
+        weight = np.abs(L)
+        factor_lambdas.append(weight.T @ lambda_vec[start:end] / weight.sum(axis=0))
+
+    F = ewma_covariance_multi_lambda(np.hstack(factor_returns), np.concatenate(factor_lambdas), init_obs)
+    D = np.maximum(ewma_variances(residuals, lambda_vec, init_obs), 0.0)
+    return FactorCovariance(loadings, F, D)
+
+
+# ============================================================================
+# ACCURACY REPORT
+# ============================================================================
+
+def factor_accuracy_report(factor_cov: FactorCovariance, Sigma: np.ndarray, W: np.ndarray, w_total: np.ndarray,
+                           H: Optional[np.ndarray] = None) -> pd.DataFrame:
+    """
+    Factor model vs dense covariance on the quantities the reports use.
+
+    Parameters:
+    -----------
+    factor_cov : FactorCovariance
+        Factor model
+    Sigma : ndarray
+        Dense covariance (compute_multi_product_ewma_covariance)
+    W : ndarray
+        Strategy vectors (K x N)
+    w_total : ndarray
+        Total portfolio vector (N)
+    H : ndarray, optional
+        Hedge vectors (M x N), adds hedge rows
+
+    Returns:
+    --------
+    DataFrame : metric, dense, factor, abs_error, rel_error. Vector metrics
+    report their worst element; MC / Q errors are relative to the dense
+    portfolio Q and hedged-risk errors to the dense current risk.
+    """
+    rows = []
+
+    def add(metric, dense, factor, scale):
+        error = np.abs(np.asarray(factor) - np.asarray(dense))
+        worst = int(np.nanargmax(error)) if np.ndim(error) else 0
+        dense_value, factor_value = np.ravel(dense)[worst], np.ravel(factor)[worst]
+        abs_error = float(np.ravel(error)[worst])
+        rows.append({'metric': metric, 'dense': dense_value, 'factor': factor_value, 'abs_error': abs_error,
+                     'rel_error': abs_error / scale if scale > 0 else np.nan})
+
+    dense_factor = factor_cov.to_dense()
+    sigma_norm = np.linalg.norm(Sigma)
+    sigma_error = float(np.linalg.norm(dense_factor - Sigma))
+    rows.append({'metric': 'Sigma_frobenius', 'dense': sigma_norm, 'factor': np.linalg.norm(dense_factor),
+                 'abs_error': sigma_error, 'rel_error': sigma_error / sigma_norm if sigma_norm > 0 else np.nan})
+
+    dense = marginal_contributions(W, Sigma, w_total)
+    factor = marginal_contributions(W, factor_cov, w_total)
+    q_total = dense['Total_Q_portfolio']
+    add('Q_total', q_total, factor['Total_Q_portfolio'], q_total)
+    add('MC_to_total', dense['MC_to_total'], factor['MC_to_total'], q_total)
+    add('Strategy_Q_standalone', dense['Strategy_Q_standalone'], factor['Strategy_Q_standalone'], q_total)
+
+    if H is not None:
+        dense_hedges = evaluate_hedges(H, Sigma, w_total)
+        factor_hedges = evaluate_hedges(H, factor_cov, w_total)
+        current_risk = np.sqrt(dense_hedges['current_var'])
+        add('hedged_risk', np.sqrt(np.maximum(dense_hedges['hedged_var'], 0.0)),
+            np.sqrt(np.maximum(factor_hedges['hedged_var'], 0.0)), current_risk)
+        best_dense = np.nanargmin(dense_hedges['hedged_var'])
+        best_factor = np.nanargmin(factor_hedges['hedged_var'])
+        rows.append({'metric': 'best_hedge_index', 'dense': best_dense, 'factor': best_factor,
+                     'abs_error': float(best_dense != best_factor), 'rel_error': np.nan})
+
+    return pd.DataFrame(rows)
@@ -0,0 +1,390 @@
+"""
+Factor Decomposition
+
+Level / spread factor decomposition of bucket positions and factor MCs to the
+total portfolio (q_risk_report.ipynb sections 6-8). Positions are written as
+w = B e; factor MCs use the full covariance, so the factors of a bucket sum to
+that bucket's MC_to_total.
+
+compute_factor_attribution runs the decomposition for every bucket of every
+product at once: B and B⁺ are cached per (node set, bucket type) and each
+bucket is one matrix product across all products.
+"""
+
+import warnings
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .covariance_model import quadratic_form
+from .instrumentation import instrumented
+
+
+# ============================================================================
+# FACTOR MATRICES
+# ============================================================================
+
+def build_factor_matrix_bucket(nodes: List[str], bucket_type: str = 'front') -> Tuple[np.ndarray, List[str], Optional[str]]:
+    """
+    Build factor matrix B for a bucket.
+
+    For Front/Mid: Level + adjacent spreads (A01/A02, A02/A03, etc)
+    For Back: Level + longer spreads + residual
+
+    Returns:
+    --------
+    B : ndarray
+        Factor loadings (n_nodes x n_factors)
+    factor_names : list
+        Factor names
+    residual_name : str or None
+        'residual' for the back bucket
+    """
+    n_nodes = len(nodes)
+    level_factor = np.ones(n_nodes) / n_nodes
+
+    if bucket_type in ['front', 'mid']:
+        spread_factors = []
+        for i in range(n_nodes - 1):
+            spread = np.zeros(n_nodes)
+            spread[i] = 1
+            spread[i + 1] = -1
+            spread_factors.append(spread)
+        B = np.column_stack([level_factor] + spread_factors)
+        factor_names = ['Level'] + [f"{nodes[i]}/{nodes[i + 1]}" for i in range(n_nodes - 1)]
+        return B, factor_names, None
+
+    # Back: block averages A09-A11, A12-A13, A14-A15
+    block1_avg = np.zeros(n_nodes)
+    block1_avg[:3] = 1.0 / 3
+    block2_avg = np.zeros(n_nodes)
+    block2_avg[3:5] = 1.0 / 2
+    block3_avg = np.zeros(n_nodes)
+    block3_avg[5:] = 1.0 / 2
+
+    # Early-back (A09-A12) vs late-back (A13-A15)
+    early_back = np.zeros(n_nodes)
+    early_back[:4] = 1.0 / 4
+    late_back = np.zeros(n_nodes)
+    late_back[4:] = 1.0 / 3
+
+    # A09/A12
+    spread4 = np.zeros(n_nodes)
+    spread4[0] = 1
+    spread4[3] = -1
+
+    B = np.column_stack([level_factor, block1_avg - block2_avg, block2_avg - block3_avg,
+                         early_back - late_back, spread4])
+    factor_names = ['Level', 'Block1-Block2', 'Block2-Block3', 'Early-Late', 'A09/A12']
+    return B, factor_names, 'residual'
+
+
+@lru_cache(maxsize=None)
+def factor_basis(nodes: Tuple[str, ...], bucket_type: str) -> Tuple[np.ndarray, np.ndarray, Tuple[str, ...],
+                                                                   Optional[str]]:
+    """
+    (B, B⁺, factor_names, residual_name) for a bucket, cached per (node set, bucket type).
+
+    B⁺ is the inverse for square B and the pseudo-inverse otherwise (the
+    least-squares exposures of compute_factor_risk_metrics). Arrays are read-only.
+    """
+    B, factor_names, residual_name = build_factor_matrix_bucket(list(nodes), bucket_type)
+    B_pinv = np.linalg.inv(B) if B.shape[0] == B.shape[1] else np.linalg.pinv(B)
+    B.setflags(write=False)
+    B_pinv.setflags(write=False)
+    return B, B_pinv, tuple(factor_names), residual_name
+
+
+# ============================================================================
+# FACTOR RISK METRICS
+# ============================================================================
+
+def _skew_direction(slope: float) -> str:
+    return 'SELL' if slope > 0 else 'BUY' if slope < 0 else 'NEUTRAL'
+
+
+def compute_factor_risk_metrics(w_bucket: np.ndarray, Sigma_bucket: np.ndarray, B: np.ndarray,
+                                factor_names: List[str], Sigma_total: np.ndarray, w_total: np.ndarray,
+                                bucket_start_idx: int, n_total: int,
+                                residual_name: Optional[str] = None) -> Tuple[pd.DataFrame, float, float]:
+    """
+    Compute factor-level risk metrics using the FULL covariance matrix.
+
+    Parameters:
+    -----------
+    w_bucket : ndarray
+        Bucket node positions
+    Sigma_bucket : ndarray
+        Bucket covariance matrix (kept for the notebook signature; not used)
+    B : ndarray
+        Bucket factor matrix
+    factor_names : list
+        Factor names
+    Sigma_total : ndarray
+        Full covariance matrix (n_total x n_total)
+    w_total : ndarray
+        Full portfolio positions (n_total)
+    bucket_start_idx : int
+        Starting index of bucket nodes in full space
+    n_total : int
+        Total number of nodes
+    residual_name : str, optional
+        Name for residual factor (for back bucket)
+
+    Returns:
+    --------
+    factor_df : DataFrame
+        factor_name, qty_lots, marginal_slope, MC_$per_day, pct_of_bucket_Q, AS_skew_direction
+    bucket_MC_to_total : float
+        Bucket MC to total (for tie-out verification)
+    recon_error : float
+        Reconstruction error |B e - w_bucket|
+    """
+    # Factor exposures e with w = B e (inverse for square B, least squares otherwise)
+    if B.shape[0] == B.shape[1]:
+        try:
+            e = np.linalg.inv(B) @ w_bucket
+        except np.linalg.LinAlgError:
+            e = np.linalg.pinv(B) @ w_bucket
+    else:
+        e = np.linalg.lstsq(B, w_bucket, rcond=None)[0]
+
+    # Level loadings are 1/n and spreads sum to zero, so the Level exposure is the net position
+    if 'Level' in factor_names:
+        level_exposure = e[factor_names.index('Level')]
+        if abs(level_exposure - w_bucket.sum()) > 1e-6:
+            warnings.warn(f"Level exposure ({level_exposure:.2f}) != total net position ({w_bucket.sum():.2f})")
+
+    n_bucket_nodes, n_factors = B.shape
+    bucket_slice = slice(bucket_start_idx, bucket_start_idx + n_bucket_nodes)
+    Sigma_w = Sigma_total @ w_total
+    total_var = quadratic_form(Sigma_total, w_total, Sigma_w)
+    sqrt_total_var = np.sqrt(total_var) if total_var > 0 else 1e-10
+
+    bucket_mc_numerator = w_bucket @ Sigma_w[bucket_slice]
+    bucket_MC_to_total = 1000 * bucket_mc_numerator / sqrt_total_var if sqrt_total_var > 1e-10 else 0.0
+
+    # Marginal slopes B_full' Σ_total w_total; Euler MCs sum to the bucket MC
+    slope_f = B.T @ Sigma_w[bucket_slice]
+    MC_factor = 1000 * (e * slope_f) / sqrt_total_var if sqrt_total_var > 1e-10 else np.zeros(len(e))
+
+    w_recon = B @ e
+    recon_error = np.linalg.norm(w_recon - w_bucket)
+
+    if abs(bucket_MC_to_total) > 1e-10:
+        pct_of_bucket_MC = 100 * MC_factor / bucket_MC_to_total
+    else:
+        pct_of_bucket_MC = np.zeros(len(e))
+
+    factor_df = pd.DataFrame({
+        'factor_name': factor_names,
+        'qty_lots': e,
+        'marginal_slope': slope_f,
+        'MC_$per_day': MC_factor,
+        'pct_of_bucket_Q': pct_of_bucket_MC,
+        'AS_skew_direction': [_skew_direction(x) for x in slope_f],
+    })
+
+    if residual_name:
+        # Residual = bucket positions not explained by the factors
+        w_res_bucket = w_bucket - w_recon
+        res_norm = np.linalg.norm(w_res_bucket)
+        if res_norm > 1e-10:
+            residual_numerator = w_res_bucket @ Sigma_w[bucket_slice]
+            residual_MC = 1000 * residual_numerator / sqrt_total_var if sqrt_total_var > 1e-10 else 0.0
+            residual_row = pd.DataFrame({
+                'factor_name': [residual_name],
+                'qty_lots': [res_norm],
+                'marginal_slope': [residual_numerator / res_norm],
+                'MC_$per_day': [residual_MC],
+                'pct_of_bucket_Q': [100 * residual_MC / bucket_MC_to_total if abs(bucket_MC_to_total) > 1e-10 else 0],
+                'AS_skew_direction': ['NEUTRAL'],
+            })
+            factor_df = pd.concat([factor_df, residual_row], ignore_index=True)
+
+    return factor_df, bucket_MC_to_total, recon_error
+
+
+# ============================================================================
+# REPORT TABLES
+# ============================================================================
+
+def attribution_blocks(product_indices: Dict[str, Tuple[int, int]], buckets: Dict[str, List[str]],
+                       all_nodes: List[str]) -> List[Tuple[str, str, int, List[str]]]:
+    """(product, bucket, start index, nodes) for every bucket of every product block."""
+    blocks = []
+    for product, (start, end) in product_indices.items():
+        position = {node: k for k, node in enumerate(all_nodes[:end - start])}
+        for name, nodes in buckets.items():
+            if nodes and all(node in position for node in nodes):
+                blocks.append((product, name, start + position[nodes[0]], list(nodes)))
+    return blocks
+
+
+@instrumented('factor_attribution', lambda w_total, Sigma_total, blocks, *a, **k: {'blocks': len(blocks)})
+def compute_factor_attribution(w_total: np.ndarray, Sigma_total, blocks: List[Tuple[str, str, int, List[str]]],
+                               tie_out_tol: float = 1e-3) -> pd.DataFrame:
+    """
+    Factor exposures, marginal slopes and MCs for every (product, bucket) block at once.
+
+    For each bucket shape, the blocks of all products are stacked into W (P x n)
+    and decomposed together:
+
+        E      = W B⁺'                               exposures
+        S      = (Σ_total w_total)[block] B           marginal slopes B' Σ_total w_total
+        MC     = 1000 E * S / sqrt(w_total' Σ_total w_total)
+
+    Parameters:
+    -----------
+    w_total : ndarray
+        Full portfolio positions (N)
+    Sigma_total : ndarray or FactorCovariance
+        Full covariance (N x N); only Σ_total w_total is needed
+    blocks : list
+        (product, bucket, start index, nodes) per block, e.g. from attribution_blocks;
+        nodes are contiguous in w_total from the start index
+    tie_out_tol : float
+        Relative tolerance of the Level + Structure = bucket MC_to_total check
+
+    Returns:
+    --------
+    DataFrame : product, bucket, factor_name, qty_lots, marginal_slope, MC_$per_day,
+    pct_of_bucket_Q, AS_skew_direction, in block order (Level first, residual last)
+    """
+    w_total = np.asarray(w_total, dtype=np.float64)
+    Sigma_w = Sigma_total @ w_total
+    total_var = quadratic_form(Sigma_total, w_total, Sigma_w)
+    sqrt_total_var = np.sqrt(total_var) if total_var > 0 else 1e-10
+    scale = 1000 / sqrt_total_var if sqrt_total_var > 1e-10 else 0.0
+
+    groups: Dict[Tuple[Tuple[str, ...], str], List[int]] = {}
+    for k, (_, bucket, _, nodes) in enumerate(blocks):
+        groups.setdefault((tuple(nodes), bucket), []).append(k)
+
+    pieces = []
+    for (nodes, bucket), members in groups.items():
+        B, B_pinv, factor_names, residual_name = factor_basis(nodes, bucket.lower())
+        rows = np.array([blocks[k][2] for k in members])[:, None] + np.arange(len(nodes))[None, :]
+        W = w_total[rows]                                     # (P, n)
+        SW = Sigma_w[rows]
+
+        E = W @ B_pinv.T                                      # (P, k)
+        slopes = SW @ B
+        mc = scale * E * slopes
+        bucket_mc = scale * np.einsum('ij,ij->i', W, SW)
+
+        level = factor_names.index('Level') if 'Level' in factor_names else None
+        if level is not None:
+            bad = np.abs(E[:, level] - W.sum(axis=1)) > 1e-6
+            for k in np.flatnonzero(bad):
+                warnings.warn(f"Level exposure ({E[k, level]:.2f}) != total net position ({W[k].sum():.2f})")
+
+        names = np.array(factor_names, dtype=object)
+        order = np.arange(len(factor_names))
+        if residual_name:
+            R = W - E @ B.T
+            res_norm = np.linalg.norm(R, axis=1)
+            res_num = np.einsum('ij,ij->i', R, SW)
+            safe = np.where(res_norm > 1e-10, res_norm, 1.0)
+            E = np.column_stack([E, res_norm])
+            slopes = np.column_stack([slopes, res_num / safe])
+            mc = np.column_stack([mc, scale * res_num])
+            names = np.append(names, residual_name)
+            order = np.append(order, len(factor_names))
+            keep = np.column_stack([np.ones((len(members), len(factor_names)), dtype=bool), res_norm > 1e-10])
+        else:
+            keep = np.ones(E.shape, dtype=bool)
+
+        # Level + Structure (all factors, plus residual) must tie out to the bucket MC
+        factor_sum = np.where(keep, mc, 0.0).sum(axis=1)
+        significant = np.abs(bucket_mc) > 1e-10
+        rel_error = np.abs(factor_sum - bucket_mc)[significant] / np.abs(bucket_mc[significant])
+        assert (rel_error < tie_out_tol).all(), \
+            f"{bucket} Level+Structure tie-out failed: {rel_error.max():.6f}"
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            pct = np.where(np.abs(bucket_mc)[:, None] > 1e-10, 100 * mc / bucket_mc[:, None], 0.0)
+        skew = np.where(slopes > 0, 'SELL', np.where(slopes < 0, 'BUY', 'NEUTRAL')).astype(object)
+        if residual_name:
+            skew[:, -1] = 'NEUTRAL'
+
+        block_ids = np.broadcast_to(np.array(members)[:, None], E.shape)
+        factor_ids = np.broadcast_to(order[None, :], E.shape)
+        pieces.append({
+            'block': block_ids[keep], 'order': factor_ids[keep],
+            'factor_name': np.broadcast_to(names[None, :], E.shape)[keep],
+            'qty_lots': E[keep], 'marginal_slope': slopes[keep], 'MC_$per_day': mc[keep],
+            'pct_of_bucket_Q': pct[keep], 'AS_skew_direction': skew[keep],
+        })
+
+    columns = ['factor_name', 'qty_lots', 'marginal_slope', 'MC_$per_day', 'pct_of_bucket_Q', 'AS_skew_direction']
+    if not pieces:
+        return pd.DataFrame(columns=['product', 'bucket'] + columns)
+    merged = {key: np.concatenate([piece[key] for piece in pieces]) for key in pieces[0]}
+    sort = np.lexsort((merged['order'], merged['block']))
+    block = merged['block'][sort]
+    attribution = pd.DataFrame({
+        'product': np.array([b[0] for b in blocks], dtype=object)[block],
+        'bucket': np.array([b[1] for b in blocks], dtype=object)[block],
+    })
+    for key in columns:
+        attribution[key] = merged[key][sort]
+    return attribution
+
+
+@instrumented('factor_detail')
+def compute_factor_detail(w_total: np.ndarray, bucket_covs: Dict[str, np.ndarray], Sigma_total: np.ndarray,
+                          buckets: Dict[str, List[str]]) -> pd.DataFrame:
+    """
+    Factor detail table (factor_detail_df) for every bucket.
+
+    buckets maps bucket name ('Front', 'Mid', 'Back') -> nodes in Sigma_total order;
+    the bucket type passed to build_factor_matrix_bucket is the lower-cased name.
+    bucket_covs is kept for the notebook signature (factor MCs use Sigma_total).
+    """
+    blocks, start = [], 0
+    for name, nodes in buckets.items():
+        blocks.append(('', name, start, list(nodes)))
+        start += len(nodes)
+    return compute_factor_attribution(w_total, Sigma_total, blocks).drop(columns='product')
+
+
+def compute_level_structure(factor_detail_df: pd.DataFrame, bucket_summary_df: pd.DataFrame) -> pd.DataFrame:
+    """Level vs Structure (all spreads + residual) MC per bucket (level_structure_df)."""
+    rows = []
+    for bucket_name in factor_detail_df['bucket'].unique():
+        bucket_factors = factor_detail_df[factor_detail_df['bucket'] == bucket_name]
+        level_MC = bucket_factors.loc[bucket_factors['factor_name'] == 'Level', 'MC_$per_day'].iloc[0]
+        structure_MC = bucket_factors.loc[bucket_factors['factor_name'] != 'Level', 'MC_$per_day'].sum()
+        bucket_MC = bucket_summary_df.loc[bucket_summary_df['bucket'] == bucket_name, 'MC_to_total'].iloc[0]
+        if abs(bucket_MC) > 1e-10:
+            rel_error = abs(level_MC + structure_MC - bucket_MC) / abs(bucket_MC)
+            assert rel_error < 1e-3, f"{bucket_name} Level+Structure tie-out failed: {rel_error:.6f}"
+        rows.append({
+            'bucket': bucket_name,
+            'Level': level_MC,
+            'Structure': structure_MC,
+            'MC_to_total': bucket_MC,
+            'Level_pct': 100 * level_MC / bucket_MC if abs(bucket_MC) > 1e-10 else 0,
+            'Structure_pct': 100 * structure_MC / bucket_MC if abs(bucket_MC) > 1e-10 else 0,
+        })
+    return pd.DataFrame(rows)
+
+
+def compute_top_drivers(factor_detail_df: pd.DataFrame) -> pd.DataFrame:
+    """Top factor by |MC| per bucket with its skew direction (top_drivers_df)."""
+    rows = []
+    for bucket_name in factor_detail_df['bucket'].unique():
+        bucket_factors = factor_detail_df[factor_detail_df['bucket'] == bucket_name]
+        top_factor = bucket_factors.loc[bucket_factors['MC_$per_day'].abs().idxmax()]
+        rows.append({
+            'bucket': bucket_name,
+            'top_factor_by_abs_MC': top_factor['factor_name'],
+            'factor_qty': top_factor['qty_lots'],
+            'factor_slope': top_factor['marginal_slope'],
+            'factor_MC': top_factor['MC_$per_day'],
+            'AS_direction': top_factor['AS_skew_direction'],
+        })
+    return pd.DataFrame(rows)
@@ -0,0 +1,308 @@
+"""
+Stage Instrumentation
+
+Spans around the stages of a run (expansion, data load, holiday filter, each
+EWMA call, MCs, factor and hedge stages) record wall time, CPU time, peak
+memory and the rows / columns the stage worked on into a run manifest:
+
+    with record_run('manifest.json', profile_dir='profiles'):
+        engine.position_mc_report(delta_positions_df, delta_summary_df)
+
+    with span('holiday_filter', dates=len(dates)) as s:
+        ...
+        s.count(kept=int(keep.sum()))
+
+    @instrumented('ewma')
+    def ewma_covariance(returns, ...): ...
+
+Outside record_run, span() returns a shared no-op and instrumented functions
+call straight through, so the library pays one global lookup per call.
+Finished spans are logged at DEBUG on the 'risk_engine' logger.
+
+Memory is the process peak RSS (high-water mark since start, from
+getrusage) and, with trace_memory, the tracemalloc peak inside the span
+(Python allocations and numpy buffers; tracing slows allocation-heavy code).
+Spans run in worker processes (workers > 1) are not recorded.
+"""
+
+import cProfile
+import functools
+import json
+import logging
+import os
+import platform
+import re
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:                                                   # Windows
+    resource = None
+
+logger = logging.getLogger('risk_engine')
+
+# Active recorder (None: instrumentation disabled)
+_RECORDER: Optional['RunRecorder'] = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Process peak resident set size in MB (None where getrusage is unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10       # bytes on macOS, KB on Linux
+
+
+def shape_counts(obj) -> Dict[str, int]:
+    """{'rows', 'columns'} of a DataFrame / ndarray (first element of a tuple); {} otherwise."""
+    if isinstance(obj, tuple) and obj:
+        obj = obj[0]
+    shape = getattr(obj, 'shape', None)
+    if not isinstance(shape, tuple) or not shape:
+        return {}
+    counts = {'rows': int(shape[0])}
+    if len(shape) > 1:
+        counts['columns'] = int(shape[1])
+    return counts
+
+
+# ============================================================================
+# SPANS
+# ============================================================================
+
+class _NullSpan:
+    """Span used while instrumentation is disabled."""
+
+    def __enter__(self) -> '_NullSpan':
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+    def count(self, **counts) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """One timed stage; created by span() while a recorder is active."""
+
+    def __init__(self, recorder: 'RunRecorder', name: str, counts: Dict[str, int]):
+        self.recorder = recorder
+        self.name = name
+        self.counts = dict(counts)
+        self.child_traced_peak = 0
+        self.profiler: Optional[cProfile.Profile] = None
+
+    def count(self, **counts) -> None:
+        """Add or overwrite row / column counts."""
+        self.counts.update(counts)
+
+    def __enter__(self) -> 'Span':
+        self.recorder._enter(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.recorder._exit(self, exc_type)
+        return False
+
+
+def span(name: str, **counts):
+    """Context manager timing a stage (no-op unless a recorder is active)."""
+    recorder = _RECORDER
+    if recorder is None:
+        return _NULL_SPAN
+    return Span(recorder, name, counts)
+
+
+def instrumented(name: Optional[str] = None, counts: Optional[Callable[..., Dict[str, int]]] = None):
+    """
+    Decorator running the function inside span(name).
+
+    Parameters:
+    -----------
+    name : str, optional
+        Span name (default: the function name)
+    counts : callable, optional
+        f(*args, **kwargs) -> counts for the span (default: shape_counts of the first argument)
+    """
+    def decorate(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            recorder = _RECORDER
+            if recorder is None:
+                return fn(*args, **kwargs)
+            sizes = counts(*args, **kwargs) if counts is not None else (shape_counts(args[0]) if args else {})
+            with Span(recorder, span_name, sizes):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# ============================================================================
+# RUN RECORDER
+# ============================================================================
+
+class RunRecorder:
+    """
+    Collects finished spans into a run manifest.
+
+    Parameters:
+    -----------
+    profile_dir : str, optional
+        Directory for one cProfile dump per outermost profiled span
+    profile : set of str, optional
+        Span names to profile (default: all, when profile_dir is set); spans
+        nested in a profiled span are covered by its dump
+    trace_memory : bool
+        Record the tracemalloc peak inside each span
+    """
+
+    def __init__(self, profile_dir: Optional[str] = None, profile: Optional[set] = None,
+                 trace_memory: bool = False):
+        self.profile_dir = profile_dir
+        self.profile = set(profile) if profile is not None else None
+        self.trace_memory = trace_memory
+        self.spans: List[dict] = []
+        self._stack: List[Span] = []
+        self._profiling = False
+        self._started_tracing = False
+        self.started = datetime.now()
+        self._t0 = time.perf_counter()
+
+    def start(self) -> None:
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self) -> None:
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _enter(self, s: Span) -> None:
+        parent = self._stack[-1] if self._stack else None
+        s.path = f"{parent.path}/{s.name}" if parent is not None else s.name
+        self._stack.append(s)
+        if self.trace_memory and tracemalloc.is_tracing():
+            if parent is not None:
+                # The parent's peak so far survives the reset through child_traced_peak
+                parent.child_traced_peak = max(parent.child_traced_peak, tracemalloc.get_traced_memory()[1])
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+        if self.profile_dir is not None and not self._profiling and (self.profile is None or s.name in self.profile):
+            s.profiler = cProfile.Profile()
+            self._profiling = True
+            s.profiler.enable()
+        s.start = time.perf_counter()
+        s.cpu_start = time.process_time()
+
+    def _exit(self, s: Span, exc_type) -> None:
+        wall = time.perf_counter() - s.start
+        cpu = time.process_time() - s.cpu_start
+        profile_file = None
+        if s.profiler is not None:
+            s.profiler.disable()
+            self._profiling = False
+            os.makedirs(self.profile_dir, exist_ok=True)
+            safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', s.path)
+            profile_file = os.path.join(self.profile_dir, f"{len(self.spans):04d}_{safe_name}.prof")
+            s.profiler.dump_stats(profile_file)
+
+        traced_peak = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            traced_peak = max(tracemalloc.get_traced_memory()[1], s.child_traced_peak)
+        self._stack.pop()
+        if traced_peak is not None and self._stack:
+            self._stack[-1].child_traced_peak = max(self._stack[-1].child_traced_peak, traced_peak)
+
+        record = {
+            'name': s.name,
+            'path': s.path,
+            'depth': len(self._stack),
+            'start_s': s.start - self._t0,
+            'wall_s': wall,
+            'cpu_s': cpu,
+            'rss_peak_mb': peak_rss_mb(),
+            'traced_peak_mb': traced_peak / 2 ** 20 if traced_peak is not None else None,
+            'counts': s.counts,
+            'profile': profile_file,
+            'error': exc_type.__name__ if exc_type is not None else None,
+        }
+        self.spans.append(record)
+        if logger.isEnabledFor(logging.DEBUG):
+            counts = ' '.join(f"{k}={v}" for k, v in s.counts.items())
+            logger.debug("%s: %.3fs wall, %.3fs cpu %s", s.path, wall, cpu, counts)
+
+    def totals(self) -> Dict[str, dict]:
+        """Calls, wall and CPU seconds per span name."""
+        totals: Dict[str, dict] = {}
+        for record in self.spans:
+            total = totals.setdefault(record['name'], {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0})
+            total['calls'] += 1
+            total['wall_s'] += record['wall_s']
+            total['cpu_s'] += record['cpu_s']
+        return totals
+
+    def manifest(self) -> dict:
+        return {
+            'started': self.started.isoformat(timespec='seconds'),
+            'wall_s': time.perf_counter() - self._t0,
+            'argv': list(sys.argv),
+            'pid': os.getpid(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'trace_memory': self.trace_memory,
+            'rss_peak_mb': peak_rss_mb(),
+            'spans': self.spans,                                     # in finishing order (children first)
+            'totals': self.totals(),
+        }
+
+    def write(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.manifest(), f, indent=1)
+
+
+@contextmanager
+def record_run(manifest_file: Optional[str] = None, profile_dir: Optional[str] = None,
+               profile: Optional[set] = None, trace_memory: bool = False) -> Iterator[RunRecorder]:
+    """
+    Enable instrumentation for the block and write the manifest (JSON) when it
+    ends, including when it raises. Nested record_run calls are not supported.
+    """
+    global _RECORDER
+    if _RECORDER is not None:
+        raise RuntimeError("A run is already being recorded")
+    recorder = RunRecorder(profile_dir, profile, trace_memory)
+    recorder.start()
+    _RECORDER = recorder
+    try:
+        yield recorder
+    finally:
+        _RECORDER = None
+        recorder.stop()
+        if manifest_file is not None:
+            recorder.write(manifest_file)
+            logger.info("Run manifest: %s (%d spans)", manifest_file, len(recorder.spans))
+
+
+def configure_logging(verbosity: int = 0) -> None:
+    """Console logging for the 'risk_engine' logger: -1 warnings, 0 info, 1+ debug (span timings)."""
+    level = logging.WARNING if verbosity < 0 else logging.INFO if verbosity == 0 else logging.DEBUG
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+    logger.setLevel(level)
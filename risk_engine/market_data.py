@@ -0,0 +1,239 @@
+"""
+Market Data Cache
+
+Converts a wide price/returns CSV (data_.csv, returns.csv: a 'date' column plus
+'{product}_A{node}' columns) once into a binary columnar store, and serves any
+product's node matrix as a zero-copy view of a memory map.
+
+Cache layout (<cache_dir>/<file name>.<path hash>/):
+- values.npy : float64 (n_products x n_dates x max_nodes), NaN-padded
+- dates.npy  : int64 date axis (datetime64[ns] ticks, ascending)
+- meta.json  : source size / mtime / SHA-256, array file sizes, products and node numbers
+
+The cache is rebuilt when the source changes: a different size or mtime
+triggers a content hash check, and only a different hash forces a rebuild.
+A missing or truncated array file (size differs from meta.json) also forces
+a rebuild.
+"""
+
+import hashlib
+import json
+import os
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .instrumentation import span
+
+# Node columns as selected in the notebooks: '{product}_A{n}', no '/' spreads
+NODE_COLUMN_RE = re.compile(r'^(.+?)_A(\d+)$')
+
+CACHE_VERSION = 2
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parse_node_columns(columns) -> Dict[str, List[tuple]]:
+    """
+    Group '{product}_A{n}' columns by product, sorted by node number.
+
+    Returns:
+    --------
+    dict : product -> [(node number, column name), ...]
+    """
+    by_product: Dict[str, List[tuple]] = {}
+    for col in columns:
+        match = NODE_COLUMN_RE.match(col)
+        if match is None or '/' in col:
+            continue
+        by_product.setdefault(match.group(1), []).append((int(match.group(2)), col))
+    return {product: sorted(nodes) for product, nodes in by_product.items()}
+
+
+class MarketDataStore:
+    """
+    Memory-mapped product x date x node price (or returns) store.
+
+    Parameters:
+    -----------
+    source : str
+        Wide CSV with a 'date' column (e.g., 'data_.csv', 'returns.csv')
+    cache_dir : str
+        Directory for cached stores
+    rebuild : bool
+        Force conversion even if a valid cache exists
+    """
+
+    def __init__(self, source: str = 'data_.csv', cache_dir: str = '.market_cache', rebuild: bool = False):
+        self.source = source
+        path_key = hashlib.sha256(os.path.abspath(source).encode()).hexdigest()[:12]
+        self.cache_path = os.path.join(cache_dir, f'{os.path.basename(source)}.{path_key}')
+        self.rebuilt = False
+
+        meta = None if rebuild else self._valid_meta()
+        if meta is None:
+            meta = self._build()
+            self.rebuilt = True
+
+        self.products: List[str] = meta['products']
+        self.nodes: Dict[str, List[int]] = {p: meta['nodes'][p] for p in self.products}
+        self._columns: Dict[str, List[str]] = {p: meta['columns'][p] for p in self.products}
+        self._product_index = {p: i for i, p in enumerate(self.products)}
+        self._values = np.load(os.path.join(self.cache_path, 'values.npy'), mmap_mode='r')
+        self._dates = np.load(os.path.join(self.cache_path, 'dates.npy'), mmap_mode='r')
+
+    # ------------------------------------------------------------------------
+    # Cache management
+    # ------------------------------------------------------------------------
+
+    def _source_stat(self) -> Dict[str, int]:
+        stat = os.stat(self.source)
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def _valid_meta(self) -> Optional[dict]:
+        """Cached metadata if it still describes the source, else None."""
+        meta_file = os.path.join(self.cache_path, 'meta.json')
+        if not os.path.exists(meta_file):
+            return None
+        with open(meta_file) as f:
+            meta = json.load(f)
+        if meta.get('version') != CACHE_VERSION:
+            return None
+        for name, size in meta['file_sizes'].items():
+            path = os.path.join(self.cache_path, name)
+            if not os.path.exists(path) or os.path.getsize(path) != size:
+                return None
+
+        stat = self._source_stat()
+        if stat == meta['source_stat']:
+            return meta
+        # Touched but possibly unchanged (e.g., re-exported): compare contents
+        if file_sha256(self.source) != meta['source_sha256']:
+            return None
+        meta['source_stat'] = stat
+        self._write_json(meta_file, meta)
+        return meta
+
+    @staticmethod
+    def _write_json(path: str, payload: dict) -> None:
+        with open(path + '.tmp', 'w') as f:
+            json.dump(payload, f, indent=2)
+        os.replace(path + '.tmp', path)
+
+    def _build(self) -> dict:
+        """Parse the CSV once and write the binary store."""
+        os.makedirs(self.cache_path, exist_ok=True)
+        stat = self._source_stat()
+        sha = file_sha256(self.source)
+
+        df_raw = pd.read_csv(self.source, encoding='utf-8-sig')
+        df_raw['date'] = pd.to_datetime(df_raw['date'])
+        df_raw = df_raw.set_index('date').sort_index()
+
+        by_product = parse_node_columns(df_raw.columns)
+        products = list(by_product)
+        max_nodes = max((len(nodes) for nodes in by_product.values()), default=0)
+
+        values = np.full((len(products), len(df_raw), max_nodes), np.nan)
+        for p, product in enumerate(products):
+            cols = [col for _, col in by_product[product]]
+            values[p, :, :len(cols)] = df_raw[cols].to_numpy(dtype=np.float64)
+
+        file_sizes = {}
+        for name, array in [('values.npy', values),
+                            ('dates.npy', df_raw.index.values.astype('datetime64[ns]').view(np.int64))]:
+            path = os.path.join(self.cache_path, name)
+            with open(path + '.tmp', 'wb') as f:
+                np.save(f, array)
+            os.replace(path + '.tmp', path)
+            file_sizes[name] = os.path.getsize(path)
+
+        meta = {
+            'version': CACHE_VERSION,
+            'source': os.path.abspath(self.source),
+            'source_stat': stat,
+            'source_sha256': sha,
+            'file_sizes': file_sizes,
+            'products': products,
+            'nodes': {product: [n for n, _ in nodes] for product, nodes in by_product.items()},
+            'columns': {product: [col for _, col in nodes] for product, nodes in by_product.items()},
+        }
+        self._write_json(os.path.join(self.cache_path, 'meta.json'), meta)
+        return meta
+
+    # ------------------------------------------------------------------------
+    # Access
+    # ------------------------------------------------------------------------
+
+    @property
+    def dates(self) -> pd.DatetimeIndex:
+        """Date axis (ascending)."""
+        return pd.DatetimeIndex(np.asarray(self._dates).view('datetime64[ns]'), name='date')
+
+    @property
+    def date_ticks(self) -> np.ndarray:
+        """Date axis as int64 datetime64[ns] ticks (memory-mapped)."""
+        return self._dates
+
+    @property
+    def values(self) -> np.ndarray:
+        """Full (n_products x n_dates x max_nodes) memory map, NaN-padded, products in self.products order."""
+        return self._values
+
+    def columns(self, product: str) -> List[str]:
+        """Column names for a product in node order (e.g., ['clbr_A01', ...])."""
+        return list(self._columns[product])
+
+    def node_matrix(self, product: str) -> np.ndarray:
+        """
+        Read-only (n_dates x n_nodes) view for a product, nodes ascending.
+
+        No copy is made: the array is a slice of the memory map.
+        """
+        if product not in self._product_index:
+            raise KeyError(f"No node columns for product: {product}")
+        return self._values[self._product_index[product], :, :len(self.nodes[product])]
+
+    def frame(self, product: str) -> pd.DataFrame:
+        """Node matrix as a DataFrame indexed by date (columns '{product}_A01', ...)."""
+        return pd.DataFrame(self.node_matrix(product), index=self.dates, columns=self.columns(product),
+                            copy=False)
+
+
+def load_market_data(source: str = 'data_.csv', cache_dir: str = '.market_cache') -> MarketDataStore:
+    """Open (building or refreshing if needed) the cached store for a wide price CSV."""
+    with span('data_load') as s:
+        store = MarketDataStore(source, cache_dir)
+        s.count(dates=len(store.dates), products=len(store.products), rebuilt=store.rebuilt)
+    return store
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    source = sys.argv[1] if len(sys.argv) > 1 else 'returns.csv'
+
+    start = time.perf_counter()
+    pd.read_csv(source)
+    t_csv = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store = load_market_data(source)
+    t_open = time.perf_counter() - start
+
+    print("=" * 80)
+    print("MARKET DATA CACHE")
+    print("=" * 80)
+    print(f"Source: {source} ({len(store.dates)} dates, products: {store.products})")
+    print(f"Cache: {store.cache_path} ({'rebuilt' if store.rebuilt else 'reused'})")
+    print(f"CSV parse: {t_csv:.3f}s, store open: {t_open:.3f}s")
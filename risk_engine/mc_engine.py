@@ -0,0 +1,299 @@
+"""
+Batched Marginal Contribution Engine
+
+Stacks every (strategy, product) position vector into one matrix W and derives
+all MCs, standalone Q-risks and bucket labels from Σ w_total computed once:
+
+    MC    = 1000 * W (Σ w_total) / sqrt(w_total' Σ w_total)
+    Q     = 1000 * sqrt(diag(W Σ W'))          (row-wise quadratic form)
+
+Results match the per-strategy loops in position_mc_report_clean.ipynb.
+"""
+
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .covariance_model import quadratic_form
+from .instrumentation import instrumented
+from .node_map import NodeMap, as_node_map
+
+
+# ============================================================================
+# NODE MAPPING & POSITION MATRICES
+# ============================================================================
+
+def build_contract_to_node(delta_summary_df: pd.DataFrame, n_nodes: int = 15) -> Dict[str, str]:
+    """Map the first n_nodes tenors of delta_summary (calendar order) to A01..A{n_nodes}."""
+    unique_tenors = delta_summary_df['Tenor'].unique()
+    return {tenor: f"A{idx + 1:02d}" for idx, tenor in enumerate(unique_tenors[:n_nodes])}
+
+
+def _block_offsets(products: List[str], n_nodes: int,
+                   product_indices: Optional[Dict[str, Tuple[int, int]]] = None) -> Dict[str, int]:
+    if product_indices is not None:
+        return {product: product_indices[product][0] for product in products}
+    return {product: k * n_nodes for k, product in enumerate(products)}
+
+
+def build_strategy_matrix(delta_positions_df: pd.DataFrame, contract_to_node: Union[NodeMap, Dict[str, str]],
+                          all_nodes: List[str], products: List[str],
+                          product_indices: Optional[Dict[str, Tuple[int, int]]] = None
+                          ) -> Tuple[np.ndarray, pd.DataFrame]:
+    """
+    Position matrix for every (strategy, product) in one scatter.
+
+    Row order is products sorted, then strategies sorted (the notebook loop
+    order). Columns follow the combined layout: product blocks of len(all_nodes)
+    in `products` order, or at the offsets in product_indices.
+
+    Parameters:
+    -----------
+    delta_positions_df : DataFrame
+        Expanded positions (Qty, Tenor, Mapped_Product, Strategy)
+    contract_to_node : NodeMap or dict
+        Tenor -> node mapping (a dict is wrapped with NodeMap.from_contract_to_node)
+    all_nodes : list
+        List of all node codes (A01-A15)
+    products : list
+        Mapped products in combined-vector order
+    product_indices : dict, optional
+        Product -> (start_idx, end_idx) in the combined vector
+
+    Returns:
+    --------
+    W : ndarray
+        Position matrix (n_rows x n_products * n_nodes)
+    keys : DataFrame
+        Strategy, Product and Tenor_count (distinct tenors, mapped or not) per row
+    """
+    positions = delta_positions_df[delta_positions_df['Mapped_Product'].isin(products)]
+    offsets = _block_offsets(products, len(all_nodes), product_indices)
+    n_cols = (max(end for _, end in product_indices.values()) if product_indices is not None
+              else len(products) * len(all_nodes))
+
+    grouped = positions.groupby(['Mapped_Product', 'Strategy'], sort=True)
+    keys = grouped['Tenor'].nunique().reset_index()
+    keys.columns = ['Product', 'Strategy', 'Tenor_count']
+    keys = keys[['Strategy', 'Product', 'Tenor_count']]
+
+    row_index = pd.MultiIndex.from_frame(keys[['Product', 'Strategy']])
+    rows = row_index.get_indexer(pd.MultiIndex.from_frame(positions[['Mapped_Product', 'Strategy']]))
+    W = as_node_map(contract_to_node, all_nodes).position_matrix(
+        rows, positions['Tenor'].to_numpy(), positions['Qty'].to_numpy(), len(keys),
+        offsets=positions['Mapped_Product'].map(offsets).to_numpy(dtype=np.intp), n_cols=n_cols)
+    return W, keys
+
+
+def build_total_vector(delta_summary_df: pd.DataFrame, contract_to_node: Union[NodeMap, Dict[str, str]],
+                       all_nodes: List[str],
+                       products: List[str],
+                       product_indices: Optional[Dict[str, Tuple[int, int]]] = None) -> np.ndarray:
+    """
+    Total portfolio vector from delta_summary in the combined layout
+    (one product -> the 15-node w_total of the single-product loop).
+    """
+    offsets = _block_offsets(products, len(all_nodes), product_indices)
+    n_cols = (max(end for _, end in product_indices.values()) if product_indices is not None
+              else len(products) * len(all_nodes))
+    w_total = np.zeros(n_cols)
+
+    nodes = as_node_map(contract_to_node, all_nodes).node_index(delta_summary_df['Tenor'].to_numpy())
+    for product in products:
+        if product not in delta_summary_df.columns:
+            continue
+        position = delta_summary_df[product].to_numpy(dtype=np.float64)
+        use = (nodes >= 0) & (np.abs(position) > 1e-10)
+        w_total[offsets[product] + nodes[use]] = position[use]
+    return w_total
+
+
+def bucket_labels(W_nodes: np.ndarray, front: List[str], mid: List[str], back: List[str],
+                  all_nodes: List[str]) -> np.ndarray:
+    """determine_bucket for every row: 'Front', 'Mid', 'Back', 'Mixed' or 'None'."""
+    active = np.abs(W_nodes) > 1e-10
+    has = np.column_stack([active[:, [all_nodes.index(n) for n in bucket]].any(axis=1)
+                           for bucket in (front, mid, back)])
+    n_buckets = has.sum(axis=1)
+    single = np.array(['Front', 'Mid', 'Back'], dtype=object)[has.argmax(axis=1)]
+    return np.where(n_buckets == 0, 'None', np.where(n_buckets == 1, single, 'Mixed')).astype(object)
+
+
+# ============================================================================
+# MC CORE
+# ============================================================================
+
+@instrumented('marginal_contributions')
+def marginal_contributions(W: np.ndarray, Sigma: np.ndarray, w_total: np.ndarray,
+                           min_denominator: float = 0.0) -> Dict[str, np.ndarray]:
+    """
+    MC to total, standalone Q and their components for every row of W at once.
+
+    Parameters:
+    -----------
+    W : ndarray
+        Position vectors (n_rows x N)
+    Sigma : ndarray or FactorCovariance
+        Covariance matrix (N x N)
+    w_total : ndarray
+        Total portfolio vector (N)
+    min_denominator : float
+        MC is 0 when sqrt(w_total' Σ w_total) <= this (or the variance is <= 0)
+
+    Returns:
+    --------
+    dict with arrays 'MC_to_total', 'Strategy_Q_standalone', 'Strategy_var',
+    'MC_numerator' and scalars 'Total_var', 'MC_denominator', 'Total_Q_portfolio'
+    """
+    Sigma_w = Sigma @ w_total
+    total_var = quadratic_form(Sigma, w_total, Sigma_w)
+    numerator = W @ Sigma_w
+    strategy_var = np.einsum('ij,ij->i', W @ Sigma, W)
+
+    denominator = np.sqrt(total_var) if total_var > 0 else 0.0
+    if total_var > 0 and denominator > min_denominator:
+        mc = 1000 * numerator / denominator
+    else:
+        mc = np.zeros(len(W))
+
+    return {
+        'MC_to_total': mc,
+        'Strategy_Q_standalone': 1000 * np.sqrt(np.maximum(strategy_var, 0.0)),
+        'Strategy_var': strategy_var,
+        'MC_numerator': numerator,
+        'Total_var': total_var,
+        'MC_denominator': denominator,
+        'Total_Q_portfolio': 1000 * denominator,
+    }
+
+
+# ============================================================================
+# REPORT TABLES
+# ============================================================================
+
+@instrumented('position_mc')
+def compute_position_mc_table(delta_positions_df: pd.DataFrame, delta_summary_df: pd.DataFrame,
+                              product_covariances: Dict[str, np.ndarray],
+                              contract_to_node: Union[NodeMap, Dict[str, str]],
+                              all_nodes: List[str], front: List[str], mid: List[str], back: List[str],
+                              diagnostics: bool = False) -> pd.DataFrame:
+    """
+    Single-product MC table (position_mc_results): each strategy's MC to its
+    own product's total, one matrix product per product.
+
+    Parameters:
+    -----------
+    product_covariances : dict
+        Mapped product -> Sigma_total (n_nodes x n_nodes); products without one are skipped
+
+    Returns:
+    --------
+    DataFrame : Strategy, Product, MC_to_total, Qty_total, Tenor_count, Bucket
+                (+ Strategy_Q_standalone, Total_Q_portfolio, MC_numerator, MC_denominator,
+                MC_ratio, Strategy_var, Total_var when diagnostics=True)
+    """
+    products = sorted(p for p in delta_positions_df['Mapped_Product'].unique() if p in product_covariances)
+    contract_to_node = as_node_map(contract_to_node, all_nodes)
+    tables = []
+    for product in products:
+        W, keys = build_strategy_matrix(delta_positions_df, contract_to_node, all_nodes, [product])
+        w_total = build_total_vector(delta_summary_df, contract_to_node, all_nodes, [product])
+        result = marginal_contributions(W, product_covariances[product], w_total)
+
+        table = keys.copy()
+        table['MC_to_total'] = result['MC_to_total']
+        table['Qty_total'] = np.abs(W).sum(axis=1)
+        table['Bucket'] = bucket_labels(W, front, mid, back, all_nodes)
+        if diagnostics:
+            table['Strategy_Q_standalone'] = result['Strategy_Q_standalone']
+            table['Total_Q_portfolio'] = result['Total_Q_portfolio']
+            table['MC_numerator'] = result['MC_numerator']
+            table['MC_denominator'] = result['MC_denominator']
+            table['MC_ratio'] = (result['MC_numerator'] / result['MC_denominator']
+                                 if result['MC_denominator'] > 0 else 0.0)
+            table['Strategy_var'] = result['Strategy_var']
+            table['Total_var'] = result['Total_var']
+        tables.append(table[table['Qty_total'] >= 1e-10])
+
+    columns = ['Strategy', 'Product', 'MC_to_total', 'Qty_total', 'Tenor_count', 'Bucket']
+    if not tables:
+        return pd.DataFrame(columns=columns)
+    table = pd.concat(tables, ignore_index=True)
+    extra = [c for c in table.columns if c not in columns]
+    return table[columns + extra]
+
+
+@instrumented('multi_product_mc')
+def compute_multi_product_mc_table(delta_positions_df: pd.DataFrame, delta_summary_df: pd.DataFrame,
+                                   Sigma_multi: np.ndarray, product_indices: Dict[str, Tuple[int, int]],
+                                   contract_to_node: Union[NodeMap, Dict[str, str]], all_nodes: List[str],
+                                   position_mc_df: Optional[pd.DataFrame] = None) -> Tuple[pd.DataFrame, np.ndarray]:
+    """
+    MC of every strategy to the combined portfolio under the multi-product Σ.
+
+    Parameters:
+    -----------
+    Sigma_multi : ndarray
+        Multi-product covariance (product blocks at product_indices)
+    product_indices : dict
+        Product -> (start_idx, end_idx) in the combined vector
+    position_mc_df : DataFrame, optional
+        Single-product results; adds MC_original, Difference and Pct_change
+
+    Returns:
+    --------
+    mc_multi_df : DataFrame
+        Strategy, Product, [MC_original,] MC_multi_product, [Difference, Pct_change,] Qty_total
+    w_total_combined : ndarray
+        Combined total portfolio vector
+    """
+    products = list(product_indices)
+    W, keys = build_strategy_matrix(delta_positions_df, contract_to_node, all_nodes, products, product_indices)
+    w_total_combined = build_total_vector(delta_summary_df, contract_to_node, all_nodes, products, product_indices)
+    result = marginal_contributions(W, Sigma_multi, w_total_combined, min_denominator=1e-10)
+
+    mc_multi_df = keys[['Strategy', 'Product']].copy()
+    mc_multi_df['MC_multi_product'] = result['MC_to_total']
+    mc_multi_df['Qty_total'] = np.abs(W).sum(axis=1)
+    mc_multi_df = mc_multi_df[mc_multi_df['Qty_total'] >= 1e-10]
+
+    if position_mc_df is not None:
+        mc_multi_df = position_mc_df[['Strategy', 'Product', 'MC_to_total']].rename(
+            columns={'MC_to_total': 'MC_original'}).merge(mc_multi_df, on=['Strategy', 'Product'], how='inner')
+        mc_multi_df['Difference'] = mc_multi_df['MC_multi_product'] - mc_multi_df['MC_original']
+        original = mc_multi_df['MC_original'].to_numpy()
+        safe = np.where(np.abs(original) > 1e-10, np.abs(original), 1.0)
+        mc_multi_df['Pct_change'] = np.where(np.abs(original) > 1e-10,
+                                             mc_multi_df['Difference'].to_numpy() / safe * 100, 0.0)
+        mc_multi_df = mc_multi_df[['Strategy', 'Product', 'MC_original', 'MC_multi_product',
+                                   'Difference', 'Pct_change', 'Qty_total']]
+
+    return mc_multi_df.reset_index(drop=True), w_total_combined
+
+
+@instrumented('bucket_mc')
+def compute_bucket_mc(Sigma_multi: np.ndarray, w_total_combined: np.ndarray,
+                      product_indices: Dict[str, Tuple[int, int]], all_nodes: List[str],
+                      front: List[str], mid: List[str], back: List[str]) -> pd.DataFrame:
+    """MC of the Front / Mid / Back slices of the combined portfolio (shared covariance)."""
+    bucket_of_node = np.array(['Front' if n in front else 'Mid' if n in mid else 'Back' if n in back else ''
+                               for n in all_nodes], dtype=object)
+    node_bucket = np.full(len(w_total_combined), '', dtype=object)
+    for start, end in product_indices.values():
+        node_bucket[start:end] = bucket_of_node[:end - start]
+
+    buckets = ['Front', 'Mid', 'Back']
+    B = np.stack([np.where(node_bucket == bucket, w_total_combined, 0.0) for bucket in buckets])
+
+    Sigma_w = Sigma_multi @ w_total_combined
+    total_var = quadratic_form(Sigma_multi, w_total_combined, Sigma_w)
+    denominator = np.sqrt(total_var) if total_var > 0 else 1e-10
+    mc = 1000.0 * (B @ Sigma_w) / denominator
+
+    return pd.DataFrame({
+        'Bucket': buckets,
+        'MC_to_total': mc,
+        'Qty_total': np.abs(B).sum(axis=1),
+        'MC_signed': ['POS' if x > 0 else 'NEG' if x < 0 else 'ZERO' for x in mc],
+    })
@@ -0,0 +1,315 @@
+"""
+Monte Carlo P&L Engine
+
+Simulated P&L distributions per strategy and for the book, driven by the EWMA
+covariance:
+
+    shocks = z G'        G G' = Σ,  z unit-variance innovations
+
+G is the Cholesky factor of a dense Σ (eigen-factor with negative eigenvalues
+clipped when Σ is not positive definite), or [B chol(F), diag(√D)] for a
+FactorCovariance. Because P&L is linear in the shocks, each chunk is one
+product z (G' W') with G' W' formed once per run.
+
+Innovations:
+    'normal'    : independent N(0, 1)
+    'student_t' : multivariate t with df degrees of freedom, scaled to unit variance
+    'bootstrap' : resampled filtered historical returns, whitened by their
+                  sample covariance (fat tails and asymmetry of the history,
+                  correlation of Σ); directions the history does not span
+                  (fewer scenarios than nodes) get N(0, 1) draws
+
+Paths are generated in fixed-size chunks and folded straight into
+accumulators (the k worst outcomes per column for exact VaR / ES, the book's
+k worst paths for component ES, fixed-bin histograms for percentiles, sums for
+mean / std). The tail buffers are exact, so they grow with the number of
+paths: with k = ceil((1 - α) n_paths) and C = n_strategies + 1 columns, each
+worker holds O((k + chunk_size) C) floats, and the merge concatenates
+O(workers k C). At α = 0.99 that is 1% of the full (n_paths x C) P&L matrix
+per buffer, plus O(HISTOGRAM_BINS C) counts. Every chunk has its own
+SeedSequence child, so results do not depend on the number of workers.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .covariance_model import as_covariance_model
+from .factor_model import FactorCovariance
+from .instrumentation import instrumented
+from .scheduler import SharedArray, _run_tasks, resolve_array, resolve_workers
+from .var_es import filtered_returns, strategy_labels, tail_count
+
+INNOVATIONS = ('normal', 'student_t', 'bootstrap')
+
+# Histogram range (in standard deviations of each column) and resolution for percentiles
+HISTOGRAM_SIGMAS = 10.0
+HISTOGRAM_BINS = 4096
+
+
+# ============================================================================
+# COVARIANCE FACTOR
+# ============================================================================
+
+def covariance_factor(Sigma) -> Tuple[np.ndarray, str]:
+    """
+    Factor G with G G' = Σ (after PSD repair), shared through the Σ's CovarianceModel.
+
+    Returns:
+    --------
+    G : ndarray
+        (N x N) Cholesky or eigen-factor; (N x k + N) for a FactorCovariance
+    method : str
+        'cholesky', 'eigen' (Σ was not positive definite; negative
+        eigenvalues clipped to zero) or 'factor'
+    """
+    if isinstance(Sigma, FactorCovariance):
+        F_factor, _ = covariance_factor(Sigma.F)
+        return np.hstack([Sigma.B @ F_factor, np.diag(np.sqrt(np.maximum(Sigma.D, 0.0)))]), 'factor'
+
+    return as_covariance_model(Sigma).factor
+
+
+def whitened_innovations(history: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    History rows with zero mean and identity sample covariance on the span
+    of the history (pseudo-inverse square root).
+
+    Returns:
+    --------
+    whitened : ndarray
+        Whitened rows (n_scenarios x N)
+    null_basis : ndarray
+        Orthonormal basis (N x n_null) of the directions the history does not
+        span; n_null >= N - n_scenarios + 1, so it is empty only when there are
+        more scenarios than nodes and the history has full rank
+    """
+    centered = history - history.mean(axis=0)
+    eigenvalues, eigenvectors = np.linalg.eigh(np.cov(centered, rowvar=False))
+    spanned = eigenvalues > 1e-10 * max(eigenvalues.max(), 1e-300)
+    inv_sqrt = np.where(spanned, 1.0 / np.sqrt(np.maximum(eigenvalues, 1e-300)), 0.0)
+    return centered @ (eigenvectors * inv_sqrt) @ eigenvectors.T, eigenvectors[:, ~spanned]
+
+
+# ============================================================================
+# CHUNK TASK
+# ============================================================================
+
+def _simulate_task(loadings_source, pool_source, innovations: str, df: float, seeds: List[np.random.SeedSequence],
+                   chunk_sizes: List[int], k: int, lower: np.ndarray, width: np.ndarray, n_bins: int):
+    """
+    Simulate a run of chunks and fold them into partial accumulators.
+
+    Bootstrap loadings have one row per pool column followed by the null-space
+    loadings, which are driven by N(0, 1) draws.
+
+    Returns (worst, tail, counts, sums, squares): the k largest losses per
+    column, the losses of every column on the book's k worst paths, histogram
+    counts per column (bin 0 / n_bins + 1 are under / overflow) and per-chunk
+    sums and sums of squares (merged in chunk order by the caller).
+    """
+    loadings = resolve_array(loadings_source)              # G' W' (n_shocks x n_columns)
+    pool = resolve_array(pool_source) if pool_source is not None else None
+    n_shocks, n_columns = loadings.shape
+    worst = np.empty((0, n_columns))
+    tail = np.empty((0, n_columns))
+    counts = np.zeros(n_columns * (n_bins + 2), dtype=np.int64)
+    offsets = np.arange(n_columns) * (n_bins + 2)
+    sums, squares = [], []
+
+    for seed, size in zip(seeds, chunk_sizes):
+        rng = np.random.default_rng(seed)
+        if innovations == 'bootstrap':
+            n_pool = pool.shape[1]
+            pnl = pool[rng.integers(0, len(pool), size)] @ loadings[:n_pool]
+            if n_shocks > n_pool:
+                pnl += rng.standard_normal((size, n_shocks - n_pool)) @ loadings[n_pool:]
+        else:
+            pnl = rng.standard_normal((size, n_shocks)) @ loadings
+        if innovations == 'student_t':
+            pnl *= np.sqrt((df - 2.0) / rng.chisquare(df, size))[:, None]
+
+        losses = np.concatenate([worst, -pnl])
+        if len(losses) > k:
+            losses = losses[np.argpartition(losses, len(losses) - k, axis=0)[-k:], np.arange(n_columns)]
+        worst = losses
+        paths = np.concatenate([tail, -pnl])
+        tail = paths[np.argpartition(paths[:, -1], len(paths) - k)[-k:]] if len(paths) > k else paths
+
+        bins = np.clip(np.floor((pnl - lower) / width).astype(np.int64) + 1, 0, n_bins + 1)
+        counts += np.bincount((bins + offsets).ravel(), minlength=len(counts))
+        sums.append(pnl.sum(axis=0))
+        squares.append((pnl * pnl).sum(axis=0))
+
+    return worst, tail, counts.reshape(n_columns, n_bins + 2), np.array(sums), np.array(squares)
+
+
+def _histogram_percentiles(counts: np.ndarray, lower: np.ndarray, width: np.ndarray,
+                           percentiles: Sequence[float]) -> np.ndarray:
+    """Percentiles (n_columns x n_percentiles) by linear interpolation inside the bins."""
+    n_bins = counts.shape[1] - 2
+    cumulative = np.cumsum(counts, axis=1)
+    total = cumulative[:, -1]
+    result = np.empty((len(counts), len(percentiles)))
+    rows = np.arange(len(counts))
+    for j, p in enumerate(percentiles):
+        target = p / 100.0 * total
+        b = np.minimum((cumulative < target[:, None]).sum(axis=1), n_bins + 1)     # first bin reaching target
+        below = np.where(b > 0, cumulative[rows, np.maximum(b - 1, 0)], 0)
+        inside = counts[rows, b]
+        fraction = np.where(inside > 0, (target - below) / np.maximum(inside, 1), 0.0)
+        position = np.clip(b - 1 + fraction, 0.0, n_bins)          # under / overflow clamp to the range
+        result[:, j] = lower + position * width
+    return result
+
+
+# ============================================================================
+# SIMULATOR
+# ============================================================================
+
+class MonteCarloSimulator:
+    """
+    Monte Carlo P&L for books under one covariance.
+
+    The covariance factor is computed once and reused by every simulate call.
+
+    Parameters:
+    -----------
+    Sigma : ndarray or FactorCovariance
+        EWMA covariance (N x N)
+    history : DataFrame or ndarray, optional
+        Node returns (T x N, oldest first) for bootstrap innovations
+    lambdas : float or ndarray
+        EWMA decay for the bootstrap volatility filter, one value or one per node
+    init_obs : int
+        Observations for the filter's initial variances
+    """
+
+    def __init__(self, Sigma, history=None, lambdas: Union[float, np.ndarray] = 0.97, init_obs: int = 60):
+        self.Sigma = Sigma
+        self.G, self.method = covariance_factor(Sigma)
+        self.history = history
+        self.lambdas = lambdas
+        self.init_obs = init_obs
+        self._pool: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    @property
+    def bootstrap_pool(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(whitened filtered returns, null-space basis) from whitened_innovations, built on first use."""
+        if self._pool is None:
+            if self.history is None:
+                raise ValueError("Bootstrap innovations need a returns history")
+            self._pool = whitened_innovations(filtered_returns(self.history, self.lambdas, self.init_obs)['returns'])
+        return self._pool
+
+    @instrumented('monte_carlo', lambda self, W, *a, **k: {'strategies': len(W)})
+    def simulate(self, W: np.ndarray, w_total: Optional[np.ndarray] = None, n_paths: int = 100_000,
+                 innovations: str = 'normal', df: float = 5.0, confidence: float = 0.99,
+                 percentiles: Sequence[float] = (1, 5, 50, 95, 99), chunk_size: int = 50_000,
+                 seed: int = 0, workers: Optional[int] = 1,
+                 keys: Optional[pd.DataFrame] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Simulated P&L statistics for every row of W and the book.
+
+        Parameters:
+        -----------
+        W : ndarray
+            Strategy position matrix (n_strategies x N), e.g. from build_strategy_matrix
+        w_total : ndarray, optional
+            Total portfolio vector (default: W summed over strategies)
+        n_paths : int
+            Number of simulated days
+        innovations : str
+            'normal', 'student_t' or 'bootstrap'
+        df : float
+            Student-t degrees of freedom (> 2)
+        confidence : float
+            VaR / ES confidence level α
+        percentiles : sequence
+            P&L percentiles to report (0-100)
+        chunk_size : int
+            Paths per chunk (bounds memory)
+        seed : int
+            Root seed; chunk c uses SeedSequence(seed).spawn(n_chunks)[c]
+        workers : int, optional
+            Worker processes (None: one per CPU; 1: serial)
+        keys : DataFrame, optional
+            Row labels (Strategy, Product) aligned with W
+
+        Returns:
+        --------
+        dict with
+            'summary'     : labels, mean, std, VaR, ES (standalone) and
+                            component_ES (mean loss on the book's k worst
+                            paths); last row is the book
+            'percentiles' : labels and one column per percentile
+        """
+        if innovations not in INNOVATIONS:
+            raise ValueError(f"Unknown innovations: {innovations} (expected one of {INNOVATIONS})")
+        if innovations == 'student_t' and df <= 2:
+            raise ValueError("Student-t innovations need df > 2")
+
+        W = np.atleast_2d(np.asarray(W, dtype=np.float64))
+        w_total = W.sum(axis=0) if w_total is None else np.asarray(w_total, dtype=np.float64)
+        weights = 1000.0 * np.vstack([W, w_total])
+        if innovations == 'bootstrap':
+            G = self.G if self.method != 'factor' else covariance_factor(self.Sigma.to_dense())[0]
+            loadings = G.T @ weights.T
+            pool, null_basis = self.bootstrap_pool
+        else:
+            loadings = self.G.T @ weights.T
+            pool = None
+
+        n_columns = loadings.shape[1]
+        std = np.sqrt((loadings ** 2).sum(axis=0))
+        if pool is not None:
+            loadings = np.vstack([loadings, null_basis.T @ loadings])
+        loadings = np.ascontiguousarray(loadings)
+        width = np.maximum(2 * HISTOGRAM_SIGMAS * std / HISTOGRAM_BINS, 1e-10)
+        lower = -HISTOGRAM_SIGMAS * std
+        k = tail_count(n_paths, confidence)
+
+        chunk_sizes = [chunk_size] * (n_paths // chunk_size)
+        if n_paths % chunk_size:
+            chunk_sizes.append(n_paths % chunk_size)
+        seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+        workers = resolve_workers(workers, len(chunk_sizes))
+        bounds = np.linspace(0, len(chunk_sizes), workers + 1).astype(int)
+        ranges = [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+        def tasks(loadings_source, pool_source):
+            return [(loadings_source, pool_source, innovations, df, seeds[a:b], chunk_sizes[a:b], k, lower, width,
+                     HISTOGRAM_BINS) for a, b in ranges]
+
+        if workers <= 1:
+            parts = _run_tasks(_simulate_task, tasks(loadings, pool), 1)
+        else:
+            with SharedArray.from_array(loadings) as shared_loadings:
+                if pool is None:
+                    parts = _run_tasks(_simulate_task, tasks(shared_loadings.spec, None), workers)
+                else:
+                    with SharedArray.from_array(pool) as shared_pool:
+                        parts = _run_tasks(_simulate_task, tasks(shared_loadings.spec, shared_pool.spec), workers)
+
+        # Merge in chunk order: exact tails, integer counts, ordered sums
+        worst = np.sort(np.concatenate([part[0] for part in parts]), axis=0)[-k:]
+        tail = np.concatenate([part[1] for part in parts])
+        tail = tail[np.argsort(tail[:, -1], kind='stable')[-k:]]
+        counts = np.sum([part[2] for part in parts], axis=0)
+        sums = np.concatenate([part[3] for part in parts]).sum(axis=0)
+        squares = np.concatenate([part[4] for part in parts]).sum(axis=0)
+        mean = sums / n_paths
+        variance = np.maximum(squares / n_paths - mean ** 2, 0.0) * n_paths / max(n_paths - 1, 1)
+
+        summary = strategy_labels(keys, len(W))
+        summary['mean'] = mean
+        summary['std'] = np.sqrt(variance)
+        summary['VaR'] = worst[0]
+        summary['ES'] = worst.mean(axis=0)
+        summary['component_ES'] = tail.mean(axis=0)
+        table = strategy_labels(keys, len(W))
+        values = _histogram_percentiles(counts, lower, width, percentiles)
+        for j, p in enumerate(percentiles):
+            table[f'p{p:g}'] = values[:, j]
+        return {'summary': summary, 'percentiles': table}
@@ -0,0 +1,224 @@
+"""
+Node Map
+
+Maps futures tenors to risk nodes (A01..A15) through an integer lookup table
+keyed by month ordinal (tenor_calendar.tenor_ordinal), replacing
+contract_to_node dict + all_nodes.index() lookups. Position vectors for any
+book are built with one np.add.at scatter.
+
+Nodes are either taken from a tenor list (the notebooks: first 15 tenors of
+delta_summary) or anchored on the front month for an as-of date, so A01..A15
+roll forward as contracts expire.
+"""
+
+import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+import tenor_calendar
+
+# Approximate roll rule: the contract for delivery month M stops being the
+# front month on day ROLL_DAY of month M - ROLL_MONTHS_BEFORE.
+ROLL_DAY = 20
+ROLL_MONTHS_BEFORE = 1
+
+
+# ============================================================================
+# ROLL SCHEDULE
+# ============================================================================
+
+def front_ordinals(dates, roll_day: int = ROLL_DAY, months_before: int = ROLL_MONTHS_BEFORE) -> np.ndarray:
+    """
+    Front-month ordinal (year * 12 + month_idx) for each date, vectorized.
+
+    Parameters:
+    -----------
+    dates : array-like of dates
+        As-of dates
+    roll_day : int
+        Day of month on which the front contract rolls off
+    months_before : int
+        Months before delivery in which the roll happens
+
+    Returns:
+    --------
+    np.ndarray : int64 month ordinals
+    """
+    index = pd.DatetimeIndex(pd.to_datetime(np.atleast_1d(dates)))
+    ordinal = index.year.to_numpy(dtype=np.int64) * 12 + index.month.to_numpy(dtype=np.int64) - 1
+    return ordinal + months_before + (index.day.to_numpy() >= roll_day)
+
+
+class NodeMap:
+    """
+    Tenor -> node index lookup keyed by month ordinal.
+
+    Parameters:
+    -----------
+    node_ordinals : sequence of int
+        Month ordinal of each node, in node order (A01 first)
+    node_names : list, optional
+        Node codes (defaults to A01..A{n})
+    """
+
+    def __init__(self, node_ordinals: Sequence[int], node_names: Optional[List[str]] = None):
+        self.node_ordinals = np.asarray(node_ordinals, dtype=np.int64)
+        self.all_nodes = (list(node_names) if node_names is not None
+                          else [f"A{i + 1:02d}" for i in range(len(self.node_ordinals))])
+        if len(self.all_nodes) != len(self.node_ordinals):
+            raise ValueError("node_names and node_ordinals must have the same length")
+
+        # Dense lookup table over the ordinal span: lut[ordinal - base] -> node index (-1 if none)
+        known = self.node_ordinals[self.node_ordinals != tenor_calendar.UNKNOWN_ORDINAL]
+        self._base = int(known.min()) if len(known) else 0
+        span = int(known.max()) - self._base + 1 if len(known) else 0
+        self._lut = np.full(span, -1, dtype=np.intp)
+        for node_idx, ordinal in enumerate(self.node_ordinals):
+            if ordinal != tenor_calendar.UNKNOWN_ORDINAL and self._lut[ordinal - self._base] < 0:
+                self._lut[ordinal - self._base] = node_idx
+
+    # ------------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------------
+
+    @classmethod
+    def from_tenors(cls, tenors: Sequence[str], n_nodes: int = 15) -> 'NodeMap':
+        """First n_nodes tenors in the given order -> A01..A{n_nodes} (notebook contract_to_node)."""
+        unique_tenors = list(dict.fromkeys(tenors))[:n_nodes]
+        return cls([tenor_calendar.tenor_ordinal(t) for t in unique_tenors])
+
+    @classmethod
+    def from_delta_summary(cls, delta_summary_df: pd.DataFrame, n_nodes: int = 15) -> 'NodeMap':
+        """Nodes from the first n_nodes tenors of delta_summary."""
+        return cls.from_tenors(delta_summary_df['Tenor'], n_nodes)
+
+    @classmethod
+    def from_contract_to_node(cls, contract_to_node: Dict[str, str], all_nodes: List[str]) -> 'NodeMap':
+        """Wrap an existing contract_to_node dict (nodes without a tenor never match)."""
+        node_ordinals = np.full(len(all_nodes), tenor_calendar.UNKNOWN_ORDINAL, dtype=np.int64)
+        for tenor, node in contract_to_node.items():
+            node_ordinals[all_nodes.index(node)] = tenor_calendar.tenor_ordinal(tenor)
+        return cls(node_ordinals, all_nodes)
+
+    @classmethod
+    def for_date(cls, as_of, n_nodes: int = 15, roll_day: int = ROLL_DAY,
+                 months_before: int = ROLL_MONTHS_BEFORE) -> 'NodeMap':
+        """
+        Consecutive months starting at the front month for as_of: A01 is the
+        first contract that has not rolled off, A02 the next month, and so on.
+        """
+        front = int(front_ordinals([as_of], roll_day, months_before)[0])
+        return cls(np.arange(front, front + n_nodes, dtype=np.int64))
+
+    def rolled(self, as_of, roll_day: int = ROLL_DAY, months_before: int = ROLL_MONTHS_BEFORE) -> 'NodeMap':
+        """Same number of nodes, re-anchored on the front month for as_of."""
+        return NodeMap.for_date(as_of, len(self.all_nodes), roll_day, months_before)
+
+    # ------------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------------
+
+    @property
+    def tenors(self) -> List[str]:
+        """Futures code per node (e.g., ['H6', 'J6', ...])."""
+        return [tenor_calendar.ordinal_to_code(o) if o != tenor_calendar.UNKNOWN_ORDINAL else ''
+                for o in self.node_ordinals]
+
+    @property
+    def contract_to_node(self) -> Dict[str, str]:
+        """Tenor -> node code dict, as built in the notebooks."""
+        return {tenor: node for tenor, node in zip(self.tenors, self.all_nodes) if tenor}
+
+    def ordinal_index(self, ordinals: np.ndarray) -> np.ndarray:
+        """Node index per month ordinal (-1 when outside the nodes)."""
+        offset = np.asarray(ordinals, dtype=np.int64) - self._base
+        in_range = (offset >= 0) & (offset < len(self._lut))
+        result = np.full(offset.shape, -1, dtype=np.intp)
+        result[in_range] = self._lut[offset[in_range]]
+        return result
+
+    def node_index(self, tenors) -> np.ndarray:
+        """
+        Node index per tenor (-1 when the tenor is not a node).
+
+        Each distinct tenor string is resolved once (memoized in tenor_calendar);
+        only single-month tenors map to a node.
+        """
+        codes, uniques = pd.factorize(pd.Series(tenors, dtype=object))
+        ordinals = np.array([tenor_calendar.tenor_ordinal(t)
+                             if isinstance(t, str) and tenor_calendar.tenor_type(t) == 'outright'
+                             else tenor_calendar.UNKNOWN_ORDINAL for t in uniques], dtype=np.int64)
+        unique_index = self.ordinal_index(ordinals)
+        return np.where(codes >= 0, unique_index[codes] if len(uniques) else -1, -1)
+
+    # ------------------------------------------------------------------------
+    # Position vectors
+    # ------------------------------------------------------------------------
+
+    def position_vector(self, tenors, qty) -> np.ndarray:
+        """Position vector (n_nodes) with quantities accumulated per node; unmapped tenors are ignored."""
+        return self.position_matrix(np.zeros(len(qty), dtype=np.intp), tenors, qty, 1)[0]
+
+    def position_matrix(self, rows, tenors, qty, n_rows: int, offsets=None, n_cols: Optional[int] = None) -> np.ndarray:
+        """
+        Scatter positions into a (n_rows x n_cols) matrix with one np.add.at.
+
+        Parameters:
+        -----------
+        rows : array-like of int
+            Output row per position
+        tenors : array-like of str
+            Tenor per position
+        qty : array-like of float
+            Quantity per position
+        n_rows : int
+            Number of output rows
+        offsets : array-like of int, optional
+            Column offset per position (product block in a combined vector)
+        n_cols : int, optional
+            Number of columns (defaults to n_nodes)
+        """
+        nodes = self.node_index(tenors)
+        cols = nodes if offsets is None else np.asarray(offsets, dtype=np.intp) + nodes
+        mapped = nodes >= 0
+
+        W = np.zeros((n_rows, len(self.all_nodes) if n_cols is None else n_cols))
+        np.add.at(W, (np.asarray(rows, dtype=np.intp)[mapped], cols[mapped]),
+                  np.asarray(qty, dtype=np.float64)[mapped])
+        return W
+
+    def strategy_vector(self, delta_positions_df: pd.DataFrame, strategy_name: str, product: str) -> np.ndarray:
+        """build_strategy_position_vector: one strategy within a mapped product."""
+        positions = delta_positions_df[(delta_positions_df['Strategy'] == strategy_name) &
+                                       (delta_positions_df['Mapped_Product'] == product)]
+        return self.position_vector(positions['Tenor'].to_numpy(), positions['Qty'].to_numpy())
+
+    def total_vector(self, delta_summary_df: pd.DataFrame, product: str) -> np.ndarray:
+        """Total portfolio vector for a product from delta_summary."""
+        w_total = np.zeros(len(self.all_nodes))
+        if product not in delta_summary_df.columns:
+            return w_total
+        nodes = self.node_index(delta_summary_df['Tenor'].to_numpy())
+        position = delta_summary_df[product].to_numpy(dtype=np.float64)
+        use = (nodes >= 0) & (np.abs(position) > 1e-10)
+        w_total[nodes[use]] = position[use]
+        return w_total
+
+
+def as_node_map(node_map, all_nodes: Optional[List[str]] = None) -> NodeMap:
+    """Accept a NodeMap or a legacy contract_to_node dict (with all_nodes)."""
+    if isinstance(node_map, NodeMap):
+        return node_map
+    return NodeMap.from_contract_to_node(node_map, all_nodes)
+
+
+if __name__ == '__main__':
+    node_map = NodeMap.from_delta_summary(pd.read_csv('delta_summary.csv'))
+    print("=" * 80)
+    print("NODE MAP")
+    print("=" * 80)
+    print(f"delta_summary nodes: {node_map.contract_to_node}")
+    today = datetime.date.today()
+    print(f"Front-month nodes as of {today}: {NodeMap.for_date(today).contract_to_node}")
@@ -0,0 +1,400 @@
+"""
+Risk Pipeline
+
+End-to-end runs of q_risk_report.ipynb and position_mc_report_clean.ipynb.
+RiskEngine loads market data, holiday calendars and per-product returns once
+and caches covariances by product, so one process can serve many books
+(delta_summary / delta_positions pairs) without repeating the setup.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .covariance_model import CovarianceModel
+from .ewma import bucket_lambda_vector, compute_bucket_covariances, compute_multi_product_ewma_covariance
+from .factor_model import fit_factor_covariance
+from .factors import (attribution_blocks, compute_factor_attribution, compute_factor_detail, compute_level_structure,
+                      compute_top_drivers)
+from .hedge_engine import recommend_portfolio_hedge
+from .instrumentation import instrumented, span
+from .market_data import MarketDataStore, load_market_data
+from .mc_engine import (build_strategy_matrix, build_total_vector, compute_bucket_mc, compute_multi_product_mc_table,
+                        compute_position_mc_table)
+from .monte_carlo import MonteCarloSimulator
+from .node_map import NodeMap
+from .q_risk import compute_bucket_summary, mc_signed
+from .returns_builder import build_combined_returns, build_product_returns, load_holiday_calendars
+from .scheduler import product_covariances
+from .stress import (bucket_twist_scenarios, combine_scenarios, eigen_scenarios, evaluate_scenarios,
+                     historical_scenarios, parallel_shift_scenarios)
+from .var_es import historical_var_es, parametric_var_es
+
+ALL_NODES = [f"A{i:02d}" for i in range(1, 16)]
+FRONT = ["A01", "A02", "A03", "A04"]
+MID = ["A05", "A06", "A07", "A08"]
+BACK = ["A09", "A10", "A11", "A12", "A13", "A14", "A15"]
+BUCKET_LAMBDAS = {'Front': 0.97, 'Mid': 0.98, 'Back': 0.99}
+MAPPED_TO_DATA_COLUMN = {'HTT': 'htt', 'HOUBR': 'houbr', 'CLBR': 'clbr', 'WDF': 'wdf', 'LH': 'lh'}
+DEFAULT_HEDGE_PRODUCTS = ['HTT', 'CLBR']
+
+
+def _book_counts(engine, book_df: pd.DataFrame, *args, **kwargs) -> Dict[str, int]:
+    """Span counts of a report: rows of its first table argument."""
+    return {'rows': len(book_df)}
+
+
+def _sort_by_abs(df: pd.DataFrame, column: str) -> pd.DataFrame:
+    return df.sort_values(column, key=abs, ascending=False, kind='stable').reset_index(drop=True)
+
+
+class RiskEngine:
+    """
+    Cached risk pipeline over one market data file.
+
+    Parameters:
+    -----------
+    data_file : str
+        Wide price file ('date' + '{product}_A{n}' columns)
+    holidays_file : str or dict
+        Holiday file, or exchange -> holiday file
+    cache_dir : str
+        Market data cache directory (see MarketDataStore)
+    lambdas : dict, optional
+        Bucket name -> EWMA decay (default BUCKET_LAMBDAS)
+    init_obs : int
+        Observations for the EWMA initial covariance
+    mapped_to_data_column : dict, optional
+        Mapped product -> data column prefix (default MAPPED_TO_DATA_COLUMN)
+    workers : int, optional
+        Processes for per-product covariances (None: one per CPU; 1: serial)
+    factor_method : str, optional
+        'pca', 'lsc' or 'bucket': use a FactorCovariance (B F B' + D) for the
+        multi-product tables instead of the dense Sigma_multi
+    """
+
+    def __init__(self, data_file: str = 'data_.csv', holidays_file='holidays.csv',
+                 cache_dir: str = '.market_cache', lambdas: Optional[Dict[str, float]] = None,
+                 init_obs: int = 60, mapped_to_data_column: Optional[Dict[str, str]] = None,
+                 workers: Optional[int] = None, factor_method: Optional[str] = None):
+        self.data_file = data_file
+        self.holidays_file = holidays_file
+        self.cache_dir = cache_dir
+        self.buckets = {'Front': FRONT, 'Mid': MID, 'Back': BACK}
+        self.lambdas = dict(BUCKET_LAMBDAS if lambdas is None else lambdas)
+        self.init_obs = init_obs
+        self.mapped_to_data_column = dict(MAPPED_TO_DATA_COLUMN if mapped_to_data_column is None
+                                          else mapped_to_data_column)
+        self.workers = workers
+        self.factor_method = factor_method
+        self._store: Optional[MarketDataStore] = None
+        self._product_returns: Optional[Dict[str, pd.DataFrame]] = None
+        self._bucket_covariances: Dict[str, Tuple[Dict[str, np.ndarray], np.ndarray]] = {}
+        self._multi_covariances: Dict[Tuple[str, ...], Tuple[np.ndarray, Dict[str, Tuple[int, int]]]] = {}
+        self._simulators: Dict[Tuple[str, ...], MonteCarloSimulator] = {}
+        self._combined_returns: Dict[Tuple[str, ...], Tuple[pd.DataFrame, Dict[str, Tuple[int, int]]]] = {}
+
+    # ------------------------------------------------------------------------
+    # Cached inputs
+    # ------------------------------------------------------------------------
+
+    @property
+    def store(self) -> MarketDataStore:
+        if self._store is None:
+            self._store = load_market_data(self.data_file, self.cache_dir)
+        return self._store
+
+    @property
+    def product_returns(self) -> Dict[str, pd.DataFrame]:
+        """Data product -> holiday-filtered returns, built for every product at once."""
+        if self._product_returns is None:
+            calendar_files = (self.holidays_file if isinstance(self.holidays_file, dict)
+                              else {'CME': self.holidays_file})
+            self._product_returns = build_product_returns(self.store, load_holiday_calendars(calendar_files))
+        return self._product_returns
+
+    def data_product(self, mapped_product: str) -> str:
+        return self.mapped_to_data_column.get(mapped_product, mapped_product.lower())
+
+    def has_data(self, mapped_product: str) -> bool:
+        """Product has price columns and at least init_obs returns (notebook skip rule)."""
+        returns = self.product_returns.get(self.data_product(mapped_product))
+        return returns is not None and len(returns) >= self.init_obs
+
+    def bucket_covariances(self, data_product: str) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """(bucket_covs, block-diagonal Sigma_total) for one data product, cached."""
+        if data_product not in self._bucket_covariances:
+            self._bucket_covariances[data_product] = compute_bucket_covariances(
+                self.product_returns[data_product], data_product, self.buckets, self.lambdas,
+                init_obs=self.init_obs)
+        return self._bucket_covariances[data_product]
+
+    def prepare_covariances(self, data_products: List[str]) -> None:
+        """Compute the missing bucket covariances of several products on the process pool."""
+        missing = [p for p in dict.fromkeys(data_products) if p not in self._bucket_covariances]
+        if missing:
+            with span('bucket_covariances', products=len(missing)):
+                self._bucket_covariances.update(product_covariances(
+                    {p: self.product_returns[p] for p in missing}, self.buckets, self.lambdas,
+                    self.init_obs, self.workers))
+
+    def combined_returns(self, products: List[str]) -> Tuple[pd.DataFrame, Dict[str, Tuple[int, int]]]:
+        """(combined_returns_df, product_indices) over mapped products on their common dates, cached."""
+        key = tuple(products)
+        if key not in self._combined_returns:
+            returns = {p: self.product_returns[self.data_product(p)] for p in products}
+            combined_returns_df, product_indices = build_combined_returns(returns, products)
+            if len(combined_returns_df) < self.init_obs:
+                raise ValueError(f"Insufficient common dates: {len(combined_returns_df)} < {self.init_obs}")
+            self._combined_returns[key] = (combined_returns_df, product_indices)
+        return self._combined_returns[key]
+
+    def lambda_vector(self, n_products: int) -> np.ndarray:
+        """Per-node EWMA decays of the combined layout."""
+        return bucket_lambda_vector(n_products, ALL_NODES, FRONT, MID, BACK, self.lambdas['Front'],
+                                    self.lambdas['Mid'], self.lambdas['Back'])
+
+    def multi_product_covariance(self, products: List[str]) -> Tuple[np.ndarray, Dict[str, Tuple[int, int]]]:
+        """
+        (Sigma_multi, product_indices) over mapped products on their common dates, cached.
+
+        Sigma_multi is a CovarianceModel (factorizations cached for every
+        report), or a FactorCovariance when factor_method is set.
+        """
+        key = tuple(products)
+        if key not in self._multi_covariances:
+            combined_returns_df, product_indices = self.combined_returns(products)
+            if self.factor_method is None:
+                Sigma_dense, _ = compute_multi_product_ewma_covariance(
+                    combined_returns_df, len(products), ALL_NODES, FRONT, MID, BACK,
+                    self.lambdas['Front'], self.lambdas['Mid'], self.lambdas['Back'], self.init_obs)
+                Sigma_multi = CovarianceModel(Sigma_dense)
+            else:
+                Sigma_multi = fit_factor_covariance(combined_returns_df, product_indices,
+                                                    self.lambda_vector(len(products)), self.factor_method,
+                                                    init_obs=self.init_obs,
+                                                    buckets=self.buckets, all_nodes=ALL_NODES)
+            self._multi_covariances[key] = (Sigma_multi, product_indices)
+        return self._multi_covariances[key]
+
+    def simulator(self, products: List[str]) -> MonteCarloSimulator:
+        """Monte Carlo simulator over the multi-product covariance (factor computed once), cached."""
+        key = tuple(products)
+        if key not in self._simulators:
+            Sigma_multi, _ = self.multi_product_covariance(products)
+            combined_returns_df, _ = self.combined_returns(products)
+            self._simulators[key] = MonteCarloSimulator(Sigma_multi, combined_returns_df,
+                                                        self.lambda_vector(len(products)), self.init_obs)
+        return self._simulators[key]
+
+    # ------------------------------------------------------------------------
+    # Reports
+    # ------------------------------------------------------------------------
+
+    @instrumented('q_risk_report', _book_counts)
+    def q_risk_report(self, delta_summary_df: pd.DataFrame, product: str = 'clbr') -> Dict[str, pd.DataFrame]:
+        """
+        q_risk_report.ipynb tables for one data product.
+
+        Returns:
+        --------
+        dict : bucket_summary, factor_detail, level_structure, top_drivers
+        """
+        available = [col for col in delta_summary_df.columns if col.upper() == product.upper()]
+        if not available:
+            all_products = [col for col in delta_summary_df.columns if col != 'Tenor']
+            raise ValueError(f"Product '{product}' not found in delta_summary. Available products: {all_products}")
+
+        node_map = NodeMap.from_delta_summary(delta_summary_df, len(ALL_NODES))
+        w_node = pd.Series(node_map.total_vector(delta_summary_df, available[0]), index=ALL_NODES)
+        w_total = np.concatenate([w_node[nodes].to_numpy() for nodes in self.buckets.values()])
+
+        bucket_covs, Sigma_total = self.bucket_covariances(product)
+        bucket_summary = compute_bucket_summary(w_total, bucket_covs, Sigma_total, self.buckets)
+        factor_detail = compute_factor_detail(w_total, bucket_covs, Sigma_total, self.buckets)
+        return {
+            'bucket_summary': bucket_summary,
+            'factor_detail': factor_detail,
+            'level_structure': compute_level_structure(factor_detail, bucket_summary),
+            'top_drivers': compute_top_drivers(factor_detail),
+        }
+
+    @instrumented('position_mc_report', _book_counts)
+    def position_mc_report(self, delta_positions_df: pd.DataFrame, delta_summary_df: pd.DataFrame,
+                           hedge_products: Optional[List[str]] = None, top_n: int = 20) -> Dict[str, pd.DataFrame]:
+        """
+        position_mc_report_clean.ipynb tables.
+
+        Returns:
+        --------
+        dict : position_mc, mc_by_strategy, mc_by_product, mc_multi_product,
+               mc_by_strategy_multi, bucket_mc, hedge_recommendations,
+               factor_attribution (multi-product tables are empty when no product has data)
+        """
+        hedge_products = DEFAULT_HEDGE_PRODUCTS if hedge_products is None else hedge_products
+        node_map = NodeMap.from_delta_summary(delta_summary_df, len(ALL_NODES))
+        all_products = sorted(delta_positions_df['Mapped_Product'].unique())
+        products_with_data = [p for p in all_products if self.has_data(p)]
+
+        # Single-product MCs against each product's block-diagonal Sigma_total
+        self.prepare_covariances([self.data_product(p) for p in products_with_data])
+        product_covariances = {p: self.bucket_covariances(self.data_product(p))[1] for p in products_with_data}
+        position_mc = compute_position_mc_table(delta_positions_df, delta_summary_df, product_covariances,
+                                                node_map, ALL_NODES, FRONT, MID, BACK)
+        position_mc['MC_signed'] = mc_signed(position_mc['MC_to_total'])
+        position_mc = _sort_by_abs(position_mc, 'MC_to_total')
+
+        mc_by_strategy = position_mc.groupby('Strategy').agg({
+            'MC_to_total': 'sum', 'Qty_total': 'sum', 'Tenor_count': 'sum',
+            'Product': lambda x: ', '.join(sorted(x.unique())),
+        }).reset_index()
+        mc_by_strategy.columns = ['Strategy', 'MC_to_total', 'Qty_total', 'Tenor_count', 'Products']
+        mc_by_strategy['MC_signed'] = mc_signed(mc_by_strategy['MC_to_total'])
+
+        mc_by_product = position_mc.groupby('Product').agg({
+            'MC_to_total': 'sum', 'Qty_total': 'sum', 'Tenor_count': 'sum', 'Strategy': 'nunique',
+        }).reset_index()
+        mc_by_product.columns = ['Product', 'MC_to_total', 'Qty_total', 'Tenor_count', 'Strategy_count']
+        mc_by_product['MC_signed'] = mc_signed(mc_by_product['MC_to_total'])
+
+        report = {
+            'position_mc': position_mc,
+            'mc_by_strategy': _sort_by_abs(mc_by_strategy, 'MC_to_total'),
+            'mc_by_product': _sort_by_abs(mc_by_product, 'MC_to_total'),
+        }
+        if not products_with_data:
+            for name in ['mc_multi_product', 'mc_by_strategy_multi', 'bucket_mc', 'hedge_recommendations',
+                         'factor_attribution']:
+                report[name] = pd.DataFrame()
+            return report
+
+        # Multi-product MCs, bucket MCs and hedges under the shared covariance
+        Sigma_multi, product_indices = self.multi_product_covariance(products_with_data)
+        mc_multi, w_total_combined = compute_multi_product_mc_table(
+            delta_positions_df, delta_summary_df, Sigma_multi, product_indices, node_map, ALL_NODES,
+            position_mc_df=position_mc)
+        mc_by_strategy_multi = mc_multi.groupby('Strategy')[
+            ['MC_original', 'MC_multi_product', 'Difference', 'Qty_total']].sum().reset_index()
+        original = mc_by_strategy_multi['MC_original'].to_numpy()
+        safe = np.where(np.abs(original) > 1e-10, np.abs(original), 1.0)
+        mc_by_strategy_multi['Pct_change'] = np.where(
+            np.abs(original) > 1e-10, mc_by_strategy_multi['Difference'].to_numpy() / safe * 100, 0.0)
+        mc_by_strategy_multi = mc_by_strategy_multi[['Strategy', 'MC_original', 'MC_multi_product',
+                                                     'Difference', 'Pct_change', 'Qty_total']]
+
+        hedges = recommend_portfolio_hedge(Sigma_multi, w_total_combined, product_indices,
+                                           [p for p in hedge_products if p in product_indices],
+                                           ALL_NODES, FRONT, MID, BACK)
+        report.update({
+            'mc_multi_product': _sort_by_abs(mc_multi, 'Difference'),
+            'mc_by_strategy_multi': _sort_by_abs(mc_by_strategy_multi, 'MC_multi_product'),
+            'bucket_mc': compute_bucket_mc(Sigma_multi, w_total_combined, product_indices, ALL_NODES,
+                                           FRONT, MID, BACK),
+            'hedge_recommendations': hedges.head(top_n).reset_index(drop=True),
+            'factor_attribution': compute_factor_attribution(
+                w_total_combined, Sigma_multi, attribution_blocks(product_indices, self.buckets, ALL_NODES)),
+        })
+        return report
+
+    @instrumented('var_report', _book_counts)
+    def var_report(self, delta_positions_df: pd.DataFrame, delta_summary_df: pd.DataFrame,
+                   confidence: float = 0.99, window: Optional[int] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Parametric and filtered historical VaR / ES per (strategy, product) on
+        the multi-product returns and covariance.
+
+        Returns:
+        --------
+        dict : var_parametric, var_historical, var_marginal_es (per node, ES per
+               lot on the book's tail days); empty when no product has data
+        """
+        node_map = NodeMap.from_delta_summary(delta_summary_df, len(ALL_NODES))
+        products = [p for p in sorted(delta_positions_df['Mapped_Product'].unique()) if self.has_data(p)]
+        if not products:
+            return {name: pd.DataFrame() for name in ['var_parametric', 'var_historical', 'var_marginal_es']}
+
+        combined_returns_df, product_indices = self.combined_returns(products)
+        Sigma_multi, _ = self.multi_product_covariance(products)
+        W, keys = build_strategy_matrix(delta_positions_df, node_map, ALL_NODES, products, product_indices)
+        w_total = build_total_vector(delta_summary_df, node_map, ALL_NODES, products, product_indices)
+
+        historical = historical_var_es(combined_returns_df, W, w_total, self.lambda_vector(len(products)),
+                                       confidence, window, self.init_obs, keys=keys)
+        marginal_es = pd.DataFrame({
+            'Product': [p for p, (start, end) in product_indices.items() for _ in range(start, end)],
+            'Node': [column.rsplit('_', 1)[-1] for column in combined_returns_df.columns],
+            'marginal_ES': historical['marginal_ES'],
+            'Position': w_total,
+        })
+        marginal_es['component_ES'] = marginal_es['marginal_ES'] * marginal_es['Position']
+        return {
+            'var_parametric': parametric_var_es(W, Sigma_multi, w_total, confidence, keys),
+            'var_historical': historical['summary'],
+            'var_marginal_es': marginal_es,
+        }
+
+    @instrumented('monte_carlo_report', _book_counts)
+    def monte_carlo_report(self, delta_positions_df: pd.DataFrame, delta_summary_df: pd.DataFrame,
+                           n_paths: int = 100_000, innovations: str = 'normal', confidence: float = 0.99,
+                           seed: int = 0, **options) -> Dict[str, pd.DataFrame]:
+        """
+        Simulated P&L per (strategy, product) and for the book.
+
+        Options (df, percentiles, chunk_size) go to MonteCarloSimulator.simulate;
+        its workers default to the engine's.
+
+        Returns:
+        --------
+        dict : mc_simulation (mean, std, VaR, ES, component_ES),
+               mc_percentiles; empty when no product has data
+        """
+        node_map = NodeMap.from_delta_summary(delta_summary_df, len(ALL_NODES))
+        products = [p for p in sorted(delta_positions_df['Mapped_Product'].unique()) if self.has_data(p)]
+        if not products:
+            return {'mc_simulation': pd.DataFrame(), 'mc_percentiles': pd.DataFrame()}
+
+        _, product_indices = self.combined_returns(products)
+        W, keys = build_strategy_matrix(delta_positions_df, node_map, ALL_NODES, products, product_indices)
+        w_total = build_total_vector(delta_summary_df, node_map, ALL_NODES, products, product_indices)
+        options.setdefault('workers', self.workers)
+        result = self.simulator(products).simulate(W, w_total, n_paths, innovations, confidence=confidence,
+                                                   seed=seed, keys=keys, **options)
+        return {'mc_simulation': result['summary'], 'mc_percentiles': result['percentiles']}
+
+    @instrumented('stress_report', _book_counts)
+    def stress_report(self, delta_positions_df: pd.DataFrame, delta_summary_df: pd.DataFrame,
+                      out_file: Optional[str] = None, n_worst_days: int = 20,
+                      n_sigmas: float = 3.0) -> Dict[str, pd.DataFrame]:
+        """
+        Parallel shifts, bucket twists, the book's worst historical days and Σ
+        eigen-scenarios against every (strategy, product).
+
+        The full scenario x strategy P&L goes to out_file (column-major .npy)
+        when given.
+
+        Returns:
+        --------
+        dict : stress_scenarios (book P&L per scenario), stress_strategies
+               (worst / best scenario per strategy); empty when no product has data
+        """
+        node_map = NodeMap.from_delta_summary(delta_summary_df, len(ALL_NODES))
+        products = [p for p in sorted(delta_positions_df['Mapped_Product'].unique()) if self.has_data(p)]
+        if not products:
+            return {'stress_scenarios': pd.DataFrame(), 'stress_strategies': pd.DataFrame()}
+
+        combined_returns_df, product_indices = self.combined_returns(products)
+        Sigma_multi, _ = self.multi_product_covariance(products)
+        W, keys = build_strategy_matrix(delta_positions_df, node_map, ALL_NODES, products, product_indices)
+        w_total = build_total_vector(delta_summary_df, node_map, ALL_NODES, products, product_indices)
+
+        shocks, labels = combine_scenarios(
+            parallel_shift_scenarios(product_indices),
+            bucket_twist_scenarios(product_indices, self.buckets, ALL_NODES),
+            historical_scenarios(combined_returns_df, w_total, n_worst_days),
+            eigen_scenarios(Sigma_multi, n_sigmas=n_sigmas, w_total=w_total))
+        result = evaluate_scenarios(shocks, W, w_total, labels, keys, out_file=out_file)
+        return {
+            'stress_scenarios': result['scenarios'],                # row order of out_file
+            'stress_strategies': result['strategies'],
+        }
@@ -0,0 +1,86 @@
+"""
+Q Risk
+
+Standalone Q and bucket marginal contributions (q_risk_report.ipynb):
+
+    Q         = 1000 * sqrt(w' Σ w)
+    MC_bucket = 1000 * (w_bucket' Σ_total w_total) / sqrt(w_total' Σ_total w_total)
+"""
+
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from .covariance_model import quadratic_form
+
+
+def compute_q_risk(w: np.ndarray, Sigma: np.ndarray) -> float:
+    """
+    Compute Q risk: Q = 1000 * sqrt(w' Σ w) (0 when the variance is negative;
+    a CovarianceModel uses its PSD repair instead).
+    """
+    var = quadratic_form(Sigma, w)
+    if var < 0:
+        return 0.0
+    return 1000 * np.sqrt(var)
+
+
+def compute_mc_to_total(w_bucket: np.ndarray, w_total: np.ndarray, Sigma_total: np.ndarray,
+                        bucket_start_idx: int, bucket_nodes: List[str]) -> float:
+    """
+    Marginal contribution of a bucket to the total portfolio.
+
+    MC_bucket = 1000 * (w_bucket' Σ_total w_total) / sqrt(w_total' Σ_total w_total)
+    """
+    Sigma_w = Sigma_total @ w_total
+    total_var = quadratic_form(Sigma_total, w_total, Sigma_w)
+    if total_var <= 0:
+        return 0.0
+    numerator = w_bucket @ Sigma_w[bucket_start_idx:bucket_start_idx + len(bucket_nodes)]
+    return 1000 * numerator / np.sqrt(total_var)
+
+
+def mc_signed(values) -> List[str]:
+    """'POS' / 'NEG' / 'ZERO' per value (NaN -> 'ZERO')."""
+    return ['POS' if x > 0 else 'NEG' if x < 0 else 'ZERO' for x in values]
+
+
+def compute_bucket_summary(w_total: np.ndarray, bucket_covs: Dict[str, np.ndarray], Sigma_total: np.ndarray,
+                           buckets: Dict[str, List[str]]) -> pd.DataFrame:
+    """
+    Bucket summary table (bucket_summary_df).
+
+    Parameters:
+    -----------
+    w_total : ndarray
+        Node positions in Sigma_total order (front, mid, back)
+    bucket_covs : dict
+        Bucket name -> bucket covariance (standalone Q)
+    Sigma_total : ndarray
+        Total covariance over all bucket nodes (MC to total)
+    buckets : dict
+        Bucket name -> nodes, in Sigma_total order (e.g., {'Front': front, 'Mid': mid, 'Back': back})
+
+    Returns:
+    --------
+    DataFrame : bucket, standalone_Q, MC_to_total, Q_check, MC_signed (last row 'TOTAL')
+    """
+    names, q_values, mc_values = [], [], []
+    start = 0
+    for name, nodes in buckets.items():
+        w_bucket = w_total[start:start + len(nodes)]
+        names.append(name)
+        q_values.append(compute_q_risk(w_bucket, bucket_covs[name]))
+        mc_values.append(compute_mc_to_total(w_bucket, w_total, Sigma_total, start, nodes))
+        start += len(nodes)
+
+    bucket_summary_df = pd.DataFrame({
+        'bucket': names + ['TOTAL'],
+        'standalone_Q': q_values + [compute_q_risk(w_total, Sigma_total)],
+        'MC_to_total': mc_values + [np.nan],
+    })
+    bucket_summary_df['Q_check'] = ['OK' if x >= 0 and np.isfinite(x) else 'FAIL'
+                                    for x in bucket_summary_df['standalone_Q']]
+    bucket_summary_df['MC_signed'] = mc_signed(bucket_summary_df['MC_to_total'])
+    return bucket_summary_df
@@ -0,0 +1,215 @@
+"""
+Returns Builder
+
+Builds per-product daily returns (price diffs) for all products at once, with
+holiday calendars loaded once per exchange into sorted datetime64 arrays and
+holiday filtering done by np.searchsorted instead of per-date set lookups.
+
+Default behaviour matches the notebooks: diff consecutive price rows, drop
+rows with NaN, then drop returns dated on a holiday of the product's exchange.
+"""
+
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .instrumentation import instrumented, span
+from .market_data import MarketDataStore, parse_node_columns
+
+# Exchange whose calendar applies to products without an explicit entry.
+# holidays.csv is the CME calendar, which the notebooks apply to every product.
+DEFAULT_EXCHANGE = 'CME'
+
+HOLIDAY_MODES = ('drop_returns', 'skip_days')
+
+
+# ============================================================================
+# HOLIDAY CALENDARS
+# ============================================================================
+
+def load_holidays(holidays_file: str = 'holidays.csv') -> np.ndarray:
+    """
+    Load a holiday file (M/D/YYYY, one per line; BOM and blank lines allowed).
+
+    Returns:
+    --------
+    np.ndarray : sorted unique datetime64[D] holiday dates
+    """
+    holidays_df = pd.read_csv(holidays_file, header=None, names=['date'], encoding='utf-8-sig',
+                              skip_blank_lines=True, dtype=str)
+    dates = pd.to_datetime(holidays_df['date'].str.strip(), format='%m/%d/%Y', errors='coerce').dropna()
+    return np.unique(dates.values.astype('datetime64[D]'))
+
+
+def load_holiday_calendars(calendar_files: Optional[Dict[str, str]] = None) -> Dict[str, np.ndarray]:
+    """
+    Load one holiday calendar per exchange.
+
+    Parameters:
+    -----------
+    calendar_files : dict, optional
+        Exchange -> holiday file (defaults to {'CME': 'holidays.csv'})
+
+    Returns:
+    --------
+    dict : exchange -> sorted datetime64[D] holidays
+    """
+    if calendar_files is None:
+        calendar_files = {DEFAULT_EXCHANGE: 'holidays.csv'}
+    return {exchange: load_holidays(path) for exchange, path in calendar_files.items()}
+
+
+def holiday_mask(dates, holidays: np.ndarray) -> np.ndarray:
+    """
+    Boolean mask of dates (any datetime64 resolution) that fall on a holiday.
+
+    holidays must be sorted datetime64[D] (as returned by load_holidays).
+    """
+    days = np.asarray(dates, dtype='datetime64[ns]').astype('datetime64[D]')
+    if len(holidays) == 0:
+        return np.zeros(len(days), dtype=bool)
+    idx = np.minimum(np.searchsorted(holidays, days), len(holidays) - 1)
+    return holidays[idx] == days
+
+
+# ============================================================================
+# RETURNS
+# ============================================================================
+
+def _price_cube(prices: Union[MarketDataStore, pd.DataFrame], products: Optional[List[str]] = None):
+    """(dates, products, columns, cube (P x T x M, NaN-padded), node counts) from a store or wide frame."""
+    if isinstance(prices, MarketDataStore):
+        products = list(prices.products) if products is None else list(products)
+        columns = {p: prices.columns(p) for p in products}
+        n_nodes = np.array([len(columns[p]) for p in products], dtype=np.intp)
+        if products == prices.products:
+            return prices.dates, products, columns, prices.values, n_nodes
+        max_nodes = int(n_nodes.max(initial=0))
+        cube = np.full((len(products), len(prices.dates), max_nodes), np.nan)
+        for k, product in enumerate(products):
+            cube[k, :, :n_nodes[k]] = prices.node_matrix(product)
+        return prices.dates, products, columns, cube, n_nodes
+
+    df_raw = prices.sort_index()
+    by_product = parse_node_columns(df_raw.columns)
+    products = list(by_product) if products is None else [p for p in products if p in by_product]
+    columns = {p: [col for _, col in by_product[p]] for p in products}
+    n_nodes = np.array([len(columns[p]) for p in products], dtype=np.intp)
+    max_nodes = int(n_nodes.max(initial=0))
+    cube = np.full((len(products), len(df_raw), max_nodes), np.nan)
+    for k, product in enumerate(products):
+        cube[k, :, :n_nodes[k]] = df_raw[columns[product]].to_numpy(dtype=np.float64)
+    return pd.DatetimeIndex(df_raw.index), products, columns, cube, n_nodes
+
+
+@instrumented('returns_build', lambda prices, *a, **k: {'dates': len(getattr(prices, 'dates', prices))})
+def build_product_returns(prices: Union[MarketDataStore, pd.DataFrame],
+                          calendars: Optional[Dict[str, np.ndarray]] = None,
+                          product_exchange: Optional[Dict[str, str]] = None,
+                          products: Optional[List[str]] = None,
+                          holiday_mode: str = 'drop_returns') -> Dict[str, pd.DataFrame]:
+    """
+    Daily returns for every product, filtered by each product's exchange calendar.
+
+    Parameters:
+    -----------
+    prices : MarketDataStore or DataFrame
+        Price store, or wide price frame indexed by date ('{product}_A{n}' columns)
+    calendars : dict, optional
+        Exchange -> sorted datetime64[D] holidays (default: load_holiday_calendars())
+    product_exchange : dict, optional
+        Data product (e.g., 'clbr') -> exchange; unlisted products use DEFAULT_EXCHANGE
+    products : list, optional
+        Data products to build (default: all in prices)
+    holiday_mode : str
+        'drop_returns' : diff all rows, then drop returns dated on a holiday (notebooks)
+        'skip_days'    : drop holiday price rows first, so the next return spans the holiday
+
+    Returns:
+    --------
+    dict : product -> returns DataFrame (dates x nodes, NaN rows dropped)
+    """
+    if holiday_mode not in HOLIDAY_MODES:
+        raise ValueError(f"Unknown holiday_mode: {holiday_mode}")
+    calendars = load_holiday_calendars() if calendars is None else calendars
+    product_exchange = product_exchange or {}
+    dates, products, columns, cube, n_nodes = _price_cube(prices, products)
+    node_valid = np.arange(cube.shape[2])[None, :] < n_nodes[:, None]        # (P, M) real vs padded nodes
+
+    exchanges = [product_exchange.get(p, DEFAULT_EXCHANGE) for p in products]
+    empty = np.array([], dtype='datetime64[D]')
+    groups: Dict[str, List[int]] = {}
+    for k, exchange in enumerate(exchanges):
+        groups.setdefault(exchange, []).append(k)
+
+    # Holiday masks over return dates (drop_returns) or price dates (skip_days), one per exchange
+    mask_dates = dates[1:] if holiday_mode == 'drop_returns' else dates
+    with span('holiday_filter', dates=len(mask_dates), exchanges=len(groups)):
+        holidays = {exchange: holiday_mask(mask_dates, calendars.get(exchange, empty)) for exchange in groups}
+
+    if holiday_mode == 'drop_returns':
+        # One diff for every product; only the holiday masks differ by exchange
+        return_dates = dates[1:]
+        diffs = np.diff(cube, axis=1)
+        keep = ~(np.isnan(diffs) & node_valid[:, None, :]).any(axis=2)
+        for exchange, members in groups.items():
+            keep[members] &= ~holidays[exchange]
+        batches = [(list(range(len(products))), return_dates, diffs, keep)]
+    else:
+        # Holiday price rows differ by exchange: one diff per exchange group
+        batches = []
+        for exchange, members in groups.items():
+            price_rows = ~holidays[exchange]
+            diffs = np.diff(cube[members][:, price_rows], axis=1)
+            keep = ~(np.isnan(diffs) & node_valid[members][:, None, :]).any(axis=2)
+            batches.append((members, dates[price_rows][1:], diffs, keep))
+
+    product_returns = {}
+    for members, return_dates, diffs, keep in batches:
+        for row, k in enumerate(members):
+            product = products[k]
+            product_returns[product] = pd.DataFrame(diffs[row][keep[row]][:, :n_nodes[k]],
+                                                    index=return_dates[keep[row]], columns=columns[product])
+    return {product: product_returns[product] for product in products}
+
+
+def build_combined_returns(product_returns: Dict[str, pd.DataFrame],
+                           products: Optional[List[str]] = None) -> Tuple[pd.DataFrame, Dict[str, Tuple[int, int]]]:
+    """
+    Align per-product returns on their common dates into one wide matrix.
+
+    Parameters:
+    -----------
+    product_returns : dict
+        Product -> returns DataFrame (from build_product_returns)
+    products : list, optional
+        Product order in the combined matrix (default: dict order)
+
+    Returns:
+    --------
+    combined_returns_df : DataFrame
+        Common dates x (product1 nodes, product2 nodes, ...)
+    product_indices : dict
+        Product -> (start_idx, end_idx) column range in the combined matrix
+    """
+    products = list(product_returns) if products is None else list(products)
+    if not products:
+        return pd.DataFrame(), {}
+
+    common_dates = product_returns[products[0]].index
+    for product in products[1:]:
+        common_dates = common_dates.intersection(product_returns[product].index)
+
+    blocks = []
+    product_indices = {}
+    start = 0
+    for product in products:
+        block = product_returns[product].loc[common_dates]
+        blocks.append(block.to_numpy())
+        product_indices[product] = (start, start + block.shape[1])
+        start += block.shape[1]
+
+    columns = [col for product in products for col in product_returns[product].columns]
+    combined_returns_df = pd.DataFrame(np.hstack(blocks), index=common_dates, columns=columns)
+    return combined_returns_df, product_indices
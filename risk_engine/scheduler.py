@@ -0,0 +1,244 @@
+"""
+Process Pool Scheduler
+
+Fans per-product covariance work (and, for covariance histories, date ranges)
+out across a ProcessPoolExecutor. Returns are copied into shared memory once;
+tasks carry only the block name, shape and offsets, so no DataFrames are
+pickled. Results are merged in task order, so the output does not depend on
+which worker finishes first. workers=1 runs every task in-process on the
+original arrays (serial fallback for debugging).
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .ewma import (compute_bucket_covariances, ewma_history_block, ewma_initial_covariance, ewma_update,
+                   ewma_update_multi_lambda, pairwise_lambda_matrix)
+
+
+def resolve_workers(workers: Optional[int], n_tasks: int) -> int:
+    """Worker count: None -> one per CPU, never more than the number of tasks."""
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    return max(1, min(workers, n_tasks))
+
+
+def _run_tasks(fn, task_args: List[tuple], workers: int) -> list:
+    """fn(*args) for every task, results in task order."""
+    if workers <= 1:
+        return [fn(*args) for args in task_args]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, *zip(*task_args)))
+
+
+# ============================================================================
+# SHARED MEMORY
+# ============================================================================
+
+class SharedArray:
+    """
+    ndarray backed by a shared memory block owned by this process.
+
+    Tasks receive .spec ('shm', name, shape, dtype) and attach with
+    resolve_array; the block is unlinked on close().
+    """
+
+    def __init__(self, shape: Tuple[int, ...], dtype=np.float64, data: Optional[np.ndarray] = None):
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, nbytes))
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self._shm.buf)
+        if data is not None:
+            self.array[...] = data
+        self.spec = ('shm', self._shm.name, tuple(shape), dtype.str)
+
+    @classmethod
+    def from_array(cls, array: np.ndarray) -> 'SharedArray':
+        return cls(array.shape, array.dtype, array)
+
+    def close(self) -> None:
+        self.array = None
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self) -> 'SharedArray':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# Blocks attached by this worker process (kept open for the life of the worker)
+_ATTACHED: Dict[str, Tuple[shared_memory.SharedMemory, np.ndarray]] = {}
+
+
+def resolve_array(source) -> np.ndarray:
+    """
+    Array behind a task argument.
+
+    ndarray           : used as is (serial runs)
+    ('shm', name, ..) : shared memory block, attached once per process
+    ('npy', path)     : .npy file, memory-mapped read/write
+    """
+    if isinstance(source, np.ndarray):
+        return source
+    if source[0] == 'npy':
+        return np.load(source[1], mmap_mode='r+')
+    _, name, shape, dtype = source
+    if name not in _ATTACHED:
+        shm = shared_memory.SharedMemory(name=name)
+        _ATTACHED[name] = (shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf))
+    return _ATTACHED[name][1]
+
+
+# ============================================================================
+# PER-PRODUCT COVARIANCES
+# ============================================================================
+
+def _product_covariance_task(source, offset: int, shape: Tuple[int, int], columns: List[str], product: str,
+                             buckets: Dict[str, List[str]], bucket_lambdas: Dict[str, float], init_obs: int):
+    flat = resolve_array(source)
+    values = flat[offset:offset + shape[0] * shape[1]].reshape(shape)
+    returns_df = pd.DataFrame(values, columns=columns, copy=False)
+    return compute_bucket_covariances(returns_df, product, buckets, bucket_lambdas, init_obs=init_obs)
+
+
+def product_covariances(product_returns: Dict[str, pd.DataFrame], buckets: Dict[str, List[str]],
+                        bucket_lambdas: Dict[str, float], init_obs: int = 60,
+                        workers: Optional[int] = None) -> Dict[str, Tuple[Dict[str, np.ndarray], np.ndarray]]:
+    """
+    compute_bucket_covariances for every product, one task per product.
+
+    Parameters:
+    -----------
+    product_returns : dict
+        Data product -> returns DataFrame (columns '{product}_{node}')
+    buckets : dict
+        Bucket name -> nodes, in Sigma_total order
+    bucket_lambdas : dict
+        Bucket name -> EWMA decay
+    init_obs : int
+        Number of observations for initial covariance
+    workers : int, optional
+        Worker processes (None: one per CPU; 1: serial)
+
+    Returns:
+    --------
+    dict : product -> (bucket_covs, Sigma_total), in product_returns order
+    """
+    products = list(product_returns)
+    workers = resolve_workers(workers, len(products))
+    blocks = [product_returns[p].to_numpy(dtype=np.float64) for p in products]
+    columns = [list(product_returns[p].columns) for p in products]
+
+    if workers <= 1:
+        results = [_product_covariance_task(block.ravel(), 0, block.shape, cols, p, buckets,
+                                            bucket_lambdas, init_obs)
+                   for p, block, cols in zip(products, blocks, columns)]
+    else:
+        # All products in one flat block; each task reads its slice
+        offsets = np.concatenate([[0], np.cumsum([block.size for block in blocks])]).astype(int)
+        with SharedArray((int(offsets[-1]),)) as shared:
+            for k, block in enumerate(blocks):
+                shared.array[offsets[k]:offsets[k + 1]] = block.ravel()
+            results = _run_tasks(_product_covariance_task,
+                                 [(shared.spec, int(offsets[k]), blocks[k].shape, columns[k], p, buckets,
+                                   bucket_lambdas, init_obs) for k, p in enumerate(products)], workers)
+    return dict(zip(products, results))
+
+
+# ============================================================================
+# COVARIANCE HISTORY BY DATE RANGE
+# ============================================================================
+
+def _history_task(source, out, lambdas, lambda_mean: str, init_obs: int, start: int, stop: int) -> None:
+    returns = resolve_array(source)
+    cube = resolve_array(out)
+    # State after row start-1 in closed form, then the recursion over the range
+    cov_current = ewma_initial_covariance(returns, init_obs)
+    if np.ndim(lambdas) == 0:
+        cov_current = ewma_update(cov_current, returns[init_obs:start], float(lambdas))
+        lambda_matrix = float(lambdas)
+    else:
+        cov_current = ewma_update_multi_lambda(cov_current, returns[init_obs:start], lambdas, lambda_mean)
+        lambda_matrix = pairwise_lambda_matrix(lambdas, lambda_mean)
+    ewma_history_block(returns, lambda_matrix, cov_current, start, stop, cube)
+    if isinstance(cube, np.memmap):
+        cube.flush()
+
+
+def parallel_covariance_history(returns: np.ndarray, lambdas: Union[float, Sequence[float]], init_obs: int = 60,
+                                lambda_mean: str = 'arithmetic', out_file: Optional[str] = None,
+                                dtype=np.float64, workers: Optional[int] = None,
+                                n_chunks: Optional[int] = None) -> np.ndarray:
+    """
+    ewma_covariance_history split into contiguous date ranges, one task per range.
+
+    Each task rebuilds Σ at the start of its range in closed form and runs the
+    recursion over its own rows, so ranges are independent. Rows are written
+    to a shared memory cube, or straight into out_file when given.
+
+    Parameters:
+    -----------
+    returns : ndarray
+        Returns, shape (T, N), oldest first
+    lambdas : float or sequence
+        Single EWMA decay, or one decay per variable (paired via lambda_mean)
+    init_obs : int
+        Number of observations for initial covariance
+    lambda_mean : str
+        'arithmetic' or 'geometric' pairing of per-variable lambdas
+    out_file : str, optional
+        .npy file for the cube (returned memory-mapped)
+    dtype : numpy dtype
+        float64 or float32 for the stored cube
+    workers : int, optional
+        Worker processes (None: one per CPU; 1: serial)
+    n_chunks : int, optional
+        Date ranges (default: one per worker)
+
+    Returns:
+    --------
+    cube : ndarray or np.memmap
+        Covariance history, shape (T, N, N), as ewma_covariance_history
+    """
+    returns = np.ascontiguousarray(returns, dtype=np.float64)
+    n_obs, n_vars = returns.shape
+    lambdas = lambdas if np.ndim(lambdas) == 0 else np.asarray(lambdas, dtype=np.float64)
+    initial = ewma_initial_covariance(returns, init_obs)
+
+    n_chunks = resolve_workers(workers, n_obs) if n_chunks is None else n_chunks
+    bounds = np.linspace(init_obs, n_obs, max(1, n_chunks) + 1).astype(int)
+    ranges = [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+    workers = resolve_workers(workers, len(ranges))
+
+    shape = (n_obs, n_vars, n_vars)
+    if out_file is not None:
+        cube = np.lib.format.open_memmap(out_file, mode='w+', dtype=dtype, shape=shape)
+    else:
+        cube = np.empty(shape, dtype=dtype)
+    cube[:init_obs - 1] = np.nan
+    cube[init_obs - 1] = initial
+
+    if workers <= 1:
+        for start, stop in ranges:
+            _history_task(returns, cube, lambdas, lambda_mean, init_obs, start, stop)
+    elif out_file is not None:
+        cube.flush()
+        with SharedArray.from_array(returns) as shared:
+            _run_tasks(_history_task, [(shared.spec, ('npy', out_file), lambdas, lambda_mean, init_obs, a, b)
+                                       for a, b in ranges], workers)
+        cube = np.load(out_file, mmap_mode='r+')
+    else:
+        with SharedArray.from_array(returns) as shared, SharedArray(shape, dtype, cube) as out:
+            _run_tasks(_history_task, [(shared.spec, out.spec, lambdas, lambda_mean, init_obs, a, b)
+                                       for a, b in ranges], workers)
+            cube[...] = out.array
+
+    if isinstance(cube, np.memmap):
+        cube.flush()
+    return cube
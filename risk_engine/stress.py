@@ -0,0 +1,236 @@
+"""
+Curve Stress Engine
+
+Scenarios are node-shock vectors (price changes) in the combined multi-product
+layout, built in bulk as (shocks, labels) pairs:
+
+    parallel_shift_scenarios  : every node of a product (or all products) moved by a size
+    bucket_twist_scenarios    : build_factor_matrix_bucket loadings (Level, adjacent
+                                spreads, Block1-Block2, Early-Late, ...) per product and bucket
+    historical_scenarios      : the book's worst days in the returns matrix
+    eigen_scenarios           : top eigenvectors of Σ at n sigmas, signed against the
+                                book, and the worst case on the n-sigma ellipsoid
+
+evaluate_scenarios applies every scenario to every strategy with Scenarios @ Wᵀ
+(blocks of strategies when the result is large) and streams the P&L into a
+column-major .npy file, so each strategy's P&L across scenarios is contiguous.
+
+P&L is in the Q units (1000 x lots x price change).
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .covariance_model import as_covariance_model
+from .factors import factor_basis
+from .instrumentation import instrumented
+from .var_es import strategy_labels
+
+# Cap on the (n_scenarios x n_strategies) block evaluated at once
+STRESS_BLOCK_ELEMENTS = 8_000_000
+
+
+def _n_columns(product_indices: Dict[str, Tuple[int, int]]) -> int:
+    return max(end for _, end in product_indices.values())
+
+
+def _labels(names: List[str], kind: str, products: List[str]) -> pd.DataFrame:
+    return pd.DataFrame({'Scenario': names, 'Type': kind, 'Product': products})
+
+
+# ============================================================================
+# SCENARIO BUILDERS
+# ============================================================================
+
+def parallel_shift_scenarios(product_indices: Dict[str, Tuple[int, int]],
+                             sizes: Sequence[float] = (-5.0, -2.0, -1.0, 1.0, 2.0, 5.0),
+                             joint: bool = True) -> Tuple[np.ndarray, pd.DataFrame]:
+    """
+    Parallel shifts of each product's curve, and of all products together when joint.
+
+    Returns:
+    --------
+    shocks : ndarray
+        (n_scenarios x N) node price changes
+    labels : DataFrame
+        Scenario, Type, Product per row
+    """
+    sizes = np.asarray(sizes, dtype=np.float64)
+    groups = list(product_indices) + (['ALL'] if joint and len(product_indices) > 1 else [])
+    masks = np.zeros((len(groups), _n_columns(product_indices)))
+    for g, product in enumerate(groups):
+        ranges = product_indices.values() if product == 'ALL' else [product_indices[product]]
+        for start, end in ranges:
+            masks[g, start:end] = 1.0
+
+    shocks = (masks[:, None, :] * sizes[None, :, None]).reshape(-1, masks.shape[1])
+    products = np.repeat(groups, len(sizes)).tolist()
+    names = [f"{product} parallel {size:+g}" for product in groups for size in sizes]
+    return shocks, _labels(names, 'parallel', products)
+
+
+def bucket_twist_scenarios(product_indices: Dict[str, Tuple[int, int]], buckets: Dict[str, List[str]],
+                           all_nodes: List[str], sizes: Sequence[float] = (-1.0, 1.0)
+                           ) -> Tuple[np.ndarray, pd.DataFrame]:
+    """
+    One scenario per (product, bucket, factor, size): the factor's loading
+    column from build_factor_matrix_bucket, scaled so its largest node move
+    equals size (Level moves every bucket node by size; A01/A02 moves A01 up
+    and A02 down).
+    """
+    sizes = np.asarray(sizes, dtype=np.float64)
+    n_cols = _n_columns(product_indices)
+    blocks, names, products = [], [], []
+    for product, (start, _) in product_indices.items():
+        for bucket, nodes in buckets.items():
+            B, _, factor_names, _ = factor_basis(tuple(nodes), bucket.lower())
+            columns = B / np.abs(B).max(axis=0)
+            block = np.zeros((B.shape[1], n_cols))
+            block[:, [start + all_nodes.index(node) for node in nodes]] = columns.T
+            blocks.append(block)
+            names.extend(f"{product} {bucket} {factor}" for factor in factor_names)
+            products.extend([product] * B.shape[1])
+
+    loadings = np.vstack(blocks)
+    shocks = (loadings[:, None, :] * sizes[None, :, None]).reshape(-1, n_cols)
+    names = [f"{name} {size:+g}" for name in names for size in sizes]
+    return shocks, _labels(names, 'bucket_twist', np.repeat(products, len(sizes)).tolist())
+
+
+def historical_scenarios(returns: pd.DataFrame, w_total: Optional[np.ndarray] = None,
+                         n_worst: int = 20) -> Tuple[np.ndarray, pd.DataFrame]:
+    """
+    Historical days as scenarios: the n_worst days for the book w_total, or the
+    n_worst largest moves (Euclidean norm) when no book is given. Rows with
+    NaN are skipped.
+    """
+    values = returns.to_numpy(dtype=np.float64)
+    complete = np.flatnonzero(~np.isnan(values).any(axis=1))
+    score = values[complete] @ w_total if w_total is not None else -np.linalg.norm(values[complete], axis=1)
+    order = complete[np.argsort(score, kind='stable')[:n_worst]]
+    dates = [d.strftime('%Y-%m-%d') if hasattr(d, 'strftime') else str(d) for d in returns.index[order]]
+    return values[order], _labels([f"historical {d}" for d in dates], 'historical', ['ALL'] * len(order))
+
+
+def eigen_scenarios(Sigma, n_vectors: int = 5, n_sigmas: float = 3.0,
+                    w_total: Optional[np.ndarray] = None) -> Tuple[np.ndarray, pd.DataFrame]:
+    """
+    Worst cases from Σ (eigen-decomposition from its CovarianceModel; a
+    FactorCovariance is materialized first).
+
+    The top n_vectors eigenvectors are scaled to n_sigmas standard deviations.
+    With a book, each is signed so the book loses, and the worst case on the
+    n-sigma ellipsoid, -n Σ w / √(w' Σ w), is added. Without a book both signs
+    are returned.
+    """
+    model = as_covariance_model(Sigma.to_dense() if hasattr(Sigma, 'project') else Sigma)
+    eigenvalues, eigenvectors = model.eigh
+    order = np.argsort(eigenvalues)[::-1][:n_vectors]
+    vectors = (eigenvectors[:, order] * (n_sigmas * np.sqrt(np.maximum(eigenvalues[order], 0.0)))).T
+    names = [f"eigen {k + 1} {n_sigmas:g}sd" for k in range(len(order))]
+
+    if w_total is None:
+        shocks = np.vstack([vectors, -vectors])
+        names = [f"{name} +" for name in names] + [f"{name} -" for name in names]
+        return shocks, _labels(names, 'eigen', ['ALL'] * len(shocks))
+
+    sign = np.where(vectors @ w_total > 0, -1.0, 1.0)
+    shocks = vectors * sign[:, None]
+    Sigma_w = model @ w_total
+    total_var = float(w_total @ Sigma_w)
+    if total_var > 0:
+        shocks = np.vstack([shocks, -n_sigmas * Sigma_w / np.sqrt(total_var)])
+        names.append(f"worst case {n_sigmas:g}sd ellipsoid")
+    return shocks, _labels(names, 'eigen', ['ALL'] * len(shocks))
+
+
+def combine_scenarios(*scenario_sets: Tuple[np.ndarray, pd.DataFrame]) -> Tuple[np.ndarray, pd.DataFrame]:
+    """Stack (shocks, labels) sets into one."""
+    shocks = np.vstack([shocks for shocks, _ in scenario_sets])
+    labels = pd.concat([labels for _, labels in scenario_sets], ignore_index=True)
+    return shocks, labels
+
+
+# ============================================================================
+# EVALUATION
+# ============================================================================
+
+@instrumented('stress', lambda shocks, W, *a, **k: {'scenarios': len(shocks), 'strategies': len(W)})
+def evaluate_scenarios(shocks: np.ndarray, W: np.ndarray, w_total: Optional[np.ndarray] = None,
+                       labels: Optional[pd.DataFrame] = None, keys: Optional[pd.DataFrame] = None,
+                       out_file: Optional[str] = None, dtype=np.float64,
+                       block_elements: int = STRESS_BLOCK_ELEMENTS) -> Dict[str, object]:
+    """
+    P&L of every scenario on every strategy and the book.
+
+    Strategies are evaluated in blocks of at most block_elements results, each
+    one product shocks @ W_blockᵀ. Per-strategy worst / best scenarios are
+    reduced block by block, so only the output holds the full matrix.
+
+    Parameters:
+    -----------
+    shocks : ndarray
+        Scenario node shocks (n_scenarios x N)
+    W : ndarray
+        Strategy position matrix (n_strategies x N)
+    w_total : ndarray, optional
+        Total portfolio vector (default: W summed over strategies)
+    labels : DataFrame, optional
+        Scenario labels aligned with shocks
+    keys : DataFrame, optional
+        Strategy labels (Strategy, Product) aligned with W
+    out_file : str, optional
+        Column-major .npy file for the P&L (returned memory-mapped)
+    dtype : numpy dtype
+        float64 or float32 for the stored P&L
+    block_elements : int
+        Cap on the P&L block computed at once
+
+    Returns:
+    --------
+    dict with
+        'pnl'         : (n_scenarios x n_strategies + 1), book last
+        'scenarios'   : labels with book P&L and the number of losing strategies
+        'strategies'  : strategy labels with worst / best P&L and scenario; last row is the book
+    """
+    shocks = np.ascontiguousarray(shocks, dtype=np.float64)
+    W = np.atleast_2d(np.asarray(W, dtype=np.float64))
+    w_total = W.sum(axis=0) if w_total is None else np.asarray(w_total, dtype=np.float64)
+    weights = 1000.0 * np.vstack([W, w_total])
+    n_scenarios, n_columns = len(shocks), len(weights)
+
+    shape = (n_scenarios, n_columns)
+    if out_file is not None:
+        pnl = np.lib.format.open_memmap(out_file, mode='w+', dtype=dtype, shape=shape, fortran_order=True)
+    else:
+        pnl = np.empty(shape, dtype=dtype, order='F')
+
+    worst_index = np.empty(n_columns, dtype=np.intp)
+    best_index = np.empty(n_columns, dtype=np.intp)
+    losing = np.zeros(n_scenarios, dtype=np.int64)
+    step = max(1, block_elements // max(1, n_scenarios))
+    for c0 in range(0, n_columns, step):
+        c1 = min(c0 + step, n_columns)
+        block = shocks @ weights[c0:c1].T
+        pnl[:, c0:c1] = block
+        worst_index[c0:c1] = block.argmin(axis=0)
+        best_index[c0:c1] = block.argmax(axis=0)
+        losing += (block[:, :max(0, min(c1, n_columns - 1) - c0)] < 0).sum(axis=1)     # book column excluded
+    if isinstance(pnl, np.memmap):
+        pnl.flush()
+
+    labels = (_labels([f"S{i}" for i in range(n_scenarios)], 'custom', ['ALL'] * n_scenarios)
+              if labels is None else labels.reset_index(drop=True))
+    scenarios = labels.copy()
+    scenarios['book_pnl'] = np.asarray(pnl[:, -1], dtype=np.float64)
+    scenarios['n_losing_strategies'] = losing
+
+    columns = np.arange(n_columns)
+    strategies = strategy_labels(keys, len(W))
+    strategies['worst_pnl'] = np.asarray(pnl[worst_index, columns], dtype=np.float64)
+    strategies['worst_scenario'] = labels['Scenario'].to_numpy()[worst_index]
+    strategies['best_pnl'] = np.asarray(pnl[best_index, columns], dtype=np.float64)
+    strategies['best_scenario'] = labels['Scenario'].to_numpy()[best_index]
+    return {'pnl': pnl, 'scenarios': scenarios, 'strategies': strategies}
@@ -0,0 +1,285 @@
+"""
+VaR / ES Engine
+
+Parametric and filtered historical-simulation VaR and expected shortfall for
+every strategy of a book at once, on the node returns used for the EWMA
+covariances.
+
+Parametric : normal P&L with the EWMA Σ (dense or FactorCovariance);
+             VaR = z Q, ES = Q φ(z) / (1 - α), components from the MCs.
+Historical : each day's node returns are rescaled by the ratio of the current
+             EWMA vol to that day's EWMA vol (filtered historical simulation),
+             then P&L for all strategies is one product R @ Wᵀ. Component ES
+             is each strategy's mean P&L on the book's tail days, so the
+             components add up to the book ES.
+
+P&L is in the Q units (1000 x lots x price change).
+"""
+
+import math
+from statistics import NormalDist
+from typing import Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .ewma import ewma_update_rows
+from .instrumentation import instrumented
+from .mc_engine import marginal_contributions
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def strategy_labels(keys: Optional[pd.DataFrame], n_rows: int) -> pd.DataFrame:
+    """
+    Row labels for per-strategy result tables (VaR / ES, Monte Carlo, stress):
+    the Strategy / Product key columns (S0, S1, ... without keys) plus a TOTAL
+    row (first key column 'TOTAL', others blank).
+    """
+    if keys is None:
+        labels = pd.DataFrame({'Strategy': [f'S{i}' for i in range(n_rows)]})
+    else:
+        labels = keys[[c for c in ('Strategy', 'Product') if c in keys.columns] or list(keys.columns[:1])]
+        labels = labels.reset_index(drop=True)
+    total = {col: '' for col in labels.columns}
+    total[labels.columns[0]] = 'TOTAL'
+    return pd.concat([labels, pd.DataFrame([total])], ignore_index=True)
+
+
+def tail_count(n_scenarios: int, confidence: float) -> int:
+    """Number of tail scenarios: ceil((1 - α) n), at least one."""
+    return max(1, int(math.ceil((1.0 - confidence) * n_scenarios - 1e-10)))
+
+
+# ============================================================================
+# PARAMETRIC
+# ============================================================================
+
+@instrumented('parametric_var')
+def parametric_var_es(W: np.ndarray, Sigma, w_total: Optional[np.ndarray] = None, confidence: float = 0.99,
+                      keys: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Normal VaR and ES for every row of W and the total book.
+
+    Parameters:
+    -----------
+    W : ndarray
+        Strategy position matrix (n_strategies x N), e.g. from build_strategy_matrix
+    Sigma : ndarray or FactorCovariance
+        EWMA covariance (N x N)
+    w_total : ndarray, optional
+        Total portfolio vector (default: W summed over strategies)
+    confidence : float
+        VaR / ES confidence level α
+    keys : DataFrame, optional
+        Row labels (Strategy, Product) aligned with W
+
+    Returns:
+    --------
+    DataFrame : labels, Q_standalone, VaR, ES, MC_to_total, component_VaR,
+                component_ES; last row is the book (components sum to it when
+                w_total is the sum of the strategies)
+    """
+    W = np.atleast_2d(np.asarray(W, dtype=np.float64))
+    w_total = W.sum(axis=0) if w_total is None else np.asarray(w_total, dtype=np.float64)
+    normal = NormalDist()
+    z = normal.inv_cdf(confidence)
+    es_multiplier = normal.pdf(z) / (1.0 - confidence)
+
+    mc = marginal_contributions(W, Sigma, w_total)
+    q = np.append(mc['Strategy_Q_standalone'], mc['Total_Q_portfolio'])
+    mc_total = np.append(mc['MC_to_total'], mc['Total_Q_portfolio'])
+
+    result = strategy_labels(keys, len(W))
+    result['Q_standalone'] = q
+    result['VaR'] = z * q
+    result['ES'] = es_multiplier * q
+    result['MC_to_total'] = mc_total
+    result['component_VaR'] = z * mc_total
+    result['component_ES'] = es_multiplier * mc_total
+    return result
+
+
+# ============================================================================
+# FILTERED HISTORICAL SIMULATION
+# ============================================================================
+
+def filtered_returns(returns, lambdas: Union[float, np.ndarray], init_obs: int = 60
+                     ) -> Dict[str, np.ndarray]:
+    """
+    Node returns rescaled to today's EWMA volatility.
+
+    Each scenario day t (a complete row after the first init_obs) becomes
+    r_t * σ_T / σ_t, with σ_t the EWMA vol before day t enters and σ_T the
+    current vol. Initialization and NaN-row skipping match ewma_variances, so
+    σ_T² is its result.
+
+    Parameters:
+    -----------
+    returns : DataFrame or ndarray
+        Node returns, shape (T, N), oldest first
+    lambdas : float or ndarray
+        EWMA decay, one value or one per node
+    init_obs : int
+        Number of observations for the initial variances
+
+    Returns:
+    --------
+    dict with 'returns' (n_scenarios x N filtered returns), 'rows' (their row
+    positions in the input), 'vol_ratio' (σ_T / σ_t per scenario and node) and
+    'current_vol' (σ_T)
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    n_obs, n_vars = returns.shape
+    if n_obs <= init_obs:
+        raise ValueError(f"Need more than {init_obs} observations, got {n_obs}")
+    lambda_vec = np.broadcast_to(np.asarray(lambdas, dtype=np.float64), (n_vars,))
+
+    init_returns = ewma_update_rows(returns[:init_obs])
+    if len(init_returns) < 10:
+        variance = np.full(n_vars, np.var(returns, axis=0).mean())
+    else:
+        variance = np.var(init_returns, axis=0, ddof=1)
+
+    rows = init_obs + np.flatnonzero(~np.isnan(returns[init_obs:]).any(axis=1))
+    scenarios = returns[rows]
+    prior_variance = np.empty_like(scenarios)
+    for k, r in enumerate(scenarios):
+        prior_variance[k] = variance
+        variance = lambda_vec * variance + (1.0 - lambda_vec) * r * r
+
+    current_vol = np.sqrt(variance)
+    prior_vol = np.sqrt(prior_variance)
+    vol_ratio = np.divide(current_vol, prior_vol, out=np.ones_like(prior_vol), where=prior_vol > 1e-10)
+    return {
+        'returns': scenarios * vol_ratio,
+        'rows': rows,
+        'vol_ratio': vol_ratio,
+        'current_vol': current_vol,
+    }
+
+
+def scenario_pnl(scenario_returns: np.ndarray, W: np.ndarray, w_total: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    P&L of every strategy and the book on every scenario: one product R @ Wᵀ.
+
+    Returns:
+    --------
+    ndarray : (n_scenarios x n_strategies + 1), last column is the book
+    """
+    W = np.atleast_2d(np.asarray(W, dtype=np.float64))
+    w_total = W.sum(axis=0) if w_total is None else np.asarray(w_total, dtype=np.float64)
+    weights = 1000.0 * np.vstack([W, w_total])
+    return np.asarray(scenario_returns, dtype=np.float64) @ weights.T
+
+
+@instrumented('historical_var')
+def historical_var_es(returns, W: np.ndarray, w_total: Optional[np.ndarray] = None,
+                      lambdas: Union[float, np.ndarray] = 0.97, confidence: float = 0.99,
+                      window: Optional[int] = None, init_obs: int = 60, filtered: bool = True,
+                      keys: Optional[pd.DataFrame] = None) -> Dict[str, object]:
+    """
+    Historical-simulation VaR / ES with component and marginal ES.
+
+    Parameters:
+    -----------
+    returns : DataFrame or ndarray
+        Node returns, shape (T, N), oldest first, columns in W's layout
+    W : ndarray
+        Strategy position matrix (n_strategies x N)
+    w_total : ndarray, optional
+        Total portfolio vector (default: W summed over strategies)
+    lambdas : float or ndarray
+        EWMA decay for the volatility filter, one value or one per node
+    confidence : float
+        VaR / ES confidence level α
+    window : int, optional
+        Use only the most recent `window` scenario days (default: all)
+    init_obs : int
+        Observations for the initial variances; scenarios start after them
+    filtered : bool
+        Rescale returns to today's EWMA vol (False: plain historical simulation)
+    keys : DataFrame, optional
+        Row labels (Strategy, Product) aligned with W
+
+    Returns:
+    --------
+    dict with
+        'summary'   : labels, VaR, ES (standalone), component_ES,
+                      component_ES_pct; last row is the book
+        'pnl'       : scenario P&L (n_scenarios x n_strategies + 1), book last
+        'rows'      : input row of each scenario
+        'marginal_ES' : ndarray (N), ES per lot of each node on the book's tail
+                      days (component_ES = W @ marginal_ES)
+        'tail_rows' : input rows of the book's tail scenarios
+    """
+    values = np.asarray(returns, dtype=np.float64)
+    if filtered:
+        filtered_set = filtered_returns(values, lambdas, init_obs)
+        scenarios, rows = filtered_set['returns'], filtered_set['rows']
+    else:
+        rows = init_obs + np.flatnonzero(~np.isnan(values[init_obs:]).any(axis=1))
+        scenarios = values[rows]
+    if window is not None:
+        scenarios, rows = scenarios[-window:], rows[-window:]
+    if len(scenarios) == 0:
+        raise ValueError("No complete scenario rows after init_obs")
+
+    W = np.atleast_2d(np.asarray(W, dtype=np.float64))
+    w_total = W.sum(axis=0) if w_total is None else np.asarray(w_total, dtype=np.float64)
+    pnl = scenario_pnl(scenarios, W, w_total)
+    n_scenarios = len(pnl)
+    k = tail_count(n_scenarios, confidence)
+
+    # Standalone: the k worst outcomes of every column in one partition
+    worst = np.partition(pnl, k - 1, axis=0)[:k]
+    var = -worst[k - 1]
+    es = -worst.mean(axis=0)
+
+    # Components: every strategy on the book's k worst days
+    tail = np.argpartition(pnl[:, -1], k - 1)[:k]
+    marginal_es = -1000.0 * scenarios[tail].mean(axis=0)
+    component_es = -pnl[tail].mean(axis=0)
+
+    summary = strategy_labels(keys, len(W))
+    summary['VaR'] = var
+    summary['ES'] = es
+    summary['component_ES'] = component_es
+    book_es = component_es[-1]
+    summary['component_ES_pct'] = (component_es / book_es * 100) if abs(book_es) > 1e-10 else 0.0
+    return {
+        'summary': summary,
+        'pnl': pnl,
+        'rows': rows,
+        'marginal_ES': marginal_es,
+        'tail_rows': np.sort(rows[tail]),
+    }
+
+
+def rolling_historical_var(pnl: Union[np.ndarray, pd.DataFrame], window: int,
+                           confidence: float = 0.99) -> pd.DataFrame:
+    """
+    VaR over a rolling window of scenario P&L (the k-th worst of each window,
+    as historical_var_es), for every column at once. The first window - 1
+    rows are NaN.
+    """
+    pnl = pd.DataFrame(pnl)
+    k = tail_count(window, confidence)
+    quantile = (k - 1) / (window - 1) if window > 1 else 0.0
+    return -pnl.rolling(window).quantile(quantile, interpolation='lower')
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+    A = rng.normal(size=(15, 15))
+    returns = rng.normal(size=(750, 15)) @ np.linalg.cholesky(A @ A.T / 15 + np.eye(15)).T * 0.5
+    W = rng.normal(0.0, 50.0, (5, 15))
+    Sigma = np.cov(returns[-250:], rowvar=False)
+
+    print("Parametric 99%:")
+    print(parametric_var_es(W, Sigma).round(1).to_string(index=False))
+    result = historical_var_es(returns, W, lambdas=0.97, window=500)
+    print("\nFiltered historical 99% (500 days):")
+    print(result['summary'].round(1).to_string(index=False))
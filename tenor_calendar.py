@@ -0,0 +1,207 @@
+"""
+Tenor Calendar Module
+
+Resolves tenor strings (outrights, quarterlies, halves, calendars, seasons and
+strips) for any year into integer month ordinals, so expansion and sorting work
+on integers instead of regenerated string dictionaries.
+
+Month ordinal = year * 12 + month_index, with month_index 0 (F=Jan) .. 11 (Z=Dec).
+"""
+
+import re
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+
+# ============================================================================
+# FUTURES MONTH CODES
+# ============================================================================
+
+# F=Jan, G=Feb, H=Mar, J=Apr, K=May, M=Jun,
+# N=Jul, Q=Aug, U=Sep, V=Oct, X=Nov, Z=Dec
+MONTH_CODES = 'FGHJKMNQUVXZ'
+MONTH_INDEX = {code: idx for idx, code in enumerate(MONTH_CODES)}
+
+# Single-digit year codes (e.g., 'H6') resolve into the ten-year window
+# starting here: 5 -> 2025, 6 -> 2026, ..., 9 -> 2029, 0 -> 2030, ..., 4 -> 2034.
+# Months outside the window are written with two-digit (2000-2099) or
+# four-digit years, so codes always resolve back to the same month.
+ONE_DIGIT_YEAR_START = 2025
+
+# Sort ordinal for tenors that cannot be resolved (sorted to the end)
+UNKNOWN_ORDINAL = np.iinfo(np.int64).max
+
+_YEAR = r'(\d{1,2}|\d{4})'
+_MONTH = f'([{MONTH_CODES}])'
+
+_OUTRIGHT_RE = re.compile(f'^{_MONTH}{_YEAR}$')
+_QUARTERLY_RE = re.compile(r'^Q([1-4])-(\d{2}|\d{4})$')
+_HALF_RE = re.compile(r'^H([12])-(\d{2}|\d{4})$')
+_CALENDAR_RE = re.compile(r'^Cal(\d{2}|\d{4})$')
+_SEASON_RE = re.compile(r'^(Sum|Win)(\d{2}|\d{4})$')
+_STRIP_RE = re.compile(f'^{_MONTH}{_YEAR}-{_MONTH}{_YEAR}$')
+
+
+# ============================================================================
+# YEAR / ORDINAL CONVERSION
+# ============================================================================
+
+def resolve_year(year_str: str) -> int:
+    """
+    Convert a 1, 2 or 4 digit year code to a full year.
+
+    '6' -> 2026 (see ONE_DIGIT_YEAR_START), '26' -> 2026, '2026' -> 2026
+    """
+    if len(year_str) == 1:
+        digit = int(year_str)
+        return ONE_DIGIT_YEAR_START + (digit - ONE_DIGIT_YEAR_START) % 10
+    elif len(year_str) == 2:
+        return 2000 + int(year_str)
+    elif len(year_str) == 4:
+        return int(year_str)
+    raise ValueError(f"Invalid year code: {year_str}")
+
+
+def month_ordinal(year: int, month_idx: int) -> int:
+    """Month ordinal for a full year and month index (0=Jan .. 11=Dec)."""
+    return year * 12 + month_idx
+
+
+def year_code(year: int) -> str:
+    """
+    Shortest year code that resolve_year maps back to year.
+
+    2026 -> '6', 2035 -> '35', 2024 -> '24', 2105 -> '2105'
+    """
+    if ONE_DIGIT_YEAR_START <= year < ONE_DIGIT_YEAR_START + 10:
+        return str(year % 10)
+    elif 2000 <= year < 2100:
+        return f'{year % 100:02d}'
+    elif 1000 <= year <= 9999:
+        return str(year)
+    raise ValueError(f"Year out of range: {year}")
+
+
+def ordinal_to_code(ordinal: int) -> str:
+    """Futures code for a month ordinal, e.g. 2026*12 + 2 -> 'H6', 2035*12 + 2 -> 'H35'."""
+    year, month_idx = divmod(int(ordinal), 12)
+    return f'{MONTH_CODES[month_idx]}{year_code(year)}'
+
+
+# ============================================================================
+# TENOR PARSING
+# ============================================================================
+
+def tenor_type(tenor_str: str) -> str:
+    """
+    Detect tenor type: 'outright', 'quarterly', 'half', 'calendar', 'season',
+    'strip', 'spread', or 'unknown'.
+
+    Examples: 'H6', 'Q2-26', 'H1-2027', 'Cal27', 'Sum26', 'F7-H7', 'Z6/Z7'
+    """
+    if '/' in tenor_str:
+        return 'spread'
+    elif _OUTRIGHT_RE.match(tenor_str):
+        return 'outright'
+    elif _QUARTERLY_RE.match(tenor_str):
+        return 'quarterly'
+    elif _HALF_RE.match(tenor_str):
+        return 'half'
+    elif _CALENDAR_RE.match(tenor_str):
+        return 'calendar'
+    elif _SEASON_RE.match(tenor_str):
+        return 'season'
+    elif _STRIP_RE.match(tenor_str):
+        return 'strip'
+    return 'unknown'
+
+
+def _month_range(first: int, last: int) -> np.ndarray:
+    if last < first:
+        raise ValueError(f"Strip end precedes start: {ordinal_to_code(first)}-{ordinal_to_code(last)}")
+    return np.arange(first, last + 1, dtype=np.int64)
+
+
+@lru_cache(maxsize=4096)
+def tenor_months(tenor_str: str) -> np.ndarray:
+    """
+    Resolve a (non-spread) tenor to its month ordinals.
+
+    Quarterlies and halves are calendar-based (Q1 = F,G,H; H2 = N..Z).
+    Seasons: Sum = Apr-Oct (J..V), Win = Nov-Mar of the following year (X..H).
+    Strips such as 'F7-H7' are inclusive.
+
+    Parameters:
+    -----------
+    tenor_str : str
+        Tenor string (e.g., 'H6', 'Q2-26', 'Cal2029', 'Win27', 'F7-H7')
+
+    Returns:
+    --------
+    np.ndarray : read-only int64 array of month ordinals, in calendar order
+
+    Raises:
+    -------
+    ValueError : if the tenor is a spread or cannot be parsed
+    """
+    match = _OUTRIGHT_RE.match(tenor_str)
+    if match:
+        months = np.array([month_ordinal(resolve_year(match.group(2)), MONTH_INDEX[match.group(1)])],
+                          dtype=np.int64)
+    elif _QUARTERLY_RE.match(tenor_str):
+        quarter, year = _QUARTERLY_RE.match(tenor_str).groups()
+        start = month_ordinal(resolve_year(year), 3 * (int(quarter) - 1))
+        months = _month_range(start, start + 2)
+    elif _HALF_RE.match(tenor_str):
+        half, year = _HALF_RE.match(tenor_str).groups()
+        start = month_ordinal(resolve_year(year), 6 * (int(half) - 1))
+        months = _month_range(start, start + 5)
+    elif _CALENDAR_RE.match(tenor_str):
+        start = month_ordinal(resolve_year(_CALENDAR_RE.match(tenor_str).group(1)), 0)
+        months = _month_range(start, start + 11)
+    elif _SEASON_RE.match(tenor_str):
+        season, year = _SEASON_RE.match(tenor_str).groups()
+        if season == 'Sum':
+            start = month_ordinal(resolve_year(year), MONTH_INDEX['J'])
+            months = _month_range(start, start + 6)
+        else:
+            start = month_ordinal(resolve_year(year), MONTH_INDEX['X'])
+            months = _month_range(start, start + 4)
+    elif _STRIP_RE.match(tenor_str):
+        m1, y1, m2, y2 = _STRIP_RE.match(tenor_str).groups()
+        months = _month_range(month_ordinal(resolve_year(y1), MONTH_INDEX[m1]),
+                              month_ordinal(resolve_year(y2), MONTH_INDEX[m2]))
+    else:
+        raise ValueError(f"Cannot resolve tenor: {tenor_str}")
+
+    months.setflags(write=False)
+    return months
+
+
+@lru_cache(maxsize=4096)
+def expand_tenor_codes(tenor_str: str) -> Tuple[str, ...]:
+    """
+    Expand a (non-spread) tenor to its futures codes, e.g. 'Q2-26' -> ('J6', 'K6', 'M6').
+
+    Unresolvable tenors are returned unexpanded: ('XYZ',).
+    """
+    try:
+        months = tenor_months(tenor_str)
+    except ValueError:
+        return (tenor_str,)
+    return tuple(ordinal_to_code(m) for m in months)
+
+
+@lru_cache(maxsize=4096)
+def tenor_ordinal(tenor_str: str) -> int:
+    """
+    Sort ordinal for a single futures tenor ('J6' -> 2026*12 + 3).
+
+    Multi-month tenors sort by their first month; unresolvable tenors
+    return UNKNOWN_ORDINAL.
+    """
+    try:
+        return int(tenor_months(tenor_str)[0])
+    except ValueError:
+        return UNKNOWN_ORDINAL
@@ -0,0 +1,55 @@
+"""
+Verification of the benchmark suite (synthetic book and price generators, a
+small end-to-end run, JSON history and regression flags)
+"""
+
+import numpy as np
+import tenor_calendar
+from bench_suite import (append_history, compare_runs, load_history, make_position_book, make_price_history,
+                         make_record, run_suite)
+
+
+def test_generators():
+    book = make_position_book(5_000, n_products=7, n_strategies=21, mix={'quarterly': 1, 'spread': 1}, seed=1)
+    assert list(book.columns) == ['Qty', 'Tenor', 'Product', 'Strategy']
+    types = book['Tenor'].map(tenor_calendar.tenor_type)
+    assert set(types) == {'quarterly', 'spread'} and 0.4 < (types == 'spread').mean() < 0.6
+    assert book['Product'].nunique() == 7 and book['Strategy'].nunique() == 21
+    assert (book.groupby('Strategy')['Product'].nunique() == 1).all()
+
+    prices = make_price_history(600, n_products=3, n_nodes=15, seed=2)
+    assert prices.shape == (601, 45) and prices.columns[15] == 'houbr_A01'
+    moves = prices.diff().dropna().to_numpy()
+    corr = np.corrcoef(moves[:, 0], moves[:, 15])[0, 1]
+    assert 0.2 < corr < 0.9                                         # products share a common factor
+
+
+def test_run_and_history(tmp_path):
+    stages = run_suite(2_000, n_products=3, n_strategies=12, n_days=300)
+    assert list(stages) == ['expansion', 'summary', 'returns', 'ewma', 'factor_fit', 'mc', 'factor_attribution',
+                           'hedge']
+    assert all(result['seconds'] >= 0 for result in stages.values())
+    assert stages['mc']['strategies'] == 12 and stages['ewma']['variables'] == 45
+
+    path = str(tmp_path / 'history.json')
+    config = {'mode': 'test', 'rows': 2_000}
+    first = make_record(config, stages)
+    assert compare_runs(first, load_history(path))['previous'].isna().all()
+    append_history(path, first)
+
+    # A second run of the same config is compared stage by stage; other configs are ignored
+    slower = make_record(config, {k: dict(v, seconds=v['seconds'] * 2 + 0.02) for k, v in stages.items()})
+    append_history(path, make_record({'mode': 'other'}, stages))
+    comparison = compare_runs(slower, load_history(path))
+    assert len(append_history(path, slower)) == 3 and comparison['regression'].all()
+    np.testing.assert_allclose(comparison['previous'], [v['seconds'] for v in stages.values()])
+
+
+if __name__ == '__main__':
+    import tempfile
+    from pathlib import Path
+    test_generators()
+    print("[PASS] Synthetic books follow the tenor mix; price histories are correlated")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_run_and_history(Path(tmp))
+    print("[PASS] Every stage runs; history flags slower stages against the same config")
@@ -0,0 +1,112 @@
+"""
+Verification of the risk-engine package entry points: lazy import, CLI tables
+against the notebook loops and several books served by one engine
+"""
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+from risk_engine.cli import main
+from risk_engine.ewma import ewma_covariance_loop
+from risk_engine.pipeline import BUCKET_LAMBDAS, RiskEngine
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SUMMARY = os.path.join(HERE, 'delta_summary.csv')
+POSITIONS = os.path.join(HERE, 'delta_positions.csv')
+HOLIDAYS = os.path.join(HERE, 'holidays.csv')
+
+
+def write_prices(path, n_dates: int = 150, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'date': pd.bdate_range('2025-01-02', periods=n_dates).strftime('%Y-%m-%d')})
+    for product, level in [('htt', 60.0), ('clbr', 70.0)]:
+        common = np.cumsum(rng.normal(0.0, 0.5, n_dates))
+        for node in range(1, 16):
+            df[f'{product}_A{node:02d}'] = level + common + np.cumsum(rng.normal(0.0, 0.1, n_dates))
+    df.to_csv(path, index=False)
+
+
+def test_import_is_lazy():
+    code = "import sys, risk_engine, risk_engine.cli; print('pandas' in sys.modules or 'numpy' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=HERE, check=True)
+    assert result.stdout.strip() == 'False'
+
+
+def test_cli_matches_notebook(tmp_path):
+    data = str(tmp_path / 'data_.csv')
+    write_prices(data)
+    out = str(tmp_path / 'out')
+    assert main(['run', '--data', data, '--holidays', HOLIDAYS, '--cache-dir', str(tmp_path / 'cache'),
+                 '--summary', SUMMARY, '--positions', POSITIONS, '--out', out, '--paths', '20000']) == 0
+
+    # Notebook Q: per-bucket EWMA loops, block-diagonal Sigma_total
+    engine = RiskEngine(data, HOLIDAYS, str(tmp_path / 'cache'))
+    returns = engine.product_returns['clbr']
+    w_node = pd.Series(0.0, index=[f"A{i:02d}" for i in range(1, 16)])
+    delta_summary_df = pd.read_csv(SUMMARY)
+    for idx, (tenor, position) in enumerate(zip(delta_summary_df['Tenor'][:15], delta_summary_df['CLBR'][:15])):
+        w_node.iloc[idx] = position
+    expected = []
+    for name, nodes in engine.buckets.items():
+        Sigma = ewma_covariance_loop(returns[[f'clbr_{n}' for n in nodes]].values, BUCKET_LAMBDAS[name])
+        w = w_node[nodes].to_numpy()
+        expected.append(1000 * np.sqrt(w @ Sigma @ w))
+
+    bucket_summary = pd.read_csv(os.path.join(out, 'bucket_summary.csv'))
+    np.testing.assert_allclose(bucket_summary['standalone_Q'].iloc[:3], expected, rtol=1e-10)
+    for name in ['factor_detail', 'level_structure', 'top_drivers', 'position_mc', 'mc_by_strategy',
+                 'mc_by_product', 'mc_multi_product', 'mc_by_strategy_multi', 'bucket_mc',
+                 'hedge_recommendations', 'factor_attribution', 'var_parametric', 'var_historical',
+                 'var_marginal_es', 'mc_simulation', 'mc_percentiles', 'stress_scenarios', 'stress_strategies']:
+        assert os.path.exists(os.path.join(out, f'{name}.csv'))
+
+    # Book VaR components add up; node marginal ES ties out to the book ES
+    var_historical = pd.read_csv(os.path.join(out, 'var_historical.csv'))
+    assert np.isclose(var_historical['component_ES'].iloc[:-1].sum(), var_historical['component_ES'].iloc[-1])
+    marginal_es = pd.read_csv(os.path.join(out, 'var_marginal_es.csv'))
+    assert np.isclose(marginal_es['component_ES'].sum(), var_historical['ES'].iloc[-1])
+
+    # Stress P&L file rows follow stress_scenarios; the last column is the book
+    stress_scenarios = pd.read_csv(os.path.join(out, 'stress_scenarios.csv'))
+    stress_pnl = np.load(os.path.join(out, 'stress_pnl.npy'))
+    np.testing.assert_allclose(stress_pnl[:, -1], stress_scenarios['book_pnl'])
+
+    # Single-product MCs of a product sum to its total Q
+    position_mc = pd.read_csv(os.path.join(out, 'position_mc.csv'))
+    assert np.isclose(position_mc.loc[position_mc['Product'] == 'CLBR', 'MC_to_total'].sum(),
+                      bucket_summary['standalone_Q'].iloc[-1])
+
+
+def test_books_share_engine(tmp_path):
+    data = str(tmp_path / 'data_.csv')
+    write_prices(data, seed=1)
+    engine = RiskEngine(data, HOLIDAYS, str(tmp_path / 'cache'))
+    delta_summary_df = pd.read_csv(SUMMARY)
+    delta_positions_df = pd.read_csv(POSITIONS)
+
+    first = engine.position_mc_report(delta_positions_df, delta_summary_df)
+    covariances = dict(engine._multi_covariances)
+    scaled = delta_summary_df.assign(**{c: 2 * delta_summary_df[c] for c in delta_summary_df.columns[1:]})
+    second = engine.position_mc_report(delta_positions_df.assign(Qty=2 * delta_positions_df['Qty']), scaled)
+
+    # Covariances are reused; MCs are homogeneous of degree one in the book
+    assert all(engine._multi_covariances[k] is v for k, v in covariances.items())
+    np.testing.assert_allclose(second['bucket_mc']['MC_to_total'], 2 * first['bucket_mc']['MC_to_total'])
+    np.testing.assert_allclose(second['hedge_recommendations']['risk_reduction'],
+                               first['hedge_recommendations']['risk_reduction'])
+
+
+if __name__ == '__main__':
+    import tempfile
+    from pathlib import Path
+    test_import_is_lazy()
+    print("[PASS] import risk_engine does not load numpy or pandas")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_cli_matches_notebook(Path(tmp))
+    print("[PASS] CLI tables match the notebook loops")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_books_share_engine(Path(tmp))
+    print("[PASS] Several books reuse one engine's covariances")
@@ -0,0 +1,123 @@
+"""
+Verification of the covariance model (operators and cache invalidation, PSD
+repair, one factorization shared by Q, MC, hedging and simulation)
+"""
+
+import numpy as np
+from risk_engine import covariance_model
+from risk_engine.covariance_model import CovarianceModel, as_covariance_model, clear_model_cache
+from risk_engine.hedge_engine import build_hedge_universe, recommend_portfolio_hedge
+from risk_engine.hedge_optimizer import HedgeOptimizer
+from risk_engine.mc_engine import marginal_contributions
+from risk_engine.monte_carlo import MonteCarloSimulator, covariance_factor
+from risk_engine.q_risk import compute_mc_to_total, compute_q_risk
+
+ALL_NODES = [f"A{i:02d}" for i in range(1, 16)]
+FRONT, MID, BACK = ALL_NODES[:4], ALL_NODES[4:8], ALL_NODES[8:]
+PRODUCT_INDICES = {'HTT': (0, 15), 'CLBR': (15, 30)}
+
+
+def random_sigma(seed: int, n: int = 30) -> np.ndarray:
+    A = np.random.default_rng(seed).normal(size=(n, n))
+    return A @ A.T / n
+
+
+def test_operators_and_invalidation():
+    Sigma = random_sigma(0)
+    rng = np.random.default_rng(1)
+    w, W = rng.normal(size=30), rng.normal(size=(5, 30))
+    model = CovarianceModel(Sigma)
+
+    np.testing.assert_allclose(model @ w, Sigma @ w)
+    np.testing.assert_allclose(W @ model, W @ Sigma)
+    np.testing.assert_allclose(model @ W.T, Sigma @ W.T)
+    assert np.isclose(model.quadratic(w), w @ Sigma @ w)
+    assert 'eigh' not in model._cache                              # operators apply Σ without the PSD check
+    assert model.is_psd and model.repaired is model.matrix
+    assert model @ w is model @ w                                  # Σ w cached per vector
+    L, jitter = model.cholesky
+    assert jitter == 0.0 and model.cholesky[0] is L
+    np.testing.assert_allclose(L @ L.T, Sigma)
+
+    # Same content -> same shared model; update() only invalidates on a content change
+    assert as_covariance_model(Sigma.copy()) is as_covariance_model(Sigma)
+    assert not model.update(Sigma.copy()) and model.cholesky[0] is L
+    assert model.update(2 * Sigma)
+    np.testing.assert_allclose(model @ w, 2 * Sigma @ w)
+    np.testing.assert_allclose(model.cholesky[0], np.sqrt(2) * L)
+
+    # Free functions use a raw ndarray as is: no copy, hash or shared model
+    clear_model_cache()
+    compute_q_risk(w, Sigma)
+    compute_mc_to_total(w[:4], w, Sigma, 0, FRONT)
+    marginal_contributions(W, Sigma, w)
+    assert not covariance_model._MODELS
+
+
+def test_psd_repair():
+    Sigma = random_sigma(2)
+    eigenvalues, eigenvectors = np.linalg.eigh(Sigma)
+    eigenvalues[:3] = [-0.5, -0.1, 0.0]
+    indefinite = eigenvectors @ np.diag(eigenvalues) @ eigenvectors.T
+    clipped = eigenvectors @ np.diag(np.maximum(eigenvalues, 0.0)) @ eigenvectors.T
+
+    model = as_covariance_model(indefinite)
+    assert not model.is_psd and np.isclose(model.min_eigenvalue, -0.5)
+    np.testing.assert_allclose(model.repaired, clipped, atol=1e-12)
+    assert np.linalg.eigvalsh(model.repaired).min() > -1e-12
+    G, _ = covariance_factor(indefinite)
+    np.testing.assert_allclose(G @ G.T, clipped, atol=1e-12)
+
+    # A position with w' Σ w = -0.375: a CovarianceModel gives the repaired risk, a raw Σ the clamp to 0
+    w = eigenvectors[:, 0] + np.sqrt(0.125 / eigenvalues[-1]) * eigenvectors[:, -1]
+    fresh = CovarianceModel(indefinite)
+    np.testing.assert_allclose(fresh @ w, indefinite @ w)
+    assert 'eigh' not in fresh._cache
+    assert np.isclose(compute_q_risk(w, fresh), 1000 * np.sqrt(w @ clipped @ w)) and 'eigh' in fresh._cache
+    assert compute_q_risk(w, indefinite) == 0.0
+    raw = CovarianceModel(indefinite, repair=False)
+    assert np.isclose(raw.quadratic(w), -0.375)
+
+
+def test_consumers_share_factorization():
+    Sigma = random_sigma(3)
+    w_total = np.random.default_rng(4).normal(0.0, 50.0, 30)
+    W = np.random.default_rng(5).normal(0.0, 50.0, (6, 30))
+
+    calls = {'eigh': 0, 'cholesky': 0}
+    eigh, cholesky = np.linalg.eigh, np.linalg.cholesky
+
+    def counted(name, fn):
+        def wrapper(*args, **kwargs):
+            calls[name] += 1
+            return fn(*args, **kwargs)
+        return wrapper
+
+    np.linalg.eigh, np.linalg.cholesky = counted('eigh', eigh), counted('cholesky', cholesky)
+    try:
+        q = compute_q_risk(w_total, Sigma)
+        mc = compute_mc_to_total(w_total[:4], w_total, Sigma.copy(), 0, FRONT)
+        result = marginal_contributions(W, Sigma.copy(), w_total)
+        hedges = recommend_portfolio_hedge(Sigma.copy(), w_total, PRODUCT_INDICES, ['HTT', 'CLBR'],
+                                           ALL_NODES, FRONT, MID, BACK)
+        optimizer = HedgeOptimizer(Sigma.copy(), PRODUCT_INDICES, ALL_NODES, ['HTT', 'CLBR'],
+                                   build_hedge_universe(FRONT, MID, BACK))
+        simulator = MonteCarloSimulator(Sigma.copy())
+    finally:
+        np.linalg.eigh, np.linalg.cholesky = eigh, cholesky
+
+    # One eigen-decomposition (PSD check) and one Cholesky, shared by the optimizer and simulator
+    assert calls == {'eigh': 1, 'cholesky': 1}
+    assert optimizer.L is simulator.G is as_covariance_model(Sigma).cholesky[0]
+    assert np.isclose(q, 1000 * np.sqrt(w_total @ Sigma @ w_total))
+    assert np.isclose(mc, 1000 * w_total[:4] @ (Sigma @ w_total)[:4] / np.sqrt(w_total @ Sigma @ w_total))
+    assert np.isclose(result['Total_Q_portfolio'], q) and len(hedges) > 0
+
+
+if __name__ == '__main__':
+    test_operators_and_invalidation()
+    print("[PASS] CovarianceModel operators match Σ; cache keyed on content")
+    test_psd_repair()
+    print("[PASS] Indefinite Σ is repaired by eigenvalue clipping")
+    test_consumers_share_factorization()
+    print("[PASS] Q, MC, hedging and simulation share one factorization")
@@ -0,0 +1,106 @@
+"""
+Verification of incremental DeltaBook updates against the full rebuild
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from delta_book import DeltaBook
+from position_expander import create_delta_summary, expand_position_frame
+
+
+def _trades():
+    return pd.read_csv('pos_summary.csv')
+
+
+def test_fills_match_full_rebuild():
+    """Applying every position as a fill reproduces create_delta_summary."""
+    df_pos = _trades()
+    book = DeltaBook()
+    for row in df_pos.itertuples(index=False):
+        book.add_trade(row.Qty, row.Tenor, row.Product, row.Strategy)
+    
+    expected = create_delta_summary(expand_position_frame(df_pos))
+    result = book.summary_frame()
+    assert list(result.index) == list(expected.index)
+    assert list(result.columns) == list(expected.columns)
+    np.testing.assert_allclose(result.values, expected.values, atol=1e-9)
+
+
+def test_remove_trade_matches_remaining_book():
+    df_pos = _trades()
+    book = DeltaBook.from_positions('pos_summary.csv')
+    removed = df_pos.iloc[::3]
+    for row in removed.itertuples(index=False):
+        book.remove_trade(row.Qty, row.Tenor, row.Product, row.Strategy)
+    
+    remaining = df_pos.drop(removed.index)
+    expected = create_delta_summary(expand_position_frame(remaining))
+    result = book.summary_frame()
+    assert list(result.index) == list(expected.index)
+    assert list(result.columns) == list(expected.columns)
+    np.testing.assert_allclose(result.values, expected.values, atol=1e-9)
+
+
+def test_removed_tenors_drop_out():
+    """Removing every trade in a tenor drops its row; live trades netting to zero keep it."""
+    book = DeltaBook()
+    book.add_trade(10, 'Cal29', 'HTT', 'HTT_Back')
+    book.add_trade(5, 'J6', 'WDF', 'Freight')
+    book.add_trade(-5, 'J6', 'WDF', 'Freight')
+    book.remove_trade(10, 'Cal29', 'HTT', 'HTT_Back')
+
+    trades = pd.DataFrame({'Qty': [5, -5], 'Tenor': ['J6', 'J6'], 'Product': ['WDF', 'WDF'],
+                           'Strategy': ['Freight', 'Freight']})
+    expected = create_delta_summary(expand_position_frame(trades))
+    result = book.summary_frame()
+    assert list(result.index) == list(expected.index) == ['J6']
+    assert list(result.columns) == list(expected.columns)
+    assert (result.values == 0).all()
+
+
+def test_remove_unknown_trade_raises():
+    """Removing legs the book never held raises and leaves the book unchanged."""
+    book = DeltaBook()
+    book.add_trade(10, 'Q2-26', 'HTT', 'HTT_Front')
+    before = book.summary_frame()
+    for qty, tenor, product, strategy in [(10, 'Q3-26', 'HTT', 'HTT_Front'),     # tenors never traded
+                                          (10, 'Q2-26', 'HTT', 'HTT_Back'),      # unknown strategy line
+                                          (10, 'Q2-26', 'WDF', 'HTT_Front'),     # unknown product
+                                          (10, 'J6/Q2-26', 'HTT', 'HTT_Front')]:  # spread hits J6 twice
+        with pytest.raises(ValueError):
+            book.remove_trade(qty, tenor, product, strategy)
+    pd.testing.assert_frame_equal(book.summary_frame(), before)
+
+    book.remove_trade(10, 'Q2-26', 'HTT', 'HTT_Front')
+    assert book.summary_frame().empty
+    with pytest.raises(ValueError):
+        book.remove_trade(10, 'Q2-26', 'HTT', 'HTT_Front')              # already removed
+
+
+def test_strategy_breakdown_and_snapshot():
+    book = DeltaBook.from_positions('pos_summary.csv')
+    expanded = expand_position_frame(_trades())
+    
+    positions = book.positions_frame()
+    net = expanded.groupby(['Product', 'Strategy', 'Tenor'])['Qty'].sum()
+    net = net[net.abs() > 1e-10]
+    got = positions.set_index(['Product', 'Strategy', 'Tenor'])['Qty'].sort_index()
+    np.testing.assert_allclose(got.values, net.sort_index().values, atol=1e-9)
+    
+    vector = book.strategy_vector('Freight', 'WDF')
+    assert vector['J6'] == -65.0 and vector['K6'] == 40.0
+    
+    snap = book.snapshot()
+    book.add_trade(10, 'Cal29', 'HTT', 'HTT_Back')
+    assert 'F9' not in snap.summary_frame().index
+    assert book.summary_frame().loc['F9', 'HTT'] == 10.0
+
+
+if __name__ == '__main__':
+    test_fills_match_full_rebuild()
+    test_remove_trade_matches_remaining_book()
+    test_removed_tenors_drop_out()
+    test_remove_unknown_trade_raises()
+    test_strategy_breakdown_and_snapshot()
+    print("[PASS] DeltaBook checks")
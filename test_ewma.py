@@ -0,0 +1,201 @@
+"""
+Verification of the closed-form EWMA covariance against the day-by-day recursion
+"""
+
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+from risk_engine import ewma
+from risk_engine.ewma import (ewma_covariance, ewma_covariance_loop, ewma_covariance_multi_lambda,
+                  ewma_covariance_multi_lambda_loop, compute_ewma_covariance,
+                  compute_multi_product_ewma_covariance, ewma_covariance_history, ewma_risk_history,
+                  ewma_covariance_multi_decay, ewma_covariance_set, compute_bucket_covariances)
+
+
+def make_returns(n_obs: int = 1000, n_vars: int = 30, nan_rows: int = 25, seed: int = 0) -> np.ndarray:
+    """Correlated synthetic returns with NaN rows in and after the init window."""
+    rng = np.random.default_rng(seed)
+    mixing = rng.normal(0.0, 1.0, (n_vars, n_vars)) / np.sqrt(n_vars)
+    returns = rng.normal(0.0, 0.5, (n_obs, n_vars)) @ mixing
+    nan_idx = rng.choice(n_obs, nan_rows, replace=False)
+    returns[nan_idx, rng.integers(0, n_vars, nan_rows)] = np.nan
+    return returns
+
+
+def assert_matches(result, reference):
+    np.testing.assert_allclose(result, reference, rtol=1e-12, atol=1e-12 * np.abs(reference).max())
+
+
+def test_single_lambda_matches_loop():
+    returns = make_returns()
+    for lambda_val in [0.94, 0.97, 0.99]:
+        assert_matches(ewma_covariance(returns, lambda_val), ewma_covariance_loop(returns, lambda_val))
+
+
+def test_multi_lambda_matches_loop():
+    returns = make_returns(n_vars=45)
+    lambda_vec = np.repeat([0.97, 0.98, 0.99], 15)
+    for lambda_mean in ['arithmetic', 'geometric']:
+        assert_matches(ewma_covariance_multi_lambda(returns, lambda_vec, lambda_mean=lambda_mean),
+                       ewma_covariance_multi_lambda_loop(returns, lambda_vec, lambda_mean=lambda_mean))
+
+
+def test_per_variable_lambdas_stay_quadratic(monkeypatch):
+    # Distinct λ per variable: ~N^2/2 distinct λ_ij, which a Gram cube would hold as O(N^4)
+    n_vars = 150
+    returns = make_returns(n_obs=400, n_vars=n_vars, nan_rows=10, seed=4)
+    lambda_vec = np.random.default_rng(5).uniform(0.95, 0.995, n_vars)
+    tracemalloc.start()
+    try:
+        result = ewma_covariance_multi_lambda(returns, lambda_vec)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert_matches(result, ewma_covariance_multi_lambda_loop(returns, lambda_vec))
+    assert peak < 20 * n_vars ** 2 * 8                             # a few N x N buffers, not a cube
+
+    # Below MAX_GRAM_LAMBDAS: Gram products in small batches, each writing only its own entries
+    monkeypatch.setattr(ewma, 'GRAM_BATCH_ELEMENTS', 1)
+    lambda_vec = np.repeat([0.94, 0.96, 0.97, 0.98, 0.99, 0.995], 5)
+    returns = make_returns(n_vars=30, seed=6)
+    assert_matches(ewma_covariance_multi_lambda(returns, lambda_vec),
+                   ewma_covariance_multi_lambda_loop(returns, lambda_vec))
+
+
+def test_init_fallback_and_short_history():
+    """Fewer than 10 clean rows in the init window -> scaled identity start."""
+    returns = make_returns(n_obs=200, n_vars=5, nan_rows=0)
+    returns[:55, 0] = np.nan
+    assert_matches(ewma_covariance(returns, 0.97), ewma_covariance_loop(returns, 0.97))
+    
+    # No update rows: the result is the initial covariance
+    assert_matches(ewma_covariance(returns[55:115], 0.97), np.cov(returns[55:115].T))
+    with pytest.raises(ValueError):
+        ewma_covariance(returns[:30], 0.97)
+
+
+def test_notebook_wrappers():
+    nodes = [f'A{i:02d}' for i in range(1, 16)]
+    returns = make_returns(n_obs=300, n_vars=30, seed=1)
+    returns_df = pd.DataFrame(returns, columns=[f'{p}_{n}' for p in ['htt', 'clbr'] for n in nodes])
+    
+    cov_htt = compute_ewma_covariance(returns_df, nodes, 'htt', 0.97)
+    assert_matches(cov_htt, ewma_covariance_loop(returns[:, :15], 0.97))
+    
+    Sigma_multi, lambda_vec = compute_multi_product_ewma_covariance(
+        returns_df, 2, nodes, nodes[:4], nodes[4:8], nodes[8:], 0.97, 0.98, 0.99)
+    assert list(lambda_vec[:15]) == [0.97] * 4 + [0.98] * 4 + [0.99] * 7
+    assert_matches(Sigma_multi, ewma_covariance_multi_lambda_loop(returns, lambda_vec))
+
+
+def test_multi_decay_single_pass():
+    returns = make_returns(n_vars=15, seed=5)
+    lambdas = [0.97, 0.98, 0.985, 0.99]
+    cube = ewma_covariance_multi_decay(returns, lambdas)
+    for layer, lambda_val in zip(cube, lambdas):
+        assert_matches(layer, ewma_covariance_loop(returns, lambda_val))
+
+
+def test_bucket_and_multi_product_slices():
+    """Bucket, cross and multi-product matrices from one call equal separate scans."""
+    nodes = [f'A{i:02d}' for i in range(1, 16)]
+    front, mid, back = nodes[:4], nodes[4:8], nodes[8:]
+    returns = make_returns(n_obs=500, n_vars=30, nan_rows=0, seed=6)
+    returns[[100, 250], :] = np.nan
+    returns[[300, 310, 320], 12] = np.nan      # back-only NaN rows -> separate group
+    returns_df = pd.DataFrame(returns, columns=[f'{p}_{n}' for p in ['htt', 'clbr'] for n in nodes])
+    
+    buckets = {'Front': front, 'Mid': mid, 'Back': back}
+    lambdas = {'Front': 0.97, 'Mid': 0.98, 'Back': 0.99}
+    bucket_covs, Sigma_total = compute_bucket_covariances(returns_df, 'htt', buckets, lambdas)
+    for name, bucket_nodes in buckets.items():
+        assert_matches(bucket_covs[name], compute_ewma_covariance(returns_df, bucket_nodes, 'htt', lambdas[name]))
+    assert_matches(Sigma_total[4:8, 4:8], bucket_covs['Mid'])
+    assert (Sigma_total[:4, 4:] == 0).all()
+    
+    bucket_covs, Sigma_total = compute_bucket_covariances(returns_df, 'htt', buckets, lambdas, lambda_cross=0.985)
+    cross = compute_ewma_covariance(returns_df, nodes, 'htt', 0.985)
+    assert_matches(Sigma_total[:4, 8:], cross[:4, 8:])
+    assert_matches(Sigma_total[8:, 8:], bucket_covs['Back'])
+    
+    lambda_vec = np.tile([0.97] * 4 + [0.98] * 4 + [0.99] * 7, 2)
+    covs = ewma_covariance_set(returns_df, {
+        'multi': (list(returns_df.columns), lambda_vec),
+        'clbr_front': ([f'clbr_{n}' for n in front], 0.97),
+    })
+    assert_matches(covs['multi'], ewma_covariance_multi_lambda_loop(returns, lambda_vec))
+    assert_matches(covs['clbr_front'], compute_ewma_covariance(returns_df, front, 'clbr', 0.97))
+
+
+def test_set_with_init_fallback():
+    """Specs with fewer than 10 initialization rows keep the identity fallback of their own columns."""
+    nodes = [f'A{i:02d}' for i in range(1, 16)]
+    returns = make_returns(n_obs=300, n_vars=15, nan_rows=0, seed=7) * np.linspace(0.5, 3.0, 15)
+    returns_df = pd.DataFrame(returns, columns=[f'htt_{n}' for n in nodes])
+    lambda_vec = np.repeat([0.97, 0.99], 4)
+
+    specs = {'Front': ([f'htt_{n}' for n in nodes[:4]], 0.97), 'Back': ([f'htt_{n}' for n in nodes[8:]], 0.99),
+             'Mixed': ([f'htt_{n}' for n in nodes[2:10]], lambda_vec)}
+    covs = ewma_covariance_set(returns_df, specs, init_obs=8)
+    assert_matches(covs['Front'], compute_ewma_covariance(returns_df, nodes[:4], 'htt', 0.97, init_obs=8))
+    assert_matches(covs['Back'], compute_ewma_covariance(returns_df, nodes[8:], 'htt', 0.99, init_obs=8))
+    assert_matches(covs['Mixed'], ewma_covariance_multi_lambda_loop(returns[:, 2:10], lambda_vec, init_obs=8))
+
+
+def test_covariance_history(tmp_path):
+    """Each slice of the cube equals the terminal covariance of the truncated history."""
+    returns = make_returns(n_obs=250, n_vars=12, nan_rows=10, seed=2)
+    lambda_vec = np.repeat([0.97, 0.99], 6)
+    out_file = str(tmp_path / 'sigma_history.npy')
+    cube = ewma_covariance_history(returns, lambda_vec, out_file=out_file)
+    
+    assert cube.shape == (250, 12, 12) and np.isnan(cube[:59]).all()
+    for t in [59, 60, 137, 249]:
+        assert_matches(cube[t], ewma_covariance_multi_lambda(returns[:t + 1], lambda_vec))
+    np.testing.assert_array_equal(np.load(out_file, mmap_mode='r'), cube)
+    
+    cube32 = ewma_covariance_history(returns, 0.97, dtype=np.float32)
+    assert cube32.dtype == np.float32
+    np.testing.assert_allclose(cube32[-1], ewma_covariance(returns, 0.97), rtol=1e-5)
+
+
+def test_risk_history():
+    returns = make_returns(n_obs=200, n_vars=15, nan_rows=5, seed=3)
+    cube = ewma_covariance_history(returns, 0.97)
+    rng = np.random.default_rng(4)
+    W = rng.normal(0.0, 100.0, (3, 15))
+    dates = pd.bdate_range('2022-01-03', periods=200)
+    
+    q_df, mc_df = ewma_risk_history(cube, W, index=dates, names=['a', 'b', 'c'], chunk_size=37)
+    assert q_df.shape == (200, 3) and q_df.iloc[:59].isna().all().all()
+    
+    w_total = W.sum(axis=0)
+    for t in [59, 120, 199]:
+        Sigma = cube[t]
+        for k, name in enumerate(['a', 'b', 'c']):
+            assert np.isclose(q_df[name].iloc[t], 1000 * np.sqrt(W[k] @ Sigma @ W[k]), rtol=1e-12)
+            expected_mc = 1000 * (W[k] @ Sigma @ w_total) / np.sqrt(w_total @ Sigma @ w_total)
+            assert np.isclose(mc_df[name].iloc[t], expected_mc, rtol=1e-12)
+    # MC of the books sums to the Q of the total
+    total_q = 1000 * np.sqrt(w_total @ cube[199] @ w_total)
+    assert np.isclose(mc_df.iloc[199].sum(), total_q, rtol=1e-12)
+
+
+if __name__ == '__main__':
+    import pathlib
+    import tempfile
+    test_single_lambda_matches_loop()
+    test_multi_lambda_matches_loop()
+    with pytest.MonkeyPatch.context() as mp:
+        test_per_variable_lambdas_stay_quadratic(mp)
+    test_init_fallback_and_short_history()
+    test_notebook_wrappers()
+    test_multi_decay_single_pass()
+    test_bucket_and_multi_product_slices()
+    test_set_with_init_fallback()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_covariance_history(pathlib.Path(tmp))
+    test_risk_history()
+    print("[PASS] Closed-form EWMA matches the recursion")
@@ -0,0 +1,80 @@
+"""
+Verification of the persistent EWMA state store (incremental vs full replay)
+"""
+
+import datetime
+import json
+
+import numpy as np
+import pandas as pd
+from risk_engine.ewma import ewma_covariance, ewma_covariance_multi_lambda
+from risk_engine.ewma_state import EWMAStateStore
+
+
+def make_returns_df(n_obs: int = 400, n_vars: int = 15, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0, 0.5, (n_obs, n_vars))
+    returns[rng.choice(n_obs, 8, replace=False), 3] = np.nan
+    dates = pd.bdate_range('2022-01-03', periods=n_obs)
+    return pd.DataFrame(returns, index=dates, columns=[f'clbr_A{i:02d}' for i in range(1, n_vars + 1)])
+
+
+def test_incremental_matches_full(tmp_path):
+    returns_df = make_returns_df()
+    store = EWMAStateStore(str(tmp_path))
+    
+    state = store.update(returns_df.iloc[:300], 0.97)
+    assert state.rebuilt
+    for end in [301, 350, 400]:
+        state = store.update(returns_df.iloc[:end], 0.97)
+        assert not state.rebuilt
+    
+    assert state.last_date == returns_df.index[-1] and state.n_rows == 400
+    np.testing.assert_allclose(state.sigma, ewma_covariance(returns_df.to_numpy(), 0.97), rtol=1e-12)
+    
+    # Reloaded from disk (memory-mapped) with nothing new to apply
+    reloaded = EWMAStateStore(str(tmp_path)).update(returns_df, 0.97)
+    assert isinstance(reloaded.sigma, np.memmap)
+    np.testing.assert_array_equal(reloaded.sigma, state.sigma)
+
+
+def test_lambda_vector_state(tmp_path):
+    returns_df = make_returns_df()
+    lambda_vec = np.repeat([0.97, 0.98, 0.99], 5)
+    store = EWMAStateStore(str(tmp_path))
+    store.update(returns_df.iloc[:250], lambda_vec)
+    state = store.update(returns_df, lambda_vec)
+    assert not state.rebuilt
+    np.testing.assert_allclose(state.sigma, ewma_covariance_multi_lambda(returns_df.to_numpy(), lambda_vec),
+                               rtol=1e-12)
+
+
+def test_rebuild_on_holiday_or_corruption(tmp_path):
+    returns_df = make_returns_df()
+    store = EWMAStateStore(str(tmp_path))
+    store.update(returns_df.iloc[:300], 0.97, holidays={datetime.date(2022, 1, 17)})
+    
+    # Same holidays given as strings -> same hash, incremental
+    assert not store.update(returns_df.iloc[:310], 0.97, holidays=['2022-01-17']).rebuilt
+    # Holiday set changed -> full rebuild
+    assert store.update(returns_df.iloc[:320], 0.97, holidays=['2022-01-17', '2022-02-21']).rebuilt
+    
+    # Metadata no longer matching the stored matrix -> full rebuild
+    meta_file = next(tmp_path.glob('*.json'))
+    meta = json.loads(meta_file.read_text())
+    meta['sigma_checksum'] = 'stale'
+    meta_file.write_text(json.dumps(meta))
+    assert store.update(returns_df, 0.97, holidays=['2022-01-17', '2022-02-21']).rebuilt
+    
+    # Different lambda -> separate state file
+    store.update(returns_df, 0.99)
+    assert len(list(tmp_path.glob('*.npy'))) == 2
+
+
+if __name__ == '__main__':
+    import pathlib
+    import tempfile
+    for test in [test_incremental_matches_full, test_lambda_vector_state, test_rebuild_on_holiday_or_corruption]:
+        with tempfile.TemporaryDirectory() as tmp:
+            test(pathlib.Path(tmp))
+    print("[PASS] EWMA state store")
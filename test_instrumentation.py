@@ -0,0 +1,107 @@
+"""
+Verification of the stage instrumentation (no-op when disabled, nested spans
+with counts and memory in the run manifest, cProfile dumps, CLI manifest)
+"""
+
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from position_expander import expand_position_frame
+from risk_engine import instrumentation
+from risk_engine.ewma import ewma_covariance, ewma_covariance_loop
+from risk_engine.instrumentation import instrumented, record_run, span
+from test_cli import HOLIDAYS, POSITIONS, SUMMARY, write_prices
+
+
+@instrumented('outer', lambda n: {'n': n})
+def allocate(n: int) -> np.ndarray:
+    with span('inner', rows=n) as s:
+        block = np.ones((n, 1000))
+        s.count(columns=block.shape[1])
+    return block.sum(axis=1)
+
+
+def test_disabled_is_passthrough():
+    assert instrumentation._RECORDER is None
+    assert span('anything', rows=1) is span('other')                 # shared no-op
+    with span('anything') as s:
+        s.count(rows=2)
+    returns = np.random.default_rng(0).normal(size=(200, 5))
+    np.testing.assert_allclose(ewma_covariance(returns, 0.97), ewma_covariance_loop(returns, 0.97))
+    assert ewma_covariance.__name__ == 'ewma_covariance' and 'lambda_val' in ewma_covariance.__doc__
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def test_manifest_spans(tmp_path):
+    manifest_file = str(tmp_path / 'run' / 'manifest.json')
+    df_pos = pd.read_csv(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pos_summary.csv'))
+    logger, handler = logging.getLogger('risk_engine'), ListHandler()
+    level = logger.level
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    try:
+        with pytest.raises(ValueError):
+            with record_run(manifest_file, profile_dir=str(tmp_path / 'prof'), trace_memory=True):
+                allocate(2_000)
+                expand_position_frame(df_pos)
+                with span('failing'):
+                    raise ValueError("stage failed")
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(level)
+    assert instrumentation._RECORDER is None
+
+    manifest = json.load(open(manifest_file))
+    spans = {record['path']: record for record in manifest['spans']}
+    assert [r['path'] for r in manifest['spans']][:2] == ['outer/inner', 'outer']
+    inner, outer = spans['outer/inner'], spans['outer']
+    assert inner['counts'] == {'rows': 2_000, 'columns': 1000} and outer['counts'] == {'n': 2_000}
+    assert inner['depth'] == 1 and outer['wall_s'] >= inner['wall_s'] > 0
+    assert inner['traced_peak_mb'] > 2_000 * 1000 * 8 / 2 ** 20                # the 16 MB block
+    assert outer['traced_peak_mb'] >= inner['traced_peak_mb']                   # child peak survives the reset
+    assert spans['expansion']['counts'] == {'rows': len(df_pos), 'columns': 4}
+    assert spans['failing']['error'] == 'ValueError'
+    assert manifest['totals']['inner']['calls'] == 1
+
+    # One profile per outermost span; nested spans are inside their parent's dump
+    assert outer['profile'] and os.path.exists(outer['profile']) and inner['profile'] is None
+    assert any(message.startswith('outer/inner:') for message in handler.messages)
+
+
+def test_cli_manifest(tmp_path):
+    from risk_engine.cli import main
+    data = str(tmp_path / 'data_.csv')
+    write_prices(data)
+    manifest_file = str(tmp_path / 'manifest.json')
+    assert main(['run', '--data', data, '--holidays', HOLIDAYS, '--cache-dir', str(tmp_path / 'cache'),
+                 '--summary', SUMMARY, '--positions', POSITIONS, '--out', str(tmp_path / 'out'),
+                 '--report', 'position_mc', '--manifest', manifest_file, '-q']) == 0
+    totals = json.load(open(manifest_file))['totals']
+    for name in ['book_load', 'data_load', 'holiday_filter', 'returns_build', 'ewma_multi_lambda',
+                 'position_mc', 'multi_product_mc', 'factor_attribution', 'hedge_search', 'write_tables']:
+        assert totals[name]['calls'] >= 1, name
+
+
+if __name__ == '__main__':
+    import tempfile
+    from pathlib import Path
+    test_disabled_is_passthrough()
+    print("[PASS] Disabled instrumentation is a pass-through")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_manifest_spans(Path(tmp))
+    print("[PASS] Nested spans record time, memory, counts, errors and profiles")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_cli_manifest(Path(tmp))
+    print("[PASS] CLI --manifest covers every stage")
@@ -0,0 +1,97 @@
+"""
+Verification of the binary market-data cache against direct CSV parsing
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+from risk_engine.market_data import MarketDataStore
+
+
+def write_prices(path, seed: int = 0, n_dates: int = 40):
+    """Wide price file: unsorted dates, unpadded node numbers, a spread column."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2024-01-02', periods=n_dates)[rng.permutation(n_dates)]
+    df = pd.DataFrame({'date': dates.strftime('%Y-%m-%d')})
+    for node in [2, 10, 1]:
+        df[f'htt_A{node}'] = rng.normal(60.0, 1.0, n_dates)
+    for node in range(1, 16):
+        df[f'clbr_A{node:02d}'] = rng.normal(70.0, 1.0, n_dates)
+    df['clbr_A01/clbr_A02'] = 0.0
+    df.to_csv(path, index=False)
+
+
+def notebook_prices(path, product):
+    """Column selection and ordering as done in the notebooks."""
+    df_raw = pd.read_csv(path)
+    df_raw['date'] = pd.to_datetime(df_raw['date'])
+    df_raw = df_raw.set_index('date').sort_index()
+    product_cols = [col for col in df_raw.columns if col.startswith(f'{product}_A') and '/' not in col]
+    product_cols = sorted(product_cols, key=lambda x: int(x.split('_A')[1]))
+    return df_raw[product_cols]
+
+
+def test_store_matches_csv(tmp_path):
+    source = str(tmp_path / 'data_.csv')
+    write_prices(source)
+    store = MarketDataStore(source, str(tmp_path / 'cache'))
+    assert store.rebuilt and store.products == ['htt', 'clbr']
+    assert store.nodes['htt'] == [1, 2, 10]
+    
+    for product in store.products:
+        pd.testing.assert_frame_equal(store.frame(product), notebook_prices(source, product), check_freq=False, check_index_type=False)
+    
+    # Zero-copy: the node matrix is a view of the memory map
+    matrix = store.node_matrix('htt')
+    assert isinstance(matrix.base, np.memmap) or isinstance(matrix, np.memmap)
+    assert not matrix.flags.writeable
+
+
+def test_invalidation(tmp_path):
+    source = str(tmp_path / 'data_.csv')
+    cache_dir = str(tmp_path / 'cache')
+    write_prices(source)
+    MarketDataStore(source, cache_dir)
+    assert not MarketDataStore(source, cache_dir).rebuilt
+    
+    # Touched but unchanged -> content hash matches, cache reused
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert not MarketDataStore(source, cache_dir).rebuilt
+    
+    # Content changed -> rebuilt with the new prices
+    write_prices(source, seed=1)
+    store = MarketDataStore(source, cache_dir)
+    assert store.rebuilt
+    pd.testing.assert_frame_equal(store.frame('clbr'), notebook_prices(source, 'clbr'), check_freq=False, check_index_type=False)
+
+
+def test_damaged_cache_rebuilt(tmp_path):
+    source = str(tmp_path / 'data_.csv')
+    cache_dir = str(tmp_path / 'cache')
+    write_prices(source)
+    store = MarketDataStore(source, cache_dir)
+    values_file = os.path.join(store.cache_path, 'values.npy')
+    dates_file = os.path.join(store.cache_path, 'dates.npy')
+    del store
+
+    # Truncated values, then a deleted date axis: meta.json alone does not make the cache valid
+    with open(values_file, 'r+b') as f:
+        f.truncate(os.path.getsize(values_file) // 2)
+    store = MarketDataStore(source, cache_dir)
+    assert store.rebuilt
+    del store
+    os.remove(dates_file)
+    store = MarketDataStore(source, cache_dir)
+    assert store.rebuilt and os.path.exists(dates_file)
+    pd.testing.assert_frame_equal(store.frame('htt'), notebook_prices(source, 'htt'), check_freq=False, check_index_type=False)
+
+
+if __name__ == '__main__':
+    import pathlib
+    import tempfile
+    for test in [test_store_matches_csv, test_invalidation, test_damaged_cache_rebuilt]:
+        with tempfile.TemporaryDirectory() as tmp:
+            test(pathlib.Path(tmp))
+    print("[PASS] Market data cache matches CSV parsing")
@@ -0,0 +1,58 @@
+"""
+Verification of NodeMap against the notebook contract_to_node lookups
+"""
+
+import datetime
+
+import numpy as np
+import pandas as pd
+from risk_engine.mc_engine import build_contract_to_node
+from risk_engine.node_map import NodeMap, front_ordinals
+
+ALL_NODES = [f"A{i:02d}" for i in range(1, 16)]
+
+
+def test_matches_contract_to_node():
+    delta_positions_df = pd.read_csv('delta_positions.csv')
+    delta_summary_df = pd.read_csv('delta_summary.csv')
+    contract_to_node = build_contract_to_node(delta_summary_df)
+    node_map = NodeMap.from_delta_summary(delta_summary_df)
+
+    assert node_map.contract_to_node == contract_to_node
+    tenors = delta_positions_df['Tenor'].to_numpy()
+    expected = [ALL_NODES.index(contract_to_node[t]) if t in contract_to_node else -1 for t in tenors]
+    np.testing.assert_array_equal(node_map.node_index(tenors), expected)
+    # Wrapping the legacy dict gives the same lookup
+    np.testing.assert_array_equal(NodeMap.from_contract_to_node(contract_to_node, ALL_NODES).node_index(tenors),
+                                  expected)
+
+    # One scatter == per-row loop
+    product = delta_positions_df['Mapped_Product'].iloc[0]
+    strategy = delta_positions_df['Strategy'].iloc[0]
+    positions = delta_positions_df[(delta_positions_df['Strategy'] == strategy) &
+                                   (delta_positions_df['Mapped_Product'] == product)]
+    w_loop = np.zeros(15)
+    for _, row in positions.iterrows():
+        if row['Tenor'] in contract_to_node:
+            w_loop[ALL_NODES.index(contract_to_node[row['Tenor']])] += row['Qty']
+    np.testing.assert_allclose(node_map.strategy_vector(delta_positions_df, strategy, product), w_loop)
+
+
+def test_roll_shifts_nodes():
+    node_map = NodeMap.for_date(datetime.date(2026, 2, 10))
+    assert node_map.tenors[:3] == ['H6', 'J6', 'K6']
+    # After the roll day H6 has expired: J6 becomes A01 and A15 moves out by one month
+    rolled = node_map.rolled(datetime.date(2026, 2, 25))
+    assert rolled.tenors[0] == 'J6' and rolled.tenors[-1] == 'M7'
+    np.testing.assert_array_equal(rolled.node_index(['H6', 'J6', 'M7', 'Z6/Z7', 'Cal27']), [-1, 0, 14, -1, -1])
+    np.testing.assert_array_equal(front_ordinals(pd.to_datetime(['2026-02-10', '2026-02-25', '2026-12-31'])),
+                                  [2026 * 12 + 2, 2026 * 12 + 3, 2027 * 12 + 1])
+    np.testing.assert_allclose(rolled.position_vector(['J6', 'J6', 'H6', 'M6'], [1.0, 2.0, 5.0, -1.0])[:3],
+                               [3.0, 0.0, -1.0])
+
+
+if __name__ == '__main__':
+    test_matches_contract_to_node()
+    print("[PASS] NodeMap matches contract_to_node lookups and loop vectors")
+    test_roll_shifts_nodes()
+    print("[PASS] NodeMap rolls A01..A15 past expired contracts")
@@ -0,0 +1,90 @@
+"""
+Verification of the vectorized returns builder against the notebook holiday filtering
+"""
+
+import numpy as np
+import pandas as pd
+from risk_engine.market_data import MarketDataStore
+from risk_engine.returns_builder import (load_holidays, holiday_mask, build_product_returns, build_combined_returns)
+
+
+def make_prices(seed: int = 0) -> pd.DataFrame:
+    """Calendar-day prices over 2022-2023 (holidays included), with gaps."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2022-01-01', '2023-12-31', freq='D', name='date')
+    df = pd.DataFrame(index=dates)
+    for product, n_nodes in [('htt', 15), ('clbr', 15), ('lh', 4)]:
+        for node in range(1, n_nodes + 1):
+            df[f'{product}_A{node:02d}'] = 70.0 + rng.normal(0.0, 1.0, len(dates)).cumsum()
+    df.iloc[rng.choice(len(dates), 20, replace=False), 3] = np.nan       # htt gaps
+    df.iloc[rng.choice(len(dates), 10, replace=False), 20] = np.nan      # clbr gaps
+    return df
+
+
+def notebook_returns(df_raw, product, holiday_dates):
+    """Per-product returns exactly as built in the notebooks."""
+    product_cols = [col for col in df_raw.columns if col.startswith(f'{product}_A') and '/' not in col]
+    product_cols = sorted(product_cols, key=lambda x: int(x.split('_A')[1]))
+    df_returns = df_raw[product_cols].copy().diff().dropna()
+    is_holiday = [date.date() in holiday_dates for date in df_returns.index]
+    return df_returns[~pd.Series(is_holiday, index=df_returns.index)]
+
+
+def test_load_holidays():
+    holidays = load_holidays('holidays.csv')
+    assert holidays.dtype == np.dtype('datetime64[D]') and (np.diff(holidays) > np.timedelta64(0, 'D')).all()
+    assert np.datetime64('2022-01-17') in holidays
+    mask = holiday_mask(pd.DatetimeIndex(['2022-01-17 00:00', '2022-01-18', '2022-12-26']), holidays)
+    assert list(mask) == [True, False, True]
+
+
+def test_matches_notebook():
+    df_raw = make_prices()
+    holidays = load_holidays('holidays.csv')
+    holiday_dates = set(pd.DatetimeIndex(holidays).date)
+    product_returns = build_product_returns(df_raw, {'CME': holidays})
+    
+    for product in ['htt', 'clbr', 'lh']:
+        pd.testing.assert_frame_equal(product_returns[product], notebook_returns(df_raw, product, holiday_dates),
+                                      check_freq=False)
+    
+    combined_df, product_indices = build_combined_returns(product_returns, ['htt', 'clbr'])
+    common = product_returns['htt'].index.intersection(product_returns['clbr'].index)
+    assert combined_df.index.equals(common) and product_indices == {'htt': (0, 15), 'clbr': (15, 30)}
+    np.testing.assert_array_equal(combined_df['clbr_A07'], product_returns['clbr'].loc[common, 'clbr_A07'])
+
+
+def test_store_input_and_exchanges(tmp_path):
+    df_raw = make_prices(seed=1)
+    source = str(tmp_path / 'data_.csv')
+    df_raw.reset_index().to_csv(source, index=False)
+    store = MarketDataStore(source, str(tmp_path / 'cache'))
+    
+    cme = load_holidays('holidays.csv')
+    ice = np.array(['2022-12-26', '2023-01-02'], dtype='datetime64[D]')
+    calendars = {'CME': cme, 'ICE': ice}
+    product_returns = build_product_returns(store, calendars, product_exchange={'clbr': 'ICE'})
+    from_frame = build_product_returns(df_raw, calendars, product_exchange={'clbr': 'ICE'})
+    for product in ['htt', 'clbr', 'lh']:
+        pd.testing.assert_frame_equal(product_returns[product], from_frame[product],
+                                      check_freq=False, check_index_type=False)
+    
+    # ICE product keeps CME-only holidays (MLK day), drops its own
+    assert pd.Timestamp('2022-01-17') in product_returns['clbr'].index
+    assert pd.Timestamp('2022-01-17') not in product_returns['htt'].index
+    assert pd.Timestamp('2022-12-26') not in product_returns['clbr'].index
+    
+    # skip_days: the return after a holiday spans it
+    skipped = build_product_returns(df_raw, calendars, holiday_mode='skip_days')['lh']
+    expected = df_raw.loc['2022-01-18', 'lh_A01'] - df_raw.loc['2022-01-16', 'lh_A01']
+    assert np.isclose(skipped.loc['2022-01-18', 'lh_A01'], expected)
+
+
+if __name__ == '__main__':
+    import pathlib
+    import tempfile
+    test_load_holidays()
+    test_matches_notebook()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_store_input_and_exchanges(pathlib.Path(tmp))
+    print("[PASS] Returns builder matches the notebook filtering")
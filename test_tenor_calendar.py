@@ -0,0 +1,82 @@
+"""
+Verification of tenor calendar resolution for arbitrary years
+"""
+
+import pandas as pd
+from position_expander import (build_tenor_mappings, expand_positions, expand_spread,
+                               create_delta_summary, parse_tenor_type)
+from tenor_calendar import (ONE_DIGIT_YEAR_START, expand_tenor_codes, month_ordinal, ordinal_to_code, tenor_months,
+                            tenor_ordinal, UNKNOWN_ORDINAL)
+
+
+def test_legacy_maps_unchanged():
+    """The 2026-2028 maps keep their calendar-based contents."""
+    quarterly_map, half_year_map, calendar_map = build_tenor_mappings()
+    assert quarterly_map['Q2-26'] == ['J6', 'K6', 'M6']
+    assert half_year_map['H2-27'] == ['N7', 'Q7', 'U7', 'V7', 'X7', 'Z7']
+    assert calendar_map['Cal28'] == [f'{m}8' for m in 'FGHJKMNQUVXZ']
+    assert len(quarterly_map) == 12 and len(half_year_map) == 6 and len(calendar_map) == 3
+
+
+def test_any_year_expands():
+    """Years outside 2026-2028 no longer fall back to an unexpanded string."""
+    assert expand_tenor_codes('Cal29') == tuple(f'{m}9' for m in 'FGHJKMNQUVXZ')
+    assert expand_tenor_codes('Cal2031') == tuple(f'{m}1' for m in 'FGHJKMNQUVXZ')
+    assert expand_tenor_codes('Q4-2030') == ('V0', 'X0', 'Z0')
+    assert expand_tenor_codes('H1-25') == ('F5', 'G5', 'H5', 'J5', 'K5', 'M5')
+
+
+def test_seasons_and_strips():
+    assert parse_tenor_type('Sum26') == 'season'
+    assert parse_tenor_type('F7-H7') == 'strip'
+    assert parse_tenor_type('H1-26') == 'half'
+    assert expand_tenor_codes('Sum26') == ('J6', 'K6', 'M6', 'N6', 'Q6', 'U6', 'V6')
+    assert expand_tenor_codes('Win26') == ('X6', 'Z6', 'F7', 'G7', 'H7')
+    assert expand_tenor_codes('F7-H7') == ('F7', 'G7', 'H7')
+    assert expand_tenor_codes('Z9-G0') == ('Z9', 'F0', 'G0')
+
+
+def test_month_ordinals():
+    assert list(tenor_months('Q1-26')) == [2026 * 12, 2026 * 12 + 1, 2026 * 12 + 2]
+    assert tenor_ordinal('F0') > tenor_ordinal('Z9')
+    assert tenor_ordinal('bogus') == UNKNOWN_ORDINAL
+    assert expand_tenor_codes('bogus') == ('bogus',)
+
+
+def test_codes_round_trip_outside_one_digit_window():
+    """Years outside the one-digit window get two- or four-digit codes instead of wrapping."""
+    first, last = ONE_DIGIT_YEAR_START, ONE_DIGIT_YEAR_START + 9
+    for year in [1999, 2000, first - 1, first, last, last + 1, 2099, 2100]:
+        for month_idx in range(12):
+            ordinal = month_ordinal(year, month_idx)
+            assert tenor_ordinal(ordinal_to_code(ordinal)) == ordinal, (year, month_idx)
+    assert ordinal_to_code(month_ordinal(first, 0)) == 'F5' and ordinal_to_code(month_ordinal(last, 11)) == 'Z4'
+    assert expand_tenor_codes('Cal2035') == tuple(f'{m}35' for m in 'FGHJKMNQUVXZ')
+    assert expand_tenor_codes('Q4-2024') == ('V24', 'X24', 'Z24')
+    assert expand_tenor_codes('Win34') == ('X4', 'Z4', 'F35', 'G35', 'H35')
+    assert tenor_ordinal('Z24') < tenor_ordinal('F5') < tenor_ordinal('Z4') < tenor_ordinal('F35')
+
+
+def test_spread_with_new_tenor_types():
+    """Spread division rules apply to seasons and strips like any other multi-month leg."""
+    result = expand_spread('F7-H7/Cal29', 120)
+    assert [q for q, _ in result[:3]] == [120, 120, 120]
+    assert all(q == -10.0 for q, _ in result[3:]) and len(result) == 15
+
+
+def test_summary_order_unchanged():
+    """Integer sorting keeps delta_summary.csv in its committed order."""
+    expected = pd.read_csv('delta_summary.csv', index_col='Tenor')
+    summary = create_delta_summary(expand_positions('pos_summary.csv'))
+    assert list(summary.index) == list(expected.index)
+
+
+if __name__ == '__main__':
+    test_legacy_maps_unchanged()
+    test_any_year_expands()
+    test_seasons_and_strips()
+    test_month_ordinals()
+    test_codes_round_trip_outside_one_digit_window()
+    test_spread_with_new_tenor_types()
+    test_summary_order_unchanged()
+    print("[PASS] tenor calendar checks")
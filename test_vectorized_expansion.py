@@ -0,0 +1,90 @@
+"""
+Verification of the columnar expansion against the row-by-row reference
+"""
+
+import numpy as np
+import pandas as pd
+from position_expander import (create_delta_summary, expand_positions, expand_position_frame,
+                               expand_positions_encoded, expand_positions_rowwise, decode_positions,
+                               iter_summary_chunks, load_product_mapping, build_product_mapping,
+                               strategy_tenor_cube, stream_expand_positions)
+
+
+def test_matches_delta_positions_csv():
+    """expand_positions reproduces the committed delta_positions.csv exactly."""
+    expected = pd.read_csv('delta_positions.csv')
+    result = expand_positions('pos_summary.csv')
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_matches_rowwise_reference():
+    """Columnar and row-by-row expansion agree bit-for-bit on a shuffled, scaled book."""
+    df_pos = pd.read_csv('pos_summary.csv')
+    rng = np.random.default_rng(7)
+    book = df_pos.sample(n=500, replace=True, random_state=7).reset_index(drop=True)
+    book['Qty'] = book['Qty'] * rng.uniform(-3.0, 3.0, len(book))
+    
+    result = expand_position_frame(book)
+    expected = expand_positions_rowwise(book)
+    pd.testing.assert_frame_equal(result, expected, check_exact=True)
+
+
+def test_empty_book():
+    """An empty position file expands to an empty frame with the standard columns."""
+    empty = pd.DataFrame({'Qty': [], 'Tenor': [], 'Product': [], 'Strategy': []})
+    result = expand_position_frame(empty)
+    assert list(result.columns) == ['Qty', 'Tenor', 'Product', 'Mapped_Product', 'Strategy']
+    assert len(result) == 0
+
+
+def test_streaming_matches_full_expansion(tmp_path):
+    """Chunked expansion writes the same rows and folds to the same summary."""
+    output_file = tmp_path / 'delta_positions_stream.csv'
+    summary = stream_expand_positions('pos_summary.csv', str(output_file), chunksize=4)
+    
+    pd.testing.assert_frame_equal(pd.read_csv(output_file), pd.read_csv('delta_positions.csv'))
+    expected = create_delta_summary(expand_positions('pos_summary.csv'))
+    pd.testing.assert_frame_equal(summary, expected, check_exact=False, atol=1e-9)
+    
+    partials = list(iter_summary_chunks('pos_summary.csv', chunksize=6))
+    assert len(partials) == 4
+    folded = partials[0]
+    for part in partials[1:]:
+        folded = folded.add(part, fill_value=0)
+    assert abs(folded.sum() - expected.values.sum()) < 1e-9
+
+
+def test_encoded_positions_roundtrip():
+    """Int-coded expansion decodes to delta_positions.csv and scatters to the same totals."""
+    assert load_product_mapping('product_mapping.csv') == build_product_mapping()
+    
+    coded_df, codes = expand_positions_encoded('pos_summary.csv', 'product_mapping.csv')
+    assert coded_df['Qty'].dtype == np.float64
+    assert all(coded_df[c].dtype == np.int32 for c in ['Tenor', 'Product', 'Mapped_Product', 'Strategy'])
+    assert list(codes['Tenor'][:3]) == ['H6', 'J6', 'K6']
+    
+    expected = pd.read_csv('delta_positions.csv')
+    pd.testing.assert_frame_equal(decode_positions(coded_df, codes), expected, check_dtype=False)
+    
+    cube = strategy_tenor_cube(coded_df, codes)
+    net = expected.groupby(['Strategy', 'Mapped_Product', 'Tenor'])['Qty'].sum()
+    for (strategy, mapped, tenor), qty in net.items():
+        s_idx = list(codes['Strategy']).index(strategy)
+        m_idx = list(codes['Mapped_Product']).index(mapped)
+        t_idx = list(codes['Tenor']).index(tenor)
+        assert abs(cube[s_idx, m_idx, t_idx] - qty) < 1e-9
+
+
+if __name__ == '__main__':
+    test_matches_delta_positions_csv()
+    print("[PASS] expand_positions matches delta_positions.csv")
+    test_matches_rowwise_reference()
+    print("[PASS] columnar expansion matches row-by-row reference")
+    test_empty_book()
+    print("[PASS] empty book")
+    test_encoded_positions_roundtrip()
+    print("[PASS] int-coded expansion round-trips")
+    import pathlib, tempfile
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        test_streaming_matches_full_expansion(pathlib.Path(tmp_dir))
+    print("[PASS] streaming expansion matches full expansion")